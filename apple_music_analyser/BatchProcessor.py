@@ -0,0 +1,271 @@
+import multiprocessing
+from multiprocessing.connection import wait
+import os
+import sys
+import time
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # the resource module is only available on Unix
+    resource = None
+
+from apple_music_analyser.Utility import Utility
+from apple_music_analyser.VisualizationDataframe import VisualizationDataframe
+from apple_music_analyser.UserAggregates import UserAggregates
+
+class BatchProcessor():
+
+    '''
+        This class processes the archives of many users in one invocation. Each archive is read with
+        Utility.get_df_from_archive, goes through the whole pipeline of VisualizationDataframe, and the instance
+        obtained is saved as a pickle file (a snapshot, that can be loaded with Utility.load_from_pickle) in output_dir,
+        named after the user (the name of the archive without its extension). If save_aggregates is True, the
+        aggregates needed to render the charts (see UserAggregates) are saved too, in <user>.aggregates.pkl.
+
+        Up to max_workers archives are processed at the same time, each in its own process. On platforms where it
+        is available, the processes are forked, so the package and its dependencies are imported only once, by the
+        process running the batch. As each archive has its own process, an archive that can't be processed (invalid
+        archive, exception in the pipeline, crash of the process) doesn't stop the batch: its status is 'failed'
+        and the error is kept in the summary. The limits are enforced per archive:
+            - if time_limit is provided, the process of an archive running for more than time_limit seconds is
+            terminated, and its status is 'timeout'
+            - if memory_limit is provided, the address space of the process of an archive is limited to memory_limit
+            bytes, so an archive needing more memory fails with a MemoryError (this relies on the resource module, so
+            it is only applied on Unix)
+
+        Once all the archives are processed, a summary table with a row per archive is saved as summary.csv in
+        output_dir. Its columns are:
+            - User, Archive, Status ('done', 'failed' or 'timeout'), Error (None if the archive was processed)
+            - Duration, the time in seconds spent on the archive, including the reading of the archive ('read_archive')
+            and the saving of the snapshot ('save_snapshot'), which have their own column too
+            - a column per stage of VisualizationDataframe.pipeline_stages, with its duration in seconds
+            - Peak_memory, the maximum resident set size of the process in bytes (None if not available)
+            - Play_count, the number of rows of the visualization dataframe
+            - Snapshot, the path of the snapshot
+            - save_aggregates, the time in seconds spent computing and saving the aggregates, and Aggregates, the path
+            of their file (None if save_aggregates is False)
+
+        Args:
+            archive_paths - a list of paths of archives (zip files, see Utility.get_df_from_archive)
+            output_dir - the folder where the snapshots and the summary are saved (created if it doesn't exist)
+            max_workers - OPTIONAL, the number of archives processed at the same time (default os.cpu_count())
+            time_limit - OPTIONAL, the maximum duration in seconds of the processing of an archive
+            memory_limit - OPTIONAL, the maximum memory in bytes of the process of an archive
+            target_files_dict - OPTIONAL, the path of each file within the archives (see Utility.get_df_from_archive)
+            save_aggregates - OPTIONAL, boolean, if True the aggregates of each user are saved next to the snapshot (default False)
+
+        Raises:
+            raises an exception if two archives have the same user name, as their snapshots would overwrite each other
+
+        Methods:
+            __init__(archive_paths, output_dir, max_workers=None, time_limit=None, memory_limit=None, target_files_dict=None, save_aggregates=False)
+            from_directory(directory, output_dir, **kwargs)
+            from_manifest(manifest_path, output_dir, **kwargs)
+            run()
+            get_summary()
+            build_summary(rows)
+            start_worker(context, archive_path)
+            run_worker(connection, archive_path, snapshot_path, memory_limit, target_files_dict, save_aggregates=False)
+            process_archive(archive_path, snapshot_path, target_files_dict=None, save_aggregates=False)
+            get_user_name(archive_path)
+            get_peak_memory()
+    '''
+
+    summary_file_name = 'summary.csv'
+    aggregates_extension = '.aggregates.pkl'
+
+    def __init__(self, archive_paths, output_dir, max_workers=None, time_limit=None, memory_limit=None, target_files_dict=None, save_aggregates=False):
+        self.archive_paths = list(archive_paths)
+        self.output_dir = output_dir
+        self.max_workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.target_files_dict = target_files_dict
+        self.save_aggregates = save_aggregates
+        user_names = [BatchProcessor.get_user_name(archive_path) for archive_path in self.archive_paths]
+        duplicated_names = sorted(set([name for name in user_names if user_names.count(name) > 1]))
+        if duplicated_names != []:
+            raise Exception('Several archives have the same user name: {0}. Please rename them.'.format(duplicated_names))
+        self.summary = None
+
+    @staticmethod
+    def from_directory(directory, output_dir, **kwargs):
+        '''
+            Returns an instance of BatchProcessor for the zip files of directory (in alphabetical order).
+        '''
+        archive_paths = [os.path.join(directory, file_name) for file_name in sorted(os.listdir(directory)) if file_name.endswith('.zip')]
+        return BatchProcessor(archive_paths, output_dir, **kwargs)
+
+    @staticmethod
+    def from_manifest(manifest_path, output_dir, **kwargs):
+        '''
+            Returns an instance of BatchProcessor for the archives listed in a manifest, a text file with the path
+            of an archive per line. Empty lines and lines starting with '#' are ignored, and relative paths are
+            relative to the folder of the manifest.
+        '''
+        manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+        archive_paths = []
+        with open(manifest_path, 'r') as manifest:
+            for line in manifest:
+                line = line.strip()
+                if line == '' or line.startswith('#'):
+                    continue
+                archive_paths.append(os.path.join(manifest_dir, line))
+        return BatchProcessor(archive_paths, output_dir, **kwargs)
+
+    def run(self):
+        '''
+            Processes all the archives, saves the summary table in output_dir and returns it (a pandas dataframe,
+            with a row per archive, in the order of archive_paths).
+        '''
+        os.makedirs(self.output_dir, exist_ok=True)
+        # fork is not available on Windows, and not safe on macOS, where the default start method is used
+        if sys.platform.startswith('linux'):
+            context = multiprocessing.get_context('fork')
+        else:
+            context = multiprocessing.get_context()
+        rows = {}
+        pending_paths = list(self.archive_paths)
+        # the running workers, each of the form {connection:{'archive_path', 'process', 'start_time'}}
+        running_workers = {}
+        while pending_paths != [] or running_workers != {}:
+            while pending_paths != [] and len(running_workers) < self.max_workers:
+                archive_path = pending_paths.pop(0)
+                connection, worker = self.start_worker(context, archive_path)
+                running_workers[connection] = worker
+
+            timeout = None
+            if self.time_limit is not None:
+                first_deadline = min([worker['start_time'] for worker in running_workers.values()]) + self.time_limit
+                timeout = max(first_deadline - time.perf_counter(), 0)
+            ready_connections = wait(list(running_workers.keys()), timeout)
+
+            for connection in list(running_workers.keys()):
+                worker = running_workers[connection]
+                row = None
+                if connection in ready_connections:
+                    try:
+                        status, result = connection.recv()
+                    except EOFError:
+                        # the process ended without sending a result (killed by the system for instance)
+                        worker['process'].join()
+                        status, result = 'failed', {'Error':'The process ended with exit code {0}'.format(worker['process'].exitcode)}
+                    row = dict(result, Status=status)
+                elif self.time_limit is not None and time.perf_counter() - worker['start_time'] >= self.time_limit:
+                    worker['process'].terminate()
+                    row = {'Status':'timeout', 'Error':'The processing took more than {0} seconds'.format(self.time_limit)}
+                if row is not None:
+                    worker['process'].join()
+                    connection.close()
+                    row['Duration'] = row.get('Duration', time.perf_counter() - worker['start_time'])
+                    rows[worker['archive_path']] = row
+                    del running_workers[connection]
+
+        self.summary = self.build_summary(rows)
+        self.summary.to_csv(os.path.join(self.output_dir, BatchProcessor.summary_file_name), index=False)
+        return self.summary
+
+    def get_summary(self):
+        return self.summary
+
+    def build_summary(self, rows):
+        '''
+            Returns the summary table from the dictionary {archive_path:row} of the results of the workers.
+        '''
+        columns = ['User', 'Archive', 'Status', 'Duration', 'read_archive'] + VisualizationDataframe.pipeline_stages +\
+            ['save_snapshot', 'save_aggregates', 'Peak_memory', 'Play_count', 'Snapshot', 'Aggregates', 'Error']
+        summary_rows = []
+        for archive_path in self.archive_paths:
+            row = dict.fromkeys(columns)
+            row.update(rows[archive_path])
+            row['User'] = BatchProcessor.get_user_name(archive_path)
+            row['Archive'] = archive_path
+            if row['Status'] != 'done':
+                row['Snapshot'] = None
+                row['Aggregates'] = None
+            summary_rows.append(row)
+        return pd.DataFrame(summary_rows, columns=columns)
+
+    def start_worker(self, context, archive_path):
+        '''
+            Starts the process of an archive, and returns the connection on which its result is received,
+            and a dictionary describing the worker.
+        '''
+        receiving_connection, sending_connection = context.Pipe(duplex=False)
+        snapshot_path = os.path.join(self.output_dir, BatchProcessor.get_user_name(archive_path) + '.pkl')
+        process = context.Process(target=BatchProcessor.run_worker,
+            args=(sending_connection, archive_path, snapshot_path, self.memory_limit, self.target_files_dict, self.save_aggregates))
+        process.start()
+        # the sending end belongs to the process now, so the receiving end gets an EOF if the process dies
+        sending_connection.close()
+        return receiving_connection, {'archive_path':archive_path, 'process':process, 'start_time':time.perf_counter()}
+
+    @staticmethod
+    def run_worker(connection, archive_path, snapshot_path, memory_limit, target_files_dict, save_aggregates=False):
+        '''
+            Target of the process of an archive: applies the memory limit, processes the archive and sends
+            ('done', result) or ('failed', {'Error':str}) on connection.
+        '''
+        start_time = time.perf_counter()
+        try:
+            if memory_limit is not None and resource is not None:
+                resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+            message = ('done', BatchProcessor.process_archive(archive_path, snapshot_path, target_files_dict, save_aggregates))
+        except BaseException as error:
+            message = ('failed', {'Error':'{0}: {1}'.format(type(error).__name__, error),
+                'Duration':time.perf_counter() - start_time, 'Peak_memory':BatchProcessor.get_peak_memory()})
+        connection.send(message)
+        connection.close()
+
+    @staticmethod
+    def process_archive(archive_path, snapshot_path, target_files_dict=None, save_aggregates=False):
+        '''
+            Processes an archive and saves the instance of VisualizationDataframe obtained at snapshot_path, and
+            its aggregates next to it if save_aggregates is True.
+            Returns a dictionary with the durations of the steps, the peak memory, the number of plays and the paths
+            of the files saved.
+        '''
+        start_time = time.perf_counter()
+        input_df = Utility.get_df_from_archive(archive_path, target_files_dict)
+        read_duration = time.perf_counter() - start_time
+
+        visualization_dataframe = VisualizationDataframe(input_df)
+        visualization_dataframe.run_pipeline()
+
+        snapshot_start_time = time.perf_counter()
+        Utility.save_to_pickle(visualization_dataframe, snapshot_path)
+        result = {'read_archive':read_duration, 'save_snapshot':time.perf_counter() - snapshot_start_time}
+        result.update(visualization_dataframe.get_stage_timings())
+        if save_aggregates:
+            aggregates_start_time = time.perf_counter()
+            aggregates_path = os.path.splitext(snapshot_path)[0] + BatchProcessor.aggregates_extension
+            UserAggregates.from_visualization_dataframe(visualization_dataframe).save(aggregates_path)
+            result['save_aggregates'] = time.perf_counter() - aggregates_start_time
+            result['Aggregates'] = aggregates_path
+        result['Duration'] = time.perf_counter() - start_time
+        result['Peak_memory'] = BatchProcessor.get_peak_memory()
+        result['Play_count'] = visualization_dataframe.get_df_viz().shape[0]
+        result['Snapshot'] = snapshot_path
+        return result
+
+    @staticmethod
+    def get_user_name(archive_path):
+        '''
+            Returns the name of the archive, without its folder and extension.
+        '''
+        return os.path.splitext(os.path.basename(archive_path))[0]
+
+    @staticmethod
+    def get_peak_memory():
+        '''
+            Returns the maximum resident set size of the current process in bytes, or None if it is not available.
+        '''
+        if resource is None:
+            return None
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS, and in kilobytes on Linux
+        if sys.platform == 'darwin':
+            return max_rss
+        return max_rss*1024
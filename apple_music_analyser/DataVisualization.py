@@ -1,5 +1,9 @@
-import plotly.graph_objs as go
-from plotly.subplots import make_subplots
+import heapq
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+# plotly is imported by the methods using it, so it is only loaded when a visualization is built
 
 from apple_music_analyser.Utility import Utility
 
@@ -8,7 +12,8 @@ class SunburstVisualization():
     '''
         This class is responsible for generating a sunburst graph from
         the objects contained in a dictionary. 
-        Once rendered a page opens automatically in a browser to display the plot.
+        Once rendered a page opens automatically in a browser to display the plot, unless render_sunburst_plot
+        is called with show=False (for example to export the figure with FigureExporter, without a browser).
 
         Args: 
             viz_dict - dictionary containing ranked counts
@@ -21,12 +26,19 @@ class SunburstVisualization():
                     2019: {'French Pop': 1265, 'Pop': 1175, 'Soundtrack': 594, 'Dance': 581, 'Rock': 325},
                     2020: {'Pop': 571, 'Soundtrack': 504, 'French Pop': 504, 'Dance': 238, 'Classical': 229}}
                 This dictionary can be obtained using the build_ranking_dict_per_year method from the Process.TrackSummaryObject class 
+                It can also be a dataframe in long format, with a row per year and item, and the columns 'Year', 'Label'
+                and 'Count' (see build_long_df), for example obtained from a groupby of df_viz
             center_title - OPTIONAL, the title to display in the center of the plot
+            number_of_items - OPTIONAL, if provided, only the number_of_items items with the largest count of each year
+            are displayed, and the others are grouped in an item named 'Other' (or 'Other (grouped)' if one of the items
+            already is 'Other')
 
         Methods:
-            __init__(viz_dict, center_title='')
+            __init__(viz_dict, center_title='', number_of_items=None)
             build_sunburst_arrays()
-            render_sunburst_plot()
+            build_long_df(viz_dict)
+            compute_sunburst_arrays(long_df, center_title, number_of_items=None, years=None)
+            render_sunburst_plot(show=True)
 
         Example:
             #build the viz_dict
@@ -37,14 +49,16 @@ class SunburstVisualization():
             sunburst.render_sunburst_plot()
     '''
 
-    def __init__(self, viz_dict, center_title=''):
+    def __init__(self, viz_dict, center_title='', number_of_items=None):
         self.viz_dict = viz_dict
         self.center_title = center_title
+        self.number_of_items = number_of_items
         self.plot_title = 'Ranking across years: ' + self.center_title
         self.labels = []
         self.parents = []
         self.values = []
         self.ids = []
+        self.figure = None
         self.build_sunburst_arrays()
 
     def build_sunburst_arrays(self):
@@ -57,31 +71,93 @@ class SunburstVisualization():
 
             More specifically, we have the year as a parent and ids, the genre/artist/title as a label
             and the count of songs listened to from the input dictionary as a value.
+            The arrays are computed at once from the input in long format (see compute_sunburst_arrays). The years of
+            the input dictionary without any item are kept, with a count of 0.
         '''
-        labels = []
-        parents = []
-        values = []
-        ids = []
-        for year in self.viz_dict.keys():
-            current_index = len(labels)
-            ids.append(str(year))
-            labels.append(str(year))
-            parents.append(self.center_title)
-            total_count = 0
-            for genre in self.viz_dict[year].keys():
-                ids.append(str(year)+' - '+genre)
-                labels.append(genre)
-                parents.append(str(year))
-                values.append(self.viz_dict[year][genre])
-                total_count += self.viz_dict[year][genre]
-            values.insert(current_index, total_count)
-
-        self.labels = labels
-        self.parents = parents
-        self.values = values
-        self.ids = ids
-
-    def render_sunburst_plot(self):
+        if isinstance(self.viz_dict, pd.DataFrame):
+            long_df = self.viz_dict
+            years = None
+        else:
+            long_df = SunburstVisualization.build_long_df(self.viz_dict)
+            years = list(self.viz_dict.keys())
+        self.ids, self.labels, self.parents, self.values = SunburstVisualization.compute_sunburst_arrays(long_df, self.center_title, self.number_of_items, years)
+
+    @staticmethod
+    def build_long_df(viz_dict):
+        '''
+            Returns a dataframe with a row per year and item of viz_dict, in the order of viz_dict, and the
+            columns 'Year', 'Label' and 'Count'.
+        '''
+        years = list(viz_dict.keys())
+        return pd.DataFrame({
+            'Year':pd.Index(years).repeat([len(viz_dict[year]) for year in years]),
+            'Label':np.array(list(chain.from_iterable([viz_dict[year].keys() for year in years])), dtype=object),
+            'Count':np.array(list(chain.from_iterable([viz_dict[year].values() for year in years])))
+        })
+
+    @staticmethod
+    def compute_sunburst_arrays(long_df, center_title, number_of_items=None, years=None):
+        '''
+            Returns the lists ids, labels, parents and values of the sunburst from a dataframe in long format (see
+            build_long_df). For each year (in the order of their first row), the year comes first, with the total count
+            of the year as a value, followed by its items (in the order of the rows).
+            If number_of_items is provided, only the number_of_items items of each year with the largest count are kept
+            (the items with the same count in the order of the rows), and the count of the others is summed up in
+            an item 'Other', placed after them, or 'Other (grouped)' if one of the items already is 'Other' (so that
+            a real item is never merged with the grouped items).
+            If years is provided, the years come in its order (followed by the other years of long_df), and the years
+            without any row are kept, with a count of 0.
+        '''
+        if years is None:
+            year_codes, years = pd.factorize(long_df['Year'], sort=False)
+        else:
+            # the codes of the years listed come first, so the years without any row get a code too
+            year_codes, years = pd.factorize(pd.Index(years).append(pd.Index(long_df['Year'])), sort=False)
+            year_codes = year_codes[len(year_codes) - long_df.shape[0]:]
+        labels = long_df['Label'].astype(str).to_numpy(dtype=object)
+        counts = long_df['Count'].to_numpy()
+        positions = np.arange(long_df.shape[0])
+
+        if number_of_items is not None and long_df.shape[0] > 0:
+            # rank of each item in its year: sorted by year, then count (largest first), then position
+            sorted_rows = np.lexsort((positions, -counts, year_codes))
+            sorted_years = year_codes[sorted_rows]
+            year_starts = np.flatnonzero(np.r_[True, sorted_years[1:] != sorted_years[:-1]])
+            ranks = np.empty(len(sorted_rows), dtype=np.int64)
+            ranks[sorted_rows] = positions - np.repeat(year_starts, np.diff(np.r_[year_starts, len(sorted_rows)]))
+            other_rows = ranks >= number_of_items
+            other_label = 'Other'
+            while (labels == other_label).any():
+                other_label += ' (grouped)'
+            labels = np.where(other_rows, other_label, labels).astype(object)
+            positions = np.where(other_rows, len(positions), positions)
+            # the items of each year grouped in other_label are summed up
+            folded_df = pd.DataFrame({'year_code':year_codes, 'Label':labels, 'Count':counts, 'position':positions})
+            folded_df = folded_df.groupby(['year_code', 'Label'], sort=False).agg({'Count':'sum', 'position':'min'}).reset_index()
+            year_codes = folded_df['year_code'].to_numpy()
+            labels = folded_df['Label'].to_numpy(dtype=object)
+            counts = folded_df['Count'].to_numpy()
+            positions = folded_df['position'].to_numpy()
+
+        year_labels = pd.Index(years).astype(str).to_numpy(dtype=object)
+        year_totals = pd.Series(counts).groupby(year_codes).sum().reindex(range(len(years)), fill_value=0).to_numpy()
+        item_parents = year_labels[year_codes]
+
+        # the row of each year comes before its items
+        sort_years = np.r_[np.arange(len(years)), year_codes]
+        sort_positions = np.r_[np.full(len(years), -1), positions]
+        order = np.lexsort((sort_positions, sort_years))
+        ids = np.r_[year_labels, item_parents + ' - ' + labels][order]
+        sunburst_labels = np.r_[year_labels, labels][order]
+        parents = np.r_[np.full(len(years), center_title, dtype=object), item_parents][order]
+        values = np.r_[year_totals, counts][order]
+        return ids.tolist(), sunburst_labels.tolist(), parents.tolist(), values.tolist()
+
+    def render_sunburst_plot(self, show=True):
+        '''
+            Builds the figure (saved in self.figure), and displays it if show is True.
+        '''
+        import plotly.graph_objs as go
         # Create the figure
         fig =go.Figure(go.Sunburst(
             ids=self.ids,
@@ -97,7 +173,9 @@ class SunburstVisualization():
             margin = dict(l=0, r=0, b=0)
         )
 
-        fig.show()
+        self.figure = fig
+        if show:
+            fig.show()
 
 
 class RankingListVisualization():
@@ -119,10 +197,18 @@ class RankingListVisualization():
                 This dictionary can be obtained using the build_ranking_dict_per_year method from the Process.TrackSummaryObject class 
             number_of_items_in_ranking - by default set to 10, the number of items we want to be in the ranked dict
 
+        The items are ranked from the largest count, and the items with the same count are kept in the order of
+        the dictionary of the year (as with a stable sort). Only the top items are selected, without sorting all the
+        items of the year: with heapq.nlargest for small dictionaries, and with a partition of an array of the counts
+        for large ones (for example the count per title or per artist), see select_top_items.
+        get_ranked_dicts returns the rankings for several numbers of items at once, from a single selection per year.
+
         Methods:
             __init__(viz_dict, number_of_items_in_ranking=10)
             rank_items_in_dict()
             get_ranked_dict(print_output=False)
+            get_ranked_dicts(numbers_of_items_in_ranking)
+            select_top_items(count_dict, number_of_items)
 
         Example:
             #build the viz_dict
@@ -139,6 +225,9 @@ class RankingListVisualization():
                 2020: {'Pop': 571, 'Soundtrack': 504, 'French Pop': 504}}
     '''
 
+    # number of items of a year from which the counts are partitioned as an array instead of using heapq
+    array_ranking_min_size = 1000
+
     def __init__(self, viz_dict, number_of_items_in_ranking=10):
         self.viz_dict = viz_dict
         self.num_ranks = number_of_items_in_ranking
@@ -147,7 +236,7 @@ class RankingListVisualization():
     def rank_items_in_dict(self):
         ranked_dict = {}
         for year in self.viz_dict.keys():
-            ranked_dict[year] = {key: self.viz_dict[year][key] for key in sorted(self.viz_dict[year], key=self.viz_dict[year].get, reverse=True)[:self.num_ranks]}
+            ranked_dict[year] = {key: self.viz_dict[year][key] for key in RankingListVisualization.select_top_items(self.viz_dict[year], self.num_ranks)}
 
         return ranked_dict
 
@@ -156,6 +245,47 @@ class RankingListVisualization():
             print(self.ranked_dict)
         return self.ranked_dict
 
+    def get_ranked_dicts(self, numbers_of_items_in_ranking):
+        '''
+            Returns a dictionary {number_of_items:ranked_dict} with a ranked dict (same format as get_ranked_dict) for
+            each number of items of the list numbers_of_items_in_ranking. The top items of each year are selected once,
+            for the largest number of items, and the smaller rankings are the first items of this selection.
+        '''
+        ranked_dicts = {number_of_items:{} for number_of_items in numbers_of_items_in_ranking}
+        for year in self.viz_dict.keys():
+            top_items = RankingListVisualization.select_top_items(self.viz_dict[year], max(numbers_of_items_in_ranking))
+            for number_of_items in numbers_of_items_in_ranking:
+                ranked_dicts[number_of_items][year] = {key: self.viz_dict[year][key] for key in top_items[:number_of_items]}
+        return ranked_dicts
+
+    @staticmethod
+    def select_top_items(count_dict, number_of_items):
+        '''
+            Returns the list of the keys of count_dict with the number_of_items largest counts, from the largest, the keys
+            with the same count being in the order of count_dict. The result is the same as sorting all the keys by count,
+            but only the top items are sorted.
+        '''
+        if number_of_items <= 0:
+            return []
+        if number_of_items >= len(count_dict):
+            return sorted(count_dict, key=count_dict.get, reverse=True)
+        if len(count_dict) < RankingListVisualization.array_ranking_min_size:
+            # heapq.nlargest is equivalent to a stable sort, so the ties keep the order of count_dict
+            return heapq.nlargest(number_of_items, count_dict, key=count_dict.get)
+
+        keys = list(count_dict.keys())
+        counts = np.fromiter(count_dict.values(), dtype=float, count=len(keys))
+        # the smallest count of the top items, found with a partition of the counts
+        kth_index = len(keys) - number_of_items
+        threshold = np.partition(counts, kth_index)[kth_index]
+        # the items above the threshold are all kept, and the first items (in the order of count_dict) at the threshold
+        greater_items = np.flatnonzero(counts > threshold)
+        threshold_items = np.flatnonzero(counts == threshold)[:number_of_items - len(greater_items)]
+        top_items = np.concatenate([greater_items, threshold_items])
+        # sorted by count (largest first), then by position in count_dict
+        top_items = top_items[np.lexsort((top_items, -counts[top_items]))]
+        return [keys[position] for position in top_items]
+
 
 class HeatMapVisualization():
 
@@ -167,9 +297,20 @@ class HeatMapVisualization():
             - per day of the week (DOW - week day on x-axis, and hour of the day (HOD) on y-axis)
         Note that the time listening will be summed up in each cell if the combination month/DOM or DOW/HOD
         appears multiple times in the input dataframe. 
+        The day of the week can be either the name of the day, or its number if the dataframe was built with
+        compact_time_info (see VisualizationDataframe): in this case, the names are produced when rendering the plot.
         It is possible to plot multiple subplots, for example one per year for combination month/DOM, or one
         per month for combination DOW/HOD. The filter should be done on the input dictionary (i.e. render the
         individual plots using different input dictionaries).
+        By default, the rows of the dataframe are passed to a plotly 2D histogram, so the figure contains every play,
+        and the binning is done by the browser. With pre_aggregated, the time listening is summed up in each cell
+        beforehand (see compute_heat_map_grid), and the figure only contains the 12x31 or 7x24 grid: its size and
+        render time don't depend on the number of plays.
+        The input dataframe can also be the time cube of VisualizationDataframe (see from_time_cube), so that the
+        plays don't have to be filtered and summed up again for each plot.
+        By default, the layout of the whole figure is updated each time a subplot is rendered, which gets slow with
+        many subplots. With batch_rendering, render_heat_map only builds the trace of each subplot, and render_batch
+        adds them all to the figure and applies the layout once: it must be called before displaying the figure.
         To display the rendered plot, it is necessary to call the .show() method of Plotly. See example below.
 
         Args: 
@@ -177,6 +318,8 @@ class HeatMapVisualization():
             df_viz - dataframe used to calculate the listening time for the target period represented
                 This dataframe is an object of the VisualizationDataframe (parsed and processed df). 
             with_subplots - by default set to 1, and in this case, only one plot is rendered
+            pre_aggregated - OPTIONAL, boolean, if True the grid of each plot is computed before rendering it (default False)
+            batch_rendering - OPTIONAL, boolean, if True the subplots are added to the figure by render_batch (default False)
             
             ------ For the methods
             title - string used to identify the subplot, for example, the year plotted, or the month
@@ -184,9 +327,14 @@ class HeatMapVisualization():
             week day on x-axis, and hour of the day (HOD) on y-axis
 
         Methods:
-            __init__(df_viz, with_subplots=1)
+            __init__(df_viz, with_subplots=1, pre_aggregated=False, batch_rendering=False)
             build_day_heat_map(title)
             build_week_heat_map(title)
+            build_grid_heat_map(type, hovertemplate)
+            compute_heat_map_grid(df, type)
+            from_time_cube(time_cube, with_subplots=1, year=None, month=None)
+            render_heat_map(type, title)
+            render_batch()
             update_figure_info()
 
         Example - single plot:
@@ -221,12 +369,35 @@ class HeatMapVisualization():
 
             # display the plot rendered
             heat_map.figure.show()
+
+        Example - from the time cube:
+            time_cube = df_viz.get_time_cube()
+            heat_map = HeatMapVisualization.from_time_cube(time_cube, 2, year=2018)
+            heat_map.render_heat_map('DOM', '2018')
+            # the other subplots can use other slices of the same cube
+            heat_map.df = Utility.select_time_period(time_cube, year=2019)
+            heat_map.render_heat_map('DOM', '2019')
+            heat_map.figure.show()
+
+        Example - batch rendering of many subplots:
+            years = sorted(time_cube['Play_Year'].unique())
+            heat_map = HeatMapVisualization(time_cube, len(years), pre_aggregated=True, batch_rendering=True)
+            for year in years:
+                heat_map.df = Utility.select_time_period(time_cube, year=year)
+                heat_map.render_heat_map('DOW', str(year))
+            heat_map.render_batch()
+            heat_map.figure.show()
     '''
 
-    def __init__(self, df_viz, with_subplots=1):
+    def __init__(self, df_viz, with_subplots=1, pre_aggregated=False, batch_rendering=False):
         self.df = df_viz
         self.with_subplots = with_subplots
+        self.pre_aggregated = pre_aggregated
+        self.batch_rendering = batch_rendering
+        # the traces waiting to be added by render_batch, with their row and the layout of their x-axis
+        self.pending_traces = []
         self.title = 'Heat map of the play duration in minutes for each day'
+        from plotly.subplots import make_subplots
         self.figure = make_subplots(rows=self.with_subplots, cols=1)
         self.height = 0
         self.row = 1
@@ -238,6 +409,11 @@ class HeatMapVisualization():
             This function is in charge of building a single 2D Histogram trace specifically 
             for a DOM plot, i.e. month on x-axis, and day of the month (DOM) on y-axis.
         '''
+        hovertemplate = "<b>%{y} %{x}</b><b> "+title+"<b><br>" + "Time listening: %{z:,.0f} minutes<br>" + "<extra></extra>"
+        if self.pre_aggregated:
+            self.data = self.build_grid_heat_map('DOM', hovertemplate)
+            return
+        import plotly.graph_objs as go
         hist = go.Histogram2d(
             y=self.df['Play_DOM'],
             x=self.df['Play_Month'],
@@ -247,10 +423,7 @@ class HeatMapVisualization():
             xbins=dict(start=0.5, end=12.5, size=1),
             z=self.df['Play_duration_in_minutes'],
             histfunc="sum",
-            hovertemplate=
-            "<b>%{y} %{x}</b><b> "+title+"<b><br>" +
-            "Time listening: %{z:,.0f} minutes<br>" +
-            "<extra></extra>",
+            hovertemplate=hovertemplate,
             coloraxis="coloraxis"
         )
         self.data = hist
@@ -260,20 +433,75 @@ class HeatMapVisualization():
             This function is in charge of building a single 2D Histogram trace specifically 
             for a DOW plot, i.e. week day on x-axis, and hour of the day (HOD) on y-axis.
         '''
+        hovertemplate = title +" - %{x}s, %{y}h<b><br>" + "Time listening: %{z:,.0f} minutes<br>" + "<extra></extra>"
+        if self.pre_aggregated:
+            self.data = self.build_grid_heat_map('DOW', hovertemplate)
+            return
+        import plotly.graph_objs as go
         hist = go.Histogram2d(
             y=self.df['Play_HOD'],
-            x=self.df['Play_DOW'],
+            x=Utility.get_day_names(self.df['Play_DOW']),
             ybins=dict(start=0.5, end=23.5, size=1),
             z=self.df['Play_duration_in_minutes'],
             histfunc="sum",
-            hovertemplate=
-            title +" - %{x}s, %{y}h<b><br>" +
-            "Time listening: %{z:,.0f} minutes<br>" +
-            "<extra></extra>",
+            hovertemplate=hovertemplate,
             coloraxis="coloraxis"
         )
         self.data = hist 
 
+    def build_grid_heat_map(self, type, hovertemplate):
+        '''
+            This function is in charge of building a heatmap trace from the grid of the time listening
+            in each cell, computed with compute_heat_map_grid.
+        '''
+        import plotly.graph_objs as go
+        x_values, y_values, grid = HeatMapVisualization.compute_heat_map_grid(self.df, type)
+        return go.Heatmap(
+            x=x_values,
+            y=y_values,
+            z=grid,
+            hovertemplate=hovertemplate,
+            coloraxis="coloraxis"
+        )
+
+    @staticmethod
+    def compute_heat_map_grid(df, type):
+        '''
+            Returns the values of the x-axis, the values of the y-axis, and a numpy array with the time listening summed up
+            in each cell (one row per value of the y-axis):
+                - for a DOM plot, the 12 months on x-axis, and the 31 days of the month on y-axis
+                - for a DOW plot, the 7 days of the week (names) on x-axis, and the 24 hours of the day on y-axis
+            The plays with a missing time or duration are ignored.
+        '''
+        if type == 'DOM':
+            x_values = list(range(1, 13))
+            y_values = list(range(1, 32))
+            x_codes = df['Play_Month'].to_numpy(dtype=float, na_value=np.nan) - 1
+            y_codes = df['Play_DOM'].to_numpy(dtype=float, na_value=np.nan) - 1
+        else:
+            x_values = Utility.day_names
+            y_values = list(range(24))
+            if pd.api.types.is_numeric_dtype(df['Play_DOW']):
+                x_codes = df['Play_DOW'].to_numpy(dtype=float, na_value=np.nan)
+            else:
+                x_codes = pd.Categorical(df['Play_DOW'], categories=Utility.day_names).codes.astype(float)
+                x_codes[x_codes < 0] = np.nan
+            y_codes = df['Play_HOD'].to_numpy(dtype=float, na_value=np.nan)
+        durations = df['Play_duration_in_minutes'].to_numpy(dtype=float, na_value=np.nan)
+
+        valid_rows = ~(np.isnan(x_codes) | np.isnan(y_codes) | np.isnan(durations))
+        cell_codes = y_codes[valid_rows].astype(np.int64)*len(x_values) + x_codes[valid_rows].astype(np.int64)
+        grid = np.bincount(cell_codes, weights=durations[valid_rows], minlength=len(x_values)*len(y_values))
+        return x_values, y_values, grid.reshape(len(y_values), len(x_values))
+
+    @staticmethod
+    def from_time_cube(time_cube, with_subplots=1, year=None, month=None):
+        '''
+            Returns a pre-aggregated instance of HeatMapVisualization for the slice of time_cube (see
+            VisualizationDataframe.get_time_cube) of a year and/or a month, if provided.
+        '''
+        return HeatMapVisualization(Utility.select_time_period(time_cube, year, month), with_subplots, pre_aggregated=True)
+
     def render_heat_map(self, type, title):
         if type == 'DOM':
             self.build_day_heat_map(title)
@@ -283,11 +511,34 @@ class HeatMapVisualization():
             self.build_week_heat_map(title)
             self.xaxis = dict(tickangle = -45, categoryorder='array', categoryarray = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'])
 
-        self.figure.add_trace(self.data, row = self.row, col=1)
         self.height += 500
-        self.update_figure_info()
+        if self.batch_rendering:
+            self.pending_traces.append((self.data, self.row, self.xaxis))
+        else:
+            self.figure.add_trace(self.data, row = self.row, col=1)
+            self.update_figure_info()
         self.row +=1
 
+    def render_batch(self):
+        '''
+            Adds the traces built by render_heat_map since the last call to the figure, and applies the layout once.
+        '''
+        if self.pending_traces == []:
+            return
+        self.figure.add_traces([trace for trace, _, _ in self.pending_traces],
+            rows=[row for _, row, _ in self.pending_traces], cols=[1]*len(self.pending_traces))
+        # the layout of the x-axes of the previous types of plot is kept, as when the subplots are rendered one by one
+        xaxes = []
+        for _, _, xaxis in self.pending_traces:
+            if xaxis in xaxes:
+                xaxes.remove(xaxis)
+            xaxes.append(xaxis)
+        self.pending_traces = []
+        with self.figure.batch_update():
+            for xaxis in xaxes[:-1]:
+                self.figure.update_xaxes(xaxis)
+            self.update_figure_info()
+
     def update_figure_info(self):
         self.figure.update_xaxes(self.xaxis)
         self.figure.update_yaxes(autorange="reversed")
@@ -314,6 +565,11 @@ class BarChartVisualization():
         in the input dataframe. 
         It is possible to plot multiple subplots, for example one per year, or one per month, or one per day... the filter
         should be done on the input dictionary (i.e. render the individual plots using different input dataframes).
+        The count/percentage of tracks per period can be computed by render_period_bar_chart, from df_viz or from
+        its time cube (see from_time_cube), in which case the plays are not counted again for each plot.
+        With batch_rendering, render_bar_chart only builds the trace of each plot, and render_batch adds them all to
+        the figure and applies the layout once (instead of updating it for each trace): it must be called before
+        displaying the figure.
         To display the rendered plot, it is necessary to call the .show() method of Plotly. See example below.
 
         Args: 
@@ -321,17 +577,26 @@ class BarChartVisualization():
             df_viz - dataframe used to calculate the listening time for the target period represented
                 This dataframe is an object of the VisualizationDataframe (parsed and processed df). 
             with_subplots - by default set to 0, and in this case, only one plot is rendered
+            batch_rendering - OPTIONAL, boolean, if True the traces are added to the figure by render_batch (default False)
             
             ------ For the methods
             x_serie - the period targeted (month, DOM, DOW, HOD)
             y_serie - either the count of song, or the percentage of songs
             name - useful in particular for the subplot, for example, the year plotted
+            period - 'Month', 'DOM', 'DOW' or 'HOD'
+            year - OPTIONAL, a year or a list of years to select the tracks counted
+            ratio - OPTIONAL, boolean, if True the percentage of tracks is plotted instead of their count
 
         Methods:
-            __init__(df_viz, with_subplots=0)
+            __init__(df_viz, with_subplots=0, batch_rendering=False)
+            from_time_cube(time_cube, with_subplots=0, year=None, batch_rendering=False)
             create_figure()
             build_bar_chart(x_serie, y_serie, name)
             render_bar_chart(x_serie, y_serie, name)
+            render_period_bar_chart(period, name, year=None, ratio=False)
+            render_grouped_bar_chart(grouped_df, x_column, y_column='Ratio', group_column='Play_Year')
+            render_batch()
+            compute_period_counts(df, period, ratio=False)
 
         Example - single plot:
             # get the input df 
@@ -354,11 +619,9 @@ class BarChartVisualization():
             bar_chart = BarChartVisualization(df)
             bar_chart.hover_unit = '%'
 
-            # for each year, build the x and y series, computing the percentage of songs, and generate the subplots
-            for year in years_to_plot:
-                x_serie = df[df['Play_Year']==year]['Play_DOW'].unique()
-                y_serie = Utility.compute_ratio_songs(df[df['Play_Year']==year]['Play_DOW'])
-                bar_chart.render_bar_chart(x_serie, y_serie, str(year))
+            # compute the percentage of songs per day of the week of all the years at once, and generate a trace per year
+            ratio_df = Utility.compute_grouped_ratio_songs(df, 'Play_DOW', 'Play_Year')
+            bar_chart.render_grouped_bar_chart(ratio_df, 'Play_DOW')
 
             # edit the layout of the xaxis and show the rendered plot
             xaxis=dict(categoryorder='array',
@@ -402,11 +665,22 @@ class BarChartVisualization():
                 yaxis=dict(title='Percentage of tracks')
             )
             bar_chart.figure.show()
+
+        Example - from the time cube:
+            time_cube = df_viz.get_time_cube()
+            bar_chart = BarChartVisualization.from_time_cube(time_cube)
+            bar_chart.hover_unit = '%'
+            for year in sorted(time_cube['Play_Year'].unique()):
+                bar_chart.render_period_bar_chart('DOW', str(year), year=year, ratio=True)
+            bar_chart.figure.show()
     '''
 
-    def __init__(self, df_viz, with_subplots=0):
+    def __init__(self, df_viz, with_subplots=0, batch_rendering=False):
         self.df = df_viz
         self.with_subplots = with_subplots
+        self.batch_rendering = batch_rendering
+        # the traces waiting to be added by render_batch, with their row
+        self.pending_traces = []
         self.title = 'Distribution of tracks'
         self.figure = self.create_figure()
         self.hover_unit = ''
@@ -414,11 +688,21 @@ class BarChartVisualization():
         self.row = 1
         self.data = None
 
+    @staticmethod
+    def from_time_cube(time_cube, with_subplots=0, year=None, batch_rendering=False):
+        '''
+            Returns an instance of BarChartVisualization for the slice of time_cube (see
+            VisualizationDataframe.get_time_cube) of a year or a list of years, if provided.
+        '''
+        return BarChartVisualization(Utility.select_time_period(time_cube, year), with_subplots, batch_rendering)
+
     def create_figure(self):
         '''
             This method is in charge of creating a plotly figure, according to
             whether we want subplots or not (different Plotly function called).
         '''
+        import plotly.graph_objs as go
+        from plotly.subplots import make_subplots
         if self.with_subplots == 0:
             return go.Figure()
         else:
@@ -429,6 +713,7 @@ class BarChartVisualization():
         '''
             This function is in charge of building a bar chart trace.
         '''
+        import plotly.graph_objs as go
         bar = go.Bar(
             name=name,
             x=x_serie,
@@ -446,14 +731,75 @@ class BarChartVisualization():
     def render_bar_chart(self, x_serie, y_serie, name):
         self.build_bar_chart(x_serie, y_serie, name)
 
-        if self.with_subplots == 0:
-            self.figure.add_trace(self.data)
-        else:
-            self.figure.add_trace(self.data, row = self.row, col=1)
+        if self.with_subplots != 0:
             self.height += 500
-        self.update_figure_info()
+        if self.batch_rendering:
+            self.pending_traces.append((self.data, self.row))
+        else:
+            if self.with_subplots == 0:
+                self.figure.add_trace(self.data)
+            else:
+                self.figure.add_trace(self.data, row = self.row, col=1)
+            self.update_figure_info()
         self.row +=1
 
+    def render_batch(self):
+        '''
+            Adds the traces built by render_bar_chart since the last call to the figure, and applies the layout once.
+        '''
+        if self.pending_traces == []:
+            return
+        traces = [trace for trace, _ in self.pending_traces]
+        if self.with_subplots == 0:
+            self.figure.add_traces(traces)
+        else:
+            self.figure.add_traces(traces, rows=[row for _, row in self.pending_traces], cols=[1]*len(traces))
+        self.pending_traces = []
+        with self.figure.batch_update():
+            self.update_figure_info()
+
+    def render_period_bar_chart(self, period, name, year=None, ratio=False):
+        '''
+            Renders the count (or percentage if ratio is True) of tracks per period of self.df, for the
+            year(s) provided only if any.
+        '''
+        x_serie, y_serie = BarChartVisualization.compute_period_counts(Utility.select_time_period(self.df, year), period, ratio)
+        self.render_bar_chart(x_serie, y_serie, name)
+
+    def render_grouped_bar_chart(self, grouped_df, x_column, y_column='Ratio', group_column='Play_Year'):
+        '''
+            Renders a trace per value of group_column of grouped_df, a dataframe with a row per group and x value
+            (for example obtained from Utility.compute_grouped_ratio_songs), in the order of the groups in grouped_df.
+            The days of the week of Play_DOW are displayed with their names, even if they are numbers (compact format).
+        '''
+        for group, group_df in grouped_df.groupby(group_column, sort=False):
+            x_values = group_df[x_column]
+            if x_column == 'Play_DOW':
+                x_values = Utility.get_day_names(x_values)
+            self.render_bar_chart(x_values.tolist(), group_df[y_column].tolist(), str(group))
+
+    @staticmethod
+    def compute_period_counts(df, period, ratio=False):
+        '''
+            Returns the list of the values of the period ('Month', 'DOM', 'DOW' or 'HOD') in df, in their natural order
+            (the names of the days of the week from Monday to Sunday), and the list of the count (or percentage
+            if ratio is True) of tracks for each of them. df is either df_viz, or its time cube, in which case
+            the column Play_count is summed instead of counting the rows.
+        '''
+        column = 'Play_' + period
+        if 'Play_count' in df.columns:
+            counts = df.groupby(column)['Play_count'].sum()
+        else:
+            counts = df[column].value_counts()
+        if period == 'DOW':
+            if pd.api.types.is_numeric_dtype(counts.index):
+                counts.index = [Utility.day_names[int(day)] for day in counts.index]
+            counts = counts.reindex([day for day in Utility.day_names if day in counts.index])
+        else:
+            counts = counts.sort_index()
+        if ratio:
+            counts = counts/counts.sum()*100
+        return counts.index.tolist(), counts.tolist()
 
     def update_figure_info(self):
         self.figure.update_layout(
@@ -468,11 +814,17 @@ class PieChartVisualization():
         To display the rendered plot, it is necessary to call the .show() method of Plotly. See example below.
 
         Args: 
-            serie_to_plot - the serie that will be used to populate the pie chart
+            serie_to_plot - the serie that will be used to populate the pie chart, or the count of each of its
+            values, as a dictionary {label:count} or a serie indexed by label (see pre_aggregated)
+            number_of_slices - OPTIONAL, if provided, only the number_of_slices labels with the largest count get
+            their own slice, and the others are grouped in a slice named 'Other'
+            pre_aggregated - OPTIONAL, boolean, if True serie_to_plot is a serie of counts indexed by label
+            (a dictionary is always read as counts)
 
         Methods:
-            __init__(serie_to_plot)
+            __init__(serie_to_plot, number_of_slices=None, pre_aggregated=False)
             build_pie()
+            compute_pie_counts(serie_to_plot, number_of_slices=None, pre_aggregated=False)
             render_pie_chart()
             update_figure_info()
 
@@ -486,9 +838,12 @@ class PieChartVisualization():
 
     '''
     
-    def __init__(self, serie_to_plot):
+    def __init__(self, serie_to_plot, number_of_slices=None, pre_aggregated=False):
         self.serie_to_plot = serie_to_plot
+        self.number_of_slices = number_of_slices
+        self.pre_aggregated = pre_aggregated
         self.title = 'Pie chart'
+        import plotly.graph_objs as go
         self.figure = go.Figure()
         self.height = 500
         self.data = None
@@ -497,12 +852,39 @@ class PieChartVisualization():
         '''
             This function is in charge of building a pie chart.
         '''
-        labels = self.serie_to_plot.value_counts().index.tolist()
-        values = self.serie_to_plot.value_counts()
+        import plotly.graph_objs as go
+        labels, values = PieChartVisualization.compute_pie_counts(self.serie_to_plot, self.number_of_slices, self.pre_aggregated)
         
         pie = go.Pie(labels=labels, values=values, textinfo='label+percent')
         self.data = pie
 
+    @staticmethod
+    def compute_pie_counts(serie_to_plot, number_of_slices=None, pre_aggregated=False):
+        '''
+            Returns the labels and values of the slices of the pie, from the largest count to the smallest.
+            The counts of serie_to_plot are computed once (value_counts), unless they are provided (a dictionary,
+            or a serie of counts if pre_aggregated is True). If number_of_slices is provided, the counts of the labels
+            after the first number_of_slices are summed up in a last slice, 'Other', or 'Other (grouped)' if there
+            already is a label 'Other' (so that a real value is never merged with the grouped labels).
+        '''
+        if isinstance(serie_to_plot, dict) or pre_aggregated:
+            counts = pd.Series(serie_to_plot) if len(serie_to_plot) > 0 else pd.Series([], dtype='int64')
+            counts = counts.sort_values(ascending=False, kind='stable')
+        else:
+            counts = serie_to_plot.value_counts()
+        labels = counts.index.tolist()
+        values = counts.tolist()
+        if number_of_slices is not None and len(labels) > number_of_slices:
+            other_count = sum(values[number_of_slices:])
+            labels = labels[:number_of_slices]
+            values = values[:number_of_slices]
+            other_label = 'Other'
+            while other_label in counts.index:
+                other_label += ' (grouped)'
+            labels.append(other_label)
+            values.append(other_count)
+        return labels, values
+
     def render_pie_chart(self):
         self.build_pie()
         self.figure.add_trace(self.data)
@@ -0,0 +1,230 @@
+import base64
+import json
+import numbers
+import os
+import numpy as np
+
+class FigureExporter():
+
+    '''
+        This class writes the plotly figures built by the classes of DataVisualization as json files, without
+        displaying them (no browser is needed), so that the reports of many users can be generated by a batch job
+        and displayed later, for example with plotly.js (Plotly.newPlot(div, figure.data, figure.layout)).
+
+        The json is written without spaces. By default, the arrays are written as lists, which any version of plotly.js
+        can display (including the 1.x versions bundled with the plotly version this package requires).
+        With typed_arrays, the numeric arrays of the traces (x, y, z, values,... for example the grid of a pre-aggregated
+        heat map) are encoded as typed arrays instead, i.e. {'dtype':'f8', 'bdata':base64 string} (with a 'shape' for
+        2D arrays), which makes the files smaller but can only be displayed by plotly.js 2.28 or later. The integer
+        arrays are stored with the smallest integer type holding their values. Arrays with less than
+        min_typed_array_size values, and arrays of strings, are written as lists.
+
+        With write_batch, the figures of many users are written at once. The layout of each figure name (for example
+        'heat_map') is written once in a template file, from the figure of the first user, and the file of each user
+        only contains the part of the layout that is different from the template, along with the path of the template.
+        read_figure rebuilds the full figure (as a dictionary that can be passed to plotly.graph_objs.Figure) from a
+        file written by write_figure or write_batch.
+
+        Args:
+            typed_arrays - OPTIONAL, boolean, if True the numeric arrays are written as typed arrays, which requires
+            plotly.js 2.28 or later to display the figures (default False)
+            min_typed_array_size - OPTIONAL, the minimum number of values of an array encoded as a typed array (default 1)
+
+        Methods:
+            __init__(typed_arrays=False, min_typed_array_size=1)
+            figure_to_dict(figure, layout_template=None)
+            write_figure(figure, file_path, layout_template=None, layout_template_path=None)
+            write_batch(figures_per_user, output_dir)
+            read_figure(file_path)
+            encode_traces(value)
+            encode_array(array)
+            decode_array(encoded_array)
+            decode_traces(value)
+            get_layout_diff(layout, layout_template)
+            merge_layout(layout_template, layout_diff)
+            get_figure_json(figure_dict)
+    '''
+
+    # the integer types of typed arrays, from the smallest
+    integer_dtypes = ['i1', 'u1', 'i2', 'u2', 'i4', 'u4']
+
+    def __init__(self, typed_arrays=False, min_typed_array_size=1):
+        self.typed_arrays = typed_arrays
+        self.min_typed_array_size = min_typed_array_size
+
+    def figure_to_dict(self, figure, layout_template=None):
+        '''
+            Returns a dictionary {'data':list, 'layout':dict} from a plotly figure, with the numeric arrays of the traces
+            encoded (see encode_traces). If layout_template is provided (a layout as a dictionary), only the part of
+            the layout of the figure that is different from it is kept.
+        '''
+        figure_dict = figure.to_plotly_json()
+        data = [self.encode_traces(trace) for trace in figure_dict['data']]
+        layout = figure_dict['layout']
+        if layout_template is not None:
+            layout = FigureExporter.get_layout_diff(layout, layout_template)
+        return {'data':data, 'layout':layout}
+
+    def write_figure(self, figure, file_path, layout_template=None, layout_template_path=None):
+        '''
+            Writes a plotly figure as a compact json file at file_path. If layout_template is provided, only the
+            difference with it is written in the layout, and layout_template_path, the path of the file of the
+            template relative to the folder of file_path, is saved in the file under 'layout_template'.
+        '''
+        figure_dict = self.figure_to_dict(figure, layout_template)
+        if layout_template_path is not None:
+            figure_dict['layout_template'] = layout_template_path
+        with open(file_path, 'w') as figure_file:
+            figure_file.write(FigureExporter.get_figure_json(figure_dict))
+
+    def write_batch(self, figures_per_user, output_dir):
+        '''
+            Writes the figures of many users. figures_per_user is a dictionary {user:{figure_name:figure}}.
+            The layout of each figure name is written once, in output_dir/templates/<figure_name>.json, and the figures
+            in output_dir/<user>/<figure_name>.json. Returns a dictionary {user:{figure_name:file_path}}.
+        '''
+        templates_dir = os.path.join(output_dir, 'templates')
+        os.makedirs(templates_dir, exist_ok=True)
+        layout_templates = {}
+        file_paths = {}
+        for user, figures in figures_per_user.items():
+            user_dir = os.path.join(output_dir, str(user))
+            os.makedirs(user_dir, exist_ok=True)
+            file_paths[user] = {}
+            for figure_name, figure in figures.items():
+                if figure_name not in layout_templates:
+                    layout_templates[figure_name] = figure.to_plotly_json()['layout']
+                    with open(os.path.join(templates_dir, figure_name + '.json'), 'w') as template_file:
+                        template_file.write(FigureExporter.get_figure_json(layout_templates[figure_name]))
+                file_path = os.path.join(user_dir, figure_name + '.json')
+                self.write_figure(figure, file_path, layout_templates[figure_name], os.path.join('..', 'templates', figure_name + '.json'))
+                file_paths[user][figure_name] = file_path
+        return file_paths
+
+    @staticmethod
+    def read_figure(file_path):
+        '''
+            Returns the figure saved at file_path as a dictionary {'data':list, 'layout':dict}, with the typed arrays
+            decoded and the layout merged with its template if any.
+        '''
+        with open(file_path, 'r') as figure_file:
+            figure_dict = json.load(figure_file)
+        layout = figure_dict['layout']
+        if 'layout_template' in figure_dict:
+            with open(os.path.join(os.path.dirname(file_path), figure_dict['layout_template']), 'r') as template_file:
+                layout = FigureExporter.merge_layout(json.load(template_file), layout)
+        return {'data':FigureExporter.decode_traces(figure_dict['data']), 'layout':layout}
+
+    def encode_traces(self, value):
+        '''
+            Returns value (a trace, or any of its attributes) with its numeric arrays (numpy arrays, or lists of numbers)
+            encoded as typed arrays (see encode_array).
+        '''
+        if isinstance(value, dict):
+            return {key:self.encode_traces(item) for key, item in value.items()}
+        if not isinstance(value, (list, tuple, np.ndarray)):
+            return value
+        if isinstance(value, np.ndarray):
+            array = value
+        else:
+            try:
+                array = np.asarray(value)
+            except ValueError:
+                # lists of lists of different lengths
+                array = None
+        if array is not None and array.dtype.kind == 'O' and array.size > 0:
+            if all([isinstance(item, numbers.Real) and not isinstance(item, bool) for item in array.ravel()]):
+                array = array.astype(float)
+        if array is not None and array.dtype.kind in 'iuf':
+            if self.typed_arrays and array.ndim <= 2 and array.size >= self.min_typed_array_size:
+                return FigureExporter.encode_array(array)
+            return array.tolist()
+        if isinstance(value, np.ndarray):
+            # arrays of strings or dates are written by the json encoder of plotly
+            return value
+        return [self.encode_traces(item) for item in value]
+
+    @staticmethod
+    def encode_array(array):
+        '''
+            Returns a numeric numpy array as a typed array {'dtype':str, 'bdata':str} (and 'shape':'rows,columns' for a
+            2D array). Integer arrays use the smallest integer type holding their values, other arrays are float64.
+        '''
+        dtype = 'f8'
+        if array.dtype.kind in 'iu' and array.size > 0:
+            minimum, maximum = array.min(), array.max()
+            for integer_dtype in FigureExporter.integer_dtypes:
+                if np.iinfo(integer_dtype).min <= minimum and maximum <= np.iinfo(integer_dtype).max:
+                    dtype = integer_dtype
+                    break
+        # typed arrays are little endian
+        data = np.ascontiguousarray(array, dtype=np.dtype(dtype).newbyteorder('<'))
+        encoded_array = {'dtype':dtype, 'bdata':base64.b64encode(data.tobytes()).decode('ascii')}
+        if array.ndim == 2:
+            encoded_array['shape'] = '{0},{1}'.format(array.shape[0], array.shape[1])
+        return encoded_array
+
+    @staticmethod
+    def decode_array(encoded_array):
+        '''
+            Returns the numpy array of a typed array (see encode_array).
+        '''
+        array = np.frombuffer(base64.b64decode(encoded_array['bdata']), dtype=np.dtype(encoded_array['dtype']).newbyteorder('<'))
+        if 'shape' in encoded_array:
+            array = array.reshape([int(size) for size in encoded_array['shape'].split(',')])
+        return array
+
+    @staticmethod
+    def decode_traces(value):
+        '''
+            Returns value (a list of traces, or any of their attributes) with its typed arrays decoded.
+        '''
+        if isinstance(value, dict):
+            if 'bdata' in value and 'dtype' in value:
+                return FigureExporter.decode_array(value)
+            return {key:FigureExporter.decode_traces(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [FigureExporter.decode_traces(item) for item in value]
+        return value
+
+    @staticmethod
+    def get_layout_diff(layout, layout_template):
+        '''
+            Returns the part of layout (a dictionary) that is different from layout_template. The keys of
+            layout_template that are not in layout are set to None.
+        '''
+        layout_diff = {key:None for key in layout_template if key not in layout}
+        for key, value in layout.items():
+            if key not in layout_template:
+                layout_diff[key] = value
+            elif isinstance(value, dict) and isinstance(layout_template[key], dict):
+                value_diff = FigureExporter.get_layout_diff(value, layout_template[key])
+                if value_diff != {}:
+                    layout_diff[key] = value_diff
+            elif value != layout_template[key]:
+                layout_diff[key] = value
+        return layout_diff
+
+    @staticmethod
+    def merge_layout(layout_template, layout_diff):
+        '''
+            Returns the layout obtained by applying layout_diff (see get_layout_diff) to layout_template.
+        '''
+        layout = dict(layout_template)
+        for key, value in layout_diff.items():
+            if value is None:
+                layout.pop(key, None)
+            elif isinstance(value, dict) and isinstance(layout.get(key), dict):
+                layout[key] = FigureExporter.merge_layout(layout[key], value)
+            else:
+                layout[key] = value
+        return layout
+
+    @staticmethod
+    def get_figure_json(figure_dict):
+        '''
+            Returns figure_dict as a compact json string (using the json encoder of plotly for the values that
+            are not supported by the json module, such as dates).
+        '''
+        from plotly.utils import PlotlyJSONEncoder
+        return json.dumps(figure_dict, cls=PlotlyJSONEncoder, separators=(',', ':'))
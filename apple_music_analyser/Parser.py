@@ -12,6 +12,10 @@ class Parser():
         When creating a new instance of this class, parse_input_df and parse_source_dataframes are automatcally executed.
         parse_input_df will validate the input provided (argument source_files) and create a source_dataframes dict.
         parse_source_dataframes will parse the dataframes in the newly created source_dataframes dict.
+        If the dataframes were already parsed before (for example by another instance whose output was saved), they can
+        be passed with parsed_dataframes, and are then used instead of parsing source_files again.
+        With compact_time_info, the time columns of the play activity and library activity are stored as small integers,
+        the day of the week being a number (see Utility.extract_time_info_from_datetime).
 
         Args:
             source_files - a dictionary of dataframes of the followwing format
@@ -28,9 +32,13 @@ class Parser():
                 |_ Apple Music Library Activity.json.zip
                 |_ Apple Music Likes and Dislikes.csv
                 |_ Apple Music Activity/Apple Music Play Activity.csv
+            parsed_dataframes - OPTIONAL, a dictionary of the same structure that source_files, but where the values
+            are the already parsed df
+            compact_time_info - OPTIONAL, boolean, if True the time columns are stored in the compact format (default False)
         
         Attributes: 
             source_files - dictionary of dataframes (see Args for more details)
+            compact_time_info - boolean (see Args)
             source_dataframes - a dictionary of the same structure that source_files, but where the values are parsed df
 
 
@@ -38,11 +46,12 @@ class Parser():
             raises an exception if the source_files could not be properly parsed (see description above).
 
         Methods:
-            __init__(source_files)
+            __init__(source_files, parsed_dataframes=None, compact_time_info=False)
             parse_input_df(source_files)
-            parse_source_dataframes()
-            parse_library_activity_df(library_activity_df)
-            parse_play_activity_df(play_activity_df, convert_to_local_time = True, drop_columns=True)
+            parse_source_dataframes(parsed_dataframes=None)
+            get_parsed_dataframes()
+            parse_library_activity_df(library_activity_df, compact_time_info=False)
+            parse_play_activity_df(play_activity_df, convert_to_local_time = True, drop_columns=True, compact_time_info=False)
             parse_library_tracks_infos_df(library_tracks_infos_df)
             parse_likes_dislikes_df(likes_dislikes_df)
             set_partial_listening(play_activity_df, end_reason_type, play_duration, media_duration)
@@ -52,10 +61,11 @@ class Parser():
 
     '''
 
-    def __init__(self, source_files):
+    def __init__(self, source_files, parsed_dataframes=None, compact_time_info=False):
         self.source_files = source_files
+        self.compact_time_info = compact_time_info
         self.source_dataframes = self.parse_input_df(self.source_files)
-        self.parse_source_dataframes()
+        self.parse_source_dataframes(parsed_dataframes)
 
     @staticmethod
     def parse_input_df(source_files):
@@ -91,7 +101,7 @@ class Parser():
         return dataframes
 
 
-    def parse_source_dataframes(self):
+    def parse_source_dataframes(self, parsed_dataframes=None):
         '''
             If at the previous stage (parse_input_df) an empty self.source_dataframes dictionary was returned, no
             further parsing/processing is possible. Therefore this method will raise an exception.
@@ -101,28 +111,48 @@ class Parser():
             parse_play_activity_df(play_activity_df, convert_to_local_time = True, drop_columns=True)
             parse_library_tracks_infos_df(library_tracks_infos_df)
             parse_likes_dislikes_df(likes_dislikes_df)
+            If parsed_dataframes is provided, its dataframes are used as they are, without parsing.
         '''
-        if self.source_dataframes != {}:
+        if self.source_dataframes != {} and parsed_dataframes is not None:
+            self.likes_dislikes_df = parsed_dataframes['likes_dislikes_df']
+            self.play_activity_df = parsed_dataframes['play_activity_df']
+            self.identifier_infos_df = parsed_dataframes['identifier_infos_df']
+            self.library_tracks_df = parsed_dataframes['library_tracks_df']
+            self.library_activity_df = parsed_dataframes['library_activity_df']
+        elif self.source_dataframes != {}:
             self.likes_dislikes_df = self.parse_likes_dislikes_df(self.source_dataframes['likes_dislikes_df'])
-            self.play_activity_df = self.parse_play_activity_df(self.source_dataframes['play_activity_df'])
+            self.play_activity_df = self.parse_play_activity_df(self.source_dataframes['play_activity_df'], compact_time_info=self.compact_time_info)
             self.identifier_infos_df = self.source_dataframes['identifier_infos_df']
             self.library_tracks_df = self.parse_library_tracks_infos_df(self.source_dataframes['library_tracks_df'])
-            self.library_activity_df = self.parse_library_activity_df(self.source_dataframes['library_activity_df'])
+            self.library_activity_df = self.parse_library_activity_df(self.source_dataframes['library_activity_df'], self.compact_time_info)
         else:
             raise Exception('No source dataframe provided. Please verify the format of the input_files dictionary you provided.')
 
 
+    def get_parsed_dataframes(self):
+        '''
+            Returns a dictionary of the parsed dataframes, of the same structure as source_dataframes.
+        '''
+        return {
+            'likes_dislikes_df':self.likes_dislikes_df,
+            'play_activity_df':self.play_activity_df,
+            'identifier_infos_df':self.identifier_infos_df,
+            'library_tracks_df':self.library_tracks_df,
+            'library_activity_df':self.library_activity_df
+        }
+
     @staticmethod
-    def parse_library_activity_df(library_activity_df):
+    def parse_library_activity_df(library_activity_df, compact_time_info=False):
         '''
             Method in charge of parsing the library activity dataframe.
             It is responsible for adding time columns from the timestamp column (year, month, day of the month,...), as well
             as agent columns (what performed the action, what model).
+            If compact_time_info is True, the time columns are small integers (see Utility.extract_time_info_from_datetime).
 
         '''
         parsed_df = library_activity_df.copy()
         # parse time related column
-        parsed_datetime_series = Utility.parse_date_time_column(parsed_df, 'Transaction Date')
+        parsed_datetime_series = Utility.parse_date_time_column(parsed_df, 'Transaction Date', compact_time_info)
         Utility.add_time_related_columns(parsed_df, parsed_datetime_series, col_name_prefix='Transaction ')
     
         # parse action agent column
@@ -134,13 +164,13 @@ class Parser():
         return parsed_df
 
     @staticmethod
-    def parse_play_activity_df(play_activity_df, convert_to_local_time = True, drop_columns=True):
+    def parse_play_activity_df(play_activity_df, convert_to_local_time = True, drop_columns=True, compact_time_info=False):
         '''
             Method in charge of parsing the play activity dataframe. The parsing is performed in multiple steps:
             1. Rename the columns containing song title and artist
             2. Time columns: first obtain a timestamp column without missing values, using Event Start Timestamp and Event End Timestamp
             3. Time columns: add time columns from the timestamp column (year, month, day of the month,...), with or without conversion
-            to local time (args)
+            to local time (args), stored as small integers if compact_time_info is True (see Utility.extract_time_info_from_datetime)
             4. Remove outlier rows (Apple Music service started in 2015, so we drop rows with a year before 2015)
             5. Add a column with a flag for partial vs complete listening of a given track
             6. Add a column with a simplified 'origin' of the song, i.e. how it was found (search, suggestion, library,...)
@@ -167,7 +197,7 @@ class Parser():
         parsed_df['Activity date time'].fillna(pd.to_datetime(parsed_df['Event End Timestamp']), inplace=True)
         if convert_to_local_time is True:
             parsed_df['Activity date time'] = Utility.convert_to_local_time(parsed_df['Activity date time'], parsed_df['UTC Offset In Seconds'])
-        parsed_datetime_series = Utility.parse_date_time_column(parsed_df, 'Activity date time')
+        parsed_datetime_series = Utility.parse_date_time_column(parsed_df, 'Activity date time', compact_time_info)
         Utility.add_time_related_columns(parsed_df, parsed_datetime_series, col_name_prefix='Play ')
 
         # We remove year outliers (Apple Music started in 2015, whatever is reported before is a mistake)
@@ -1,3 +1,6 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pandas as pd
 from apple_music_analyser.Query import Query, QueryFactory
 from apple_music_analyser.Track import Track
 from apple_music_analyser.Utility import Utility
@@ -29,6 +32,7 @@ class ProcessTracks():
             items_not_matched (dict of lists) - used to keep track of the rows that were not matched in all dataframes processed,
             with the following format
                 {'library_tracks':[], 'identifier_info':[],'play_activity':[], 'likes_dislikes':[]}
+            comparisons_count (int) - the number of title similarity scores computed to match different spellings of the same title
 
         Methods:
             __init__()
@@ -37,12 +41,15 @@ class ProcessTracks():
             get_genres_list()
             get_items_not_matched()
             get_increment()
+            get_comparisons_count()
             update_track_instance(origin_df, track_instance, index, row)
             compare_titles_for_artist(artist, title_to_compare)
             process_library_tracks_df(library_tracks_df)
             process_identifier_df(identifier_infos_df)
             process_play_df(play_activity_df)
-            process_likes_dislikes_df(likes_dislikes_df)           
+            process_likes_dislikes_df(likes_dislikes_df)
+            process_df_in_parallel(df, origin_df, max_workers=None, shards_count=None)
+            process_shard(process_method_name, shard_df, shard_state)
 
         The methods that processes each df can be called seperately, but only process_library_tracks_df and process_play_df will create
         new instances of Track (the other can only update existing instances). Besides, process_identifier_df requires that the
@@ -53,6 +60,12 @@ class ProcessTracks():
             2. process_identifier_df(identifier_infos_df)
             3. process_play_df(play_activity_df)
             4. process_likes_dislikes_df(likes_dislikes_df)
+
+        The titles of a row of the library tracks or the play activity are only ever compared to the titles of the same
+        artist, so these two dataframes can be processed in parallel with process_df_in_parallel: the rows are split
+        by artist between several processes, and the results are merged so that they are exactly the same as with
+        process_library_tracks_df or process_play_df (same identifiers of the track instances, same order of the
+        dictionaries and lists).
     '''
 
 
@@ -69,6 +82,8 @@ class ProcessTracks():
         ## can be used to spot why a given row was excluded from the track instances
         self.items_not_matched = {'library_tracks':[], 'identifier_info':[],
                              'play_activity':[], 'likes_dislikes':[]}
+        ## this is used to keep track of the number of title similarity scores computed (the costly part of the matching)
+        self.comparisons_count = 0
 
 
     def get_track_instance_dict(self):
@@ -86,6 +101,9 @@ class ProcessTracks():
     def get_increment(self):
         return self.increment
 
+    def get_comparisons_count(self):
+        return self.comparisons_count
+
     def update_track_instance(self, origin_df, track_instance, index, row):
         '''
             This function calls update_track_from_play_activity or 
@@ -115,6 +133,7 @@ class ProcessTracks():
             Otherwise it returns 'No match'.
         '''
         for artist_track in self.artist_tracks_titles[artist]:
+            self.comparisons_count += 1
             title_similarity_for_artist = Utility.compute_similarity_score(title_to_compare, artist_track)
             # value observed to bring consistently a match between similar songs
             if title_similarity_for_artist > 0.625:
@@ -377,8 +396,186 @@ class ProcessTracks():
                         self.items_not_matched['likes_dislikes'].append(index)
                         continue
 
+    def process_df_in_parallel(self, df, origin_df, max_workers=None, shards_count=None):
+        '''
+            Processes the library tracks dataframe (origin_df 'library_tracks_df') or the play activity dataframe
+            (origin_df 'play_activity_df') using several processes, with the same result as process_library_tracks_df
+            or process_play_df.
+            The rows are split into shards_count shards (by default 4 per process), using a hash of the artist name
+            (stripped, like in the title/artist keys of track_instance_dict), so that all the rows, titles and track
+            instances of an artist are in the same shard. Each shard is processed by process_shard in a
+            ProcessPoolExecutor of max_workers processes (by default the number of CPUs).
+            The results of the shards are then merged following the order of the rows of df:
+                - the new track instances get the identifiers they would have had when processing df row by row,
+                i.e. in the order of the row that created them
+                - the new keys of track_instance_dict and artist_tracks_titles, the new genres, and the rows not matched
+                are added in the order of the row that created them (for artist_tracks_titles, the shards report
+                this row, as a row of an artist doesn't always add it, for example 'X ' when 'X' has the same title)
+            As a track instance can be associated to another artist when processing the likes dislikes, this method
+            must be called before process_likes_dislikes_df (which is the recommended order anyway).
+        '''
+        if origin_df == 'library_tracks_df':
+            process_method_name = 'process_library_tracks_df'
+            source = 'library_tracks'
+        elif origin_df == 'play_activity_df':
+            process_method_name = 'process_play_df'
+            source = 'play_activity'
+        else:
+            raise Exception('Only library_tracks_df and play_activity_df can be processed in parallel.')
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if shards_count is None:
+            shards_count = 4*max_workers
+
+        # the rows without a title are not matched, whatever the artist
+        has_title = (df['Title'].astype(str) != 'nan').to_numpy()
+        self.items_not_matched[source].extend(df.index[~has_title])
+        titled_df = df[has_title]
+        artists = titled_df['Artist'].astype(str).where(titled_df['Artist'].astype(str) != 'nan', 'No Artist')
+        stripped_artists = artists.str.strip()
+        shard_ids = (pd.util.hash_pandas_object(stripped_artists, index=False).to_numpy() % shards_count).astype(int)
+
+        shard_dfs = []
+        shard_states = []
+        for shard_id in range(shards_count):
+            shard_df = titled_df[shard_ids == shard_id]
+            if shard_df.shape[0] == 0:
+                continue
+            shard_artists = set(stripped_artists[shard_ids == shard_id])
+            shard_dfs.append(shard_df)
+            shard_states.append({
+                'increment':self.increment,
+                'track_instance_dict':{key:track_instance for key, track_instance in self.track_instance_dict.items() if str(track_instance.artist).strip() in shard_artists},
+                'artist_tracks_titles':{artist:titles for artist, titles in self.artist_tracks_titles.items() if str(artist).strip() in shard_artists},
+                'genres_list':self.genres_list
+            })
+        with ProcessPoolExecutor(max_workers) as executor:
+            shard_results = list(executor.map(ProcessTracks.process_shard, [process_method_name]*len(shard_dfs), shard_dfs, shard_states))
+
+        # position of each row of df, used to merge the results in the order of the rows
+        positions = pd.Series(range(df.shape[0]), index=df.index)
+        keys = titled_df['Title'].astype(str).str.strip() + ' && ' + stripped_artists
+        key_positions = positions[titled_df.index].groupby(keys.to_numpy()).min()
+
+        track_instance_dict = {}
+        artist_tracks_titles = {}
+        artist_positions = {}
+        new_genres = []
+        for shard_result in shard_results:
+            track_instance_dict.update(shard_result['track_instance_dict'])
+            artist_tracks_titles.update(shard_result['artist_tracks_titles'])
+            artist_positions.update({artist:positions[index] for artist, index in shard_result['new_artists'].items()})
+            new_genres.extend(shard_result['new_genres'])
+            self.comparisons_count += shard_result['comparisons_count']
+
+        # the new track instances get their identifiers in the order of the row that created them
+        new_track_instances = {}
+        for track_instance in track_instance_dict.values():
+            if track_instance.identifier >= self.increment:
+                new_track_instances[id(track_instance)] = track_instance
+        creation_positions = []
+        for track_instance in new_track_instances.values():
+            first_index = [appearance['df_index'] for appearance in track_instance.appearances if appearance['source'] == source][0]
+            creation_positions.append((positions[first_index], track_instance))
+        creation_positions.sort(key=lambda creation: creation[0])
+        for creation_rank, (position, track_instance) in enumerate(creation_positions):
+            track_instance.identifier = self.increment + creation_rank
+        self.increment += len(creation_positions)
+
+        # the existing keys keep their order, and the new ones are added in the order of their first row
+        self.track_instance_dict = {key:track_instance_dict.get(key, track_instance) for key, track_instance in self.track_instance_dict.items()}
+        new_keys = [key for key in track_instance_dict if key not in self.track_instance_dict]
+        for key in sorted(new_keys, key=lambda key: key_positions[key]):
+            self.track_instance_dict[key] = track_instance_dict[key]
+        self.artist_tracks_titles = {artist:artist_tracks_titles.get(artist, titles) for artist, titles in self.artist_tracks_titles.items()}
+        new_artists = [artist for artist in artist_tracks_titles if artist not in self.artist_tracks_titles]
+        for artist in sorted(new_artists, key=lambda artist: artist_positions[artist]):
+            self.artist_tracks_titles[artist] = artist_tracks_titles[artist]
+        # the genres are taken from df rather than from the results of the shards, as the copies of NaN
+        # made by the processes are not identical to the NaN of df, and would be added again
+        new_genres.sort(key=lambda new_genre: positions[new_genre[0]])
+        for index, genre in new_genres:
+            genre = df.at[index, 'Genre']
+            if genre not in self.genres_list:
+                self.genres_list.append(genre)
+
+    @staticmethod
+    def process_shard(process_method_name, shard_df, shard_state):
+        '''
+            Processes the rows of a shard (see process_df_in_parallel) with process_method_name, starting from
+            shard_state, a dictionary with the increment, and the parts of track_instance_dict and artist_tracks_titles
+            of the artists of the shard, and the genres_list.
+            Returns a dictionary with the resulting track_instance_dict and artist_tracks_titles, the genres added
+            with the index of the row they were found in, the index of the row that added each new artist to
+            artist_tracks_titles, and the number of titles compared.
+        '''
+        process_tracks = ShardProcessTracks()
+        process_tracks.increment = shard_state['increment']
+        process_tracks.track_instance_dict = shard_state['track_instance_dict']
+        process_tracks.artist_tracks_titles = ArtistTracksTitles(shard_state['artist_tracks_titles'])
+        process_tracks.genres_list = list(shard_state['genres_list'])
+        getattr(process_tracks, process_method_name)(ShardRows(shard_df, process_tracks.artist_tracks_titles))
+        return {
+            'track_instance_dict':process_tracks.track_instance_dict,
+            'artist_tracks_titles':dict(process_tracks.artist_tracks_titles),
+            'new_artists':process_tracks.artist_tracks_titles.creation_indexes,
+            'new_genres':process_tracks.new_genres,
+            'comparisons_count':process_tracks.comparisons_count
+        }
+
+
+class ShardProcessTracks(ProcessTracks):
+
+    '''
+        ProcessTracks used to process a shard of a dataframe (see ProcessTracks.process_df_in_parallel), that also
+        records the index of the row where each new genre is found, so that the genres of the shards can be merged
+        in the order of the rows (the index of the row adding each new artist is recorded by ArtistTracksTitles).
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self.new_genres = []
+
+    def update_track_instance(self, origin_df, track_instance, index, row):
+        genres_count = len(self.genres_list)
+        super().update_track_instance(origin_df, track_instance, index, row)
+        if len(self.genres_list) > genres_count:
+            self.new_genres.append((index, self.genres_list[-1]))
+
+
+class ArtistTracksTitles(dict):
+
+    '''
+        artist_tracks_titles of a ShardProcessTracks, that records the index of the row being processed
+        (current_index, set by ShardRows) when a new artist is added, in creation_indexes.
+    '''
+
+    def __init__(self, artist_tracks_titles):
+        super().__init__(artist_tracks_titles)
+        self.current_index = None
+        self.creation_indexes = {}
 
+    def __setitem__(self, artist, titles):
+        if artist not in self:
+            self.creation_indexes[artist] = self.current_index
+        super().__setitem__(artist, titles)
+
+
+class ShardRows():
+
+    '''
+        The dataframe of a shard, passed to the process methods of ShardProcessTracks, whose iterrows sets the
+        index of the row being processed in artist_tracks_titles (an instance of ArtistTracksTitles).
+    '''
+
+    def __init__(self, df, artist_tracks_titles):
+        self.df = df
+        self.artist_tracks_titles = artist_tracks_titles
 
+    def iterrows(self):
+        for index, row in self.df.iterrows():
+            self.artist_tracks_titles.current_index = index
+            yield index, row
 
 
 class TrackSummaryObject():
@@ -545,9 +742,9 @@ class TrackSummaryObject():
             Logic:
                 - if no filtering parameters are passed, the output dict will have one
                 key per year present in the input df (column 'Play_Year')
-                - for each year, if further filtering is required, a filtered_df is constructed
-                and a count dict is built using the appropriate function (build_genres_count_dict
-                if the target is 'Genres', build_count_dict otherwise)
+                - for each year, if further filtering is required, a query is built and only the
+                target column of the matching rows is used to build a count dict using the appropriate function
+                (build_genres_count_dict if the target is 'Genres', build_count_dict otherwise)
 
         '''
         ranking_dict = {}
@@ -557,15 +754,15 @@ class TrackSummaryObject():
             }
         
         years = query_params['year']
-        for year in years:
-            instance_params = query_params
-            instance_params['year'] = [year]
-            query_instance = QueryFactory().create_query(df, instance_params)
-            filtered_df = query_instance.get_filtered_df()
+        # the queries of all the years are evaluated in a single batch, so that the filters
+        # other than the year are only evaluated once
+        params_per_year = [dict(query_params, year=[year]) for year in years]
+        query_instances = QueryFactory().create_queries(df, params_per_year)
+        for year, query_instance in zip(years, query_instances):
             if ranking_target == 'Genres':
-                ranking_dict[year] = self.build_genres_count_dict(filtered_df[ranking_target])
+                ranking_dict[year] = self.build_genres_count_dict(query_instance.get_series(ranking_target))
             elif ranking_target in ['Artist', 'Track_origin', 'Title']:
-                ranking_dict[year] = self.build_count_dict(filtered_df[ranking_target])   
+                ranking_dict[year] = self.build_count_dict(query_instance.get_series(ranking_target))   
         
         return ranking_dict
 
@@ -0,0 +1,109 @@
+from contextlib import contextmanager
+import json
+import time
+import tracemalloc
+
+class Profiler():
+
+    '''
+        This class records where the time (and optionally the memory) goes when processing the data.
+        Each step to measure is wrapped in the timer context manager, and its duration, and its peak memory
+        if track_memory is True, are recorded under its name. Steps can be nested: the record of a nested step
+        is named after the steps it is part of, separated by '/' (for example 'build_df_visualization/merge_track_instance_infos').
+        Counters can be incremented as well, to record how many times an operation was performed.
+
+        The peak memory is measured with tracemalloc, so it is the peak size of the memory blocks allocated by Python
+        (including the arrays of numpy and pandas) during the step, not the memory of the whole process. As tracing
+        the allocations slows down the execution, it is disabled by default.
+
+        Args:
+            track_memory - OPTIONAL, boolean, if True the peak memory of each step is recorded (default False)
+
+        Attributes:
+            track_memory - boolean (see Args)
+            records - a dictionary {step_name:{'duration':float (seconds), 'peak_memory':int (bytes) or None}}
+            counters - a dictionary {counter_name:int}
+
+        Methods:
+            __init__(track_memory=False)
+            timer(name)
+            increment(counter_name, value=1)
+            get_records()
+            get_counters()
+            get_report()
+            save_report(report, file_path)
+    '''
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.records = {}
+        self.counters = {}
+        # the steps currently measured, each of the form {'name':str, 'peak_memory':int}
+        self.running_steps = []
+        self.started_tracing = False
+
+    @contextmanager
+    def timer(self, name):
+        '''
+            Context manager recording the duration (and the peak memory if track_memory is True) of the code it wraps.
+            The record is added even if the code raises an exception.
+        '''
+        if self.running_steps != []:
+            name = self.running_steps[-1]['name'] + '/' + name
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        step = {'name':name, 'peak_memory':0}
+        if self.track_memory:
+            # the peak is reset to measure the step only, so the peak reached so far is kept for the step running it
+            if self.running_steps != []:
+                parent_step = self.running_steps[-1]
+                parent_step['peak_memory'] = max(parent_step['peak_memory'], tracemalloc.get_traced_memory()[1])
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            else:
+                # reset_peak is only available from python 3.9, clearing the traces also resets the peak (the
+                # memory allocated before the step is then no longer counted)
+                tracemalloc.clear_traces()
+        self.running_steps.append(step)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start_time
+            self.running_steps.pop()
+            peak_memory = None
+            if self.track_memory:
+                peak_memory = max(step['peak_memory'], tracemalloc.get_traced_memory()[1])
+                if self.running_steps != []:
+                    parent_step = self.running_steps[-1]
+                    parent_step['peak_memory'] = max(parent_step['peak_memory'], peak_memory)
+                elif self.started_tracing:
+                    tracemalloc.stop()
+                    self.started_tracing = False
+            self.records[name] = {'duration':duration, 'peak_memory':peak_memory}
+
+    def increment(self, counter_name, value=1):
+        self.counters[counter_name] = self.counters.get(counter_name, 0) + value
+
+    def get_records(self):
+        return self.records
+
+    def get_counters(self):
+        return self.counters
+
+    def get_report(self):
+        '''
+            Returns a dictionary with the records of each step, the counters, and the total duration
+            of the steps that are not part of another step.
+        '''
+        total_duration = sum([record['duration'] for name, record in self.records.items() if '/' not in name])
+        return {'steps':self.records, 'counters':self.counters, 'total_duration':total_duration}
+
+    @staticmethod
+    def save_report(report, file_path):
+        '''
+            Saves a report (for example the output of get_report) as a json file.
+        '''
+        with open(file_path, 'w') as report_file:
+            json.dump(report, report_file, indent=4)
@@ -1,12 +1,29 @@
-
+from bisect import bisect_left
+import re
+import numpy as np
+import pandas as pd
 
 class QueryFactory():
 
     '''
         This class actually decides which instance of the Query class to create, depending
         on the arguments passed in its create_query method.
+        Several queries on the same dataframe can be created at once with create_queries.
+        The string indexes built by the queries for exact and prefix matches are kept by the factory,
+        and shared by all the queries it creates on the same reference_df (which should therefore not
+        be modified in place between two queries).
+
+        Methods:
+            __init__()
+            create_query(reference_df, params_dict=None)
+            create_queries(reference_df, params_dicts)
+            get_string_indexes(reference_df)
     '''
 
+    def __init__(self):
+        self.indexed_df = None
+        self.string_indexes = {}
+
     def create_query(self, reference_df, params_dict=None):
         '''
             This function is meant to create a Query instance with a parameters dict.
@@ -27,16 +44,44 @@ class QueryFactory():
                     'offline':bool,
                     'library':bool,
                     'skipped':bool,
+                    'match':str or dict,
                 }
         '''
+        string_indexes = self.get_string_indexes(reference_df)
         if params_dict == None:
             query_params_default = {
                 'year':reference_df['Play_Year'].unique(),
             }
-            return Query(reference_df, query_params_default)
+            return Query(reference_df, query_params_default, string_indexes=string_indexes)
 
         else:
-            return Query(reference_df, params_dict)
+            return Query(reference_df, params_dict, string_indexes=string_indexes)
+
+    def create_queries(self, reference_df, params_dicts):
+        '''
+            This function creates one Query instance per parameters dict of the params_dicts list,
+            and returns them in the same order, with their matching rows already computed.
+            The queries are evaluated together: each distinct condition, i.e. a value of a column compared with
+            a match mode (for example the year 2019, or 'LOVE' searched in Rating), is evaluated only once on
+            reference_df, and its mask is shared by all the queries of the batch using it (['Pop', 'Rock'] and
+            ['Pop'] evaluate 'Pop' once).
+            Each parameters dict follows the same format as for create_query (None is accepted too).
+        '''
+        queries = [self.create_query(reference_df, params_dict) for params_dict in params_dicts]
+        mask_cache = {}
+        for query in queries:
+            query.row_positions = query.compute_row_positions(mask_cache)
+        return queries
+
+    def get_string_indexes(self, reference_df):
+        '''
+            Returns the dictionary of string indexes of reference_df, reset whenever
+            queries are created on a different dataframe.
+        '''
+        if self.indexed_df is not reference_df:
+            self.indexed_df = reference_df
+            self.string_indexes = {}
+        return self.string_indexes
 
 
 
@@ -44,7 +89,12 @@ class QueryFactory():
 class Query():
 
     '''
-        This class is responsible for generating a query string and a filtered dataframe. 
+        This class is responsible for generating a query string and filtering a dataframe with it.
+        The filter is lazy: creating an instance only compiles the query, the rows matching it are
+        looked up the first time they are needed, and only the rows/columns asked for are copied
+        out of the reference dataframe.
+        A query can be refined into a child query (see refine), that only looks for its additional
+        filters among the rows already matching its parent.
 
         Args:
             reference_df - the dataframe that is to be filtered
@@ -59,29 +109,79 @@ class Query():
                     'offline':bool,
                     'library':bool,
                     'skipped':bool,
+                    'match':str or dict,
                 }
+                'match' sets how the values of genre, artist, title, rating and origin are compared with the
+                values of the df, either for all of them (ex: 'exact'), or per category (ex: {'genre':'exact'}).
+                The available match modes are:
+                    - 'regex' (default): the value is a regular expression searched in the df value
+                    - 'substring': the value is searched as is in the df value
+                    - 'prefix': the df value starts with the value
+                    - 'exact': the df value is the value
+                For the Genres and Rating columns, that may list several values separated by '&&', the
+                'prefix' and 'exact' modes are applied to each of these values.
+                For a refined query, query_params only contains the additional filters, and 'year' is optional
+            parent_query - OPTIONAL, the Query instance this query refines
+            string_indexes - OPTIONAL, a dictionary of the StringIndex instances of reference_df per column,
+            that can be shared between queries on the same reference_df
+            query_elements - the list of query elements, one per category, combined with AND, of the format
+                {'column':column_name, 'query':query_string_of_the_category, 'match':match_mode, 'values':list}
+                ('match' is only set for the string categories, and 'values' for the string categories and the year)
             query_string - the string used to query the df
-            filtered_df - the df filtered using the query
+            row_positions - the positions (not the index labels) of the rows of reference_df matching
+            the query, None until first computed
+            filtered_df - the df filtered using the query, materialized on first access and reused afterwards
+            (get_filtered_df copies the rows out of reference_df on each call)
 
         Methods:
-            __init__(reference_df, query_params)
+            __init__(reference_df, query_params, parent_query=None, string_indexes=None)
             get_query_params()
             get_query_string()
-            get_filtered_df()
-            filter_df()
+            get_row_positions()
+            get_filtered_df(columns=None)
+            get_series(column)
+            count()
+            refine(query_params)
+            get_values(column)
+            aggregate(group_by, measures=None)
+            compute_row_positions(mask_cache=None)
+            get_cached_mask(query_element, mask_cache)
+            build_condition_element(column, value, match=None)
+            compute_refined_row_positions()
+            get_string_index(column)
+            evaluate_element(query_element, row_positions=None)
+            evaluate_query_element(df, query_element)
+            filter_df(columns=None)
             manage_query_filters()
-            build_string_query_element(category, query_values)
+            build_query_elements()
+            get_match_mode(query_category)
+            build_string_query_element(category, query_values, match='regex')
+            build_string_value_query_element(category, query_value, match='regex')
             build_numeric_query_element(category, query_values)
             build_boolean_query_element(category, query_value)
-            build_data_query
+            build_data_query_elements()
+            build_string_data_query_element(column, query_category, target_values)
+            build_data_query()
 
     '''
 
-    def __init__(self, reference_df, query_params):
+    def __init__(self, reference_df, query_params, parent_query=None, string_indexes=None):
         self.reference_df = reference_df
         self.query_params = query_params
+        self.parent_query = parent_query
+        if string_indexes is None:
+            string_indexes = {}
+        self.string_indexes = string_indexes
+        self.query_elements = self.build_query_elements()
         self.query_string = self.manage_query_filters()
-        self.filtered_df = self.filter_df()
+        self.row_positions = None
+        self.materialized_df = None
+
+    @property
+    def filtered_df(self):
+        if self.materialized_df is None:
+            self.materialized_df = self.get_filtered_df()
+        return self.materialized_df
 
     def get_query_params(self):
         return self.query_params
@@ -89,16 +189,231 @@ class Query():
     def get_query_string(self):
         return self.query_string
 
-    def get_filtered_df(self):
-        return self.filtered_df
+    def get_row_positions(self):
+        '''
+            Returns the positions of the rows of reference_df that match the query.
+            They are computed on the first call, and reused afterwards.
+        '''
+        if self.row_positions is None:
+            self.row_positions = self.compute_row_positions()
+        return self.row_positions
+
+    def get_filtered_df(self, columns=None):
+        return self.filter_df(columns)
+
+    def get_series(self, column):
+        '''
+            Returns a single column of the filtered df, without copying the other columns.
+        '''
+        return self.reference_df[column].iloc[self.get_row_positions()]
+
+    def count(self):
+        '''
+            Returns the number of rows matching the query, without building the filtered df.
+        '''
+        return len(self.get_row_positions())
+
+    def refine(self, query_params):
+        '''
+            Returns a child Query, filtering the rows matching this query with the additional
+            filters of query_params (same format as for a Query, but every key is optional).
+            The rows of the child query are looked up only among the rows of this query, so the
+            cost of a refinement depends on the number of rows matching this query, and not on the
+            size of reference_df.
+
+            Example:
+                year_query = QueryFactory().create_query(df, {'year':[2019]})
+                genre_query = year_query.refine({'genre':['Pop']})
+                artist_query = genre_query.refine({'artist':['Artist_1']})
+        '''
+        return Query(self.reference_df, query_params, parent_query=self, string_indexes=self.string_indexes)
+
+    def get_values(self, column):
+        '''
+            Returns the values of a single column for the rows matching the query, as a numpy array.
+        '''
+        return self.reference_df[column].to_numpy()[self.get_row_positions()]
+
+    def aggregate(self, group_by, measures=None):
+        '''
+            Returns a dataframe with one row per group of the rows matching the query, and one
+            column per measure. The groups are built from the codes of the values of the group_by
+            columns, and the measures are computed on these codes (np.bincount), so that neither
+            the filtered df nor a pandas groupby object is built.
+            Rows with a NaN value in any of the group_by columns are ignored.
+
+            Args:
+                group_by - a column name, or a list of column names (for example ['Play_Year', 'Artist'])
+                measures - OPTIONAL, a list of measures to compute for each group (default ['count']), among:
+                    - 'count': the number of rows (i.e. of tracks listened to)
+                    - 'minutes': the sum of Play_duration_in_minutes
+                    - 'distinct_tracks': the number of distinct Track_Instance
+
+            Example:
+                query.aggregate('Artist', ['count', 'minutes'])
+                ## returns something like this : 
+                            Count  Play_duration_in_minutes
+                Artist                                     
+                Artist_1       2                       7.5
+                Artist_2       1                       3.0
+        '''
+        if isinstance(group_by, str):
+            group_by = [group_by]
+        if measures is None:
+            measures = ['count']
+        for measure in measures:
+            if measure not in ['count', 'minutes', 'distinct_tracks']:
+                raise Exception('Unknown measure: {0}. Please use count, minutes or distinct_tracks.'.format(measure))
+
+        # we build a single code per combination of values of the group_by columns
+        keys_codes = []
+        keys_uniques = []
+        for column in group_by:
+            codes, uniques = pd.factorize(self.get_values(column), sort=True)
+            keys_codes.append(codes)
+            keys_uniques.append(uniques)
+        keys_sizes = [len(uniques) for uniques in keys_uniques]
+        valid_rows = np.logical_and.reduce([codes >= 0 for codes in keys_codes])
+        combined_codes = np.ravel_multi_index([codes[valid_rows] for codes in keys_codes], keys_sizes)
+        group_codes, groups = pd.factorize(combined_codes, sort=True)
+        number_of_groups = len(groups)
+
+        aggregated = {}
+        for measure in measures:
+            if measure == 'count':
+                aggregated['Count'] = np.bincount(group_codes, minlength=number_of_groups)
+            elif measure == 'minutes':
+                durations = self.get_values('Play_duration_in_minutes')[valid_rows].astype(float)
+                durations = np.nan_to_num(durations)
+                aggregated['Play_duration_in_minutes'] = np.bincount(group_codes, weights=durations, minlength=number_of_groups)
+            elif measure == 'distinct_tracks':
+                track_codes, track_uniques = pd.factorize(self.get_values('Track_Instance')[valid_rows])
+                has_track = track_codes >= 0
+                group_track_pairs = np.unique(group_codes[has_track].astype(np.int64) * len(track_uniques) + track_codes[has_track])
+                aggregated['Distinct_tracks'] = np.bincount(group_track_pairs // max(len(track_uniques), 1), minlength=number_of_groups)
+
+        groups_keys_codes = np.unravel_index(groups, keys_sizes)
+        keys_values = [uniques.take(codes) for uniques, codes in zip(keys_uniques, groups_keys_codes)]
+        if len(group_by) == 1:
+            index = pd.Index(keys_values[0], name=group_by[0])
+        else:
+            index = pd.MultiIndex.from_arrays(keys_values, names=group_by)
+        return pd.DataFrame(aggregated, index=index)
+
+    def compute_row_positions(self, mask_cache=None):
+        '''
+            Evaluates each query element on reference_df and returns the positions of the rows
+            for which all of them are True.
+            mask_cache - OPTIONAL, a dictionary of the masks of the conditions already evaluated on
+            reference_df (see get_cached_mask). It is looked up before evaluating a condition, and
+            updated with the conditions that had to be evaluated.
+            For a refined query, only the elements added to the parent query are evaluated, on the
+            rows of the parent query, and mask_cache is not used.
+        '''
+        if self.parent_query is not None:
+            return self.compute_refined_row_positions()
+        mask = np.ones(self.reference_df.shape[0], dtype=bool)
+        for query_element in self.query_elements:
+            if mask_cache is None:
+                mask &= self.evaluate_element(query_element)
+            else:
+                mask &= self.get_cached_mask(query_element, mask_cache)
+        return np.flatnonzero(mask)
+
+    def get_cached_mask(self, query_element, mask_cache):
+        '''
+            Returns the mask of query_element on reference_df, combining with OR the masks of its conditions,
+            i.e. each of its values compared with its match mode, keyed by (column, value, match) in mask_cache.
+            Only the conditions missing from mask_cache are evaluated (and added to it).
+            The elements without values (boolean categories) are a single condition, keyed by their query string.
+        '''
+        if 'values' not in query_element:
+            key = (query_element['column'], query_element['query'], None)
+            if key not in mask_cache:
+                mask_cache[key] = self.evaluate_element(query_element)
+            return mask_cache[key]
+        mask = np.zeros(self.reference_df.shape[0], dtype=bool)
+        for value in query_element['values']:
+            key = (query_element['column'], value, query_element.get('match'))
+            if key not in mask_cache:
+                mask_cache[key] = self.evaluate_element(Query.build_condition_element(*key))
+            mask |= mask_cache[key]
+        return mask
+
+    @staticmethod
+    def build_condition_element(column, value, match=None):
+        '''
+            Returns the query element comparing a single value with a column, with a match mode for the
+            string columns, or an '==' comparison if match is None.
+        '''
+        if match is None:
+            return {'column':column, 'query':Query.build_numeric_query_element(column, [value]), 'values':[value]}
+        return {'column':column, 'query':Query.build_string_value_query_element(column, value, match), 'match':match, 'values':[value]}
+
+    def compute_refined_row_positions(self):
+        '''
+            Returns the positions of the rows of the parent query that also match the elements
+            added by this query. Each element is evaluated on the column it targets only, and
+            only on the rows that matched the previous elements.
+        '''
+        row_positions = self.parent_query.get_row_positions()
+        for query_element in self.query_elements[len(self.parent_query.query_elements):]:
+            row_positions = row_positions[self.evaluate_element(query_element, row_positions)]
+        return row_positions
+
+    def get_string_index(self, column):
+        '''
+            Returns the StringIndex of a column of reference_df, built on the first call.
+        '''
+        if column not in self.string_indexes:
+            if column in ['Genres', 'Rating']:
+                self.string_indexes[column] = StringIndex(self.reference_df[column], separator='&&')
+            else:
+                self.string_indexes[column] = StringIndex(self.reference_df[column])
+        return self.string_indexes[column]
+
+    def evaluate_element(self, query_element, row_positions=None):
+        '''
+            Returns a boolean array, True for each row of reference_df matching query_element.
+            If row_positions is provided, only those rows are evaluated.
+            Exact and prefix matches are looked up in the StringIndex of the column, the other
+            elements are evaluated using their query string.
+        '''
+        if query_element.get('match') in ['exact', 'prefix']:
+            string_index = self.get_string_index(query_element['column'])
+            return string_index.get_mask(query_element['values'], query_element['match'], row_positions)
+        if row_positions is None:
+            return Query.evaluate_query_element(self.reference_df, query_element['query'])
+        column_position = self.reference_df.columns.get_loc(query_element['column'])
+        candidate_df = self.reference_df.iloc[row_positions, [column_position]]
+        return Query.evaluate_query_element(candidate_df, query_element['query'])
+
+    @staticmethod
+    def evaluate_query_element(df, query_element):
+        '''
+            Returns a boolean array, True for each row of df matching query_element.
+            Rows for which the comparison can't be made (NaN) are considered not matching.
+        '''
+        result = df.eval(query_element)
+        if isinstance(result, pd.Series):
+            result = result.fillna(False).to_numpy()
+        return np.asarray(result, dtype=bool)
 
-    def filter_df(self):
+    def filter_df(self, columns=None):
         '''
             Returns the reference_df (used to instantiate Query) filtered
-            using self.query_string
+            using self.query_string.
+            If a list of columns is provided, only those columns are returned (a KeyError is raised
+            if one of them is not a column of reference_df).
         '''
-        filtered_df = self.reference_df.query(self.query_string)
-        return filtered_df
+        row_positions = self.get_row_positions()
+        if columns is None:
+            return self.reference_df.iloc[row_positions]
+        column_positions = self.reference_df.columns.get_indexer(columns)
+        if (column_positions == -1).any():
+            missing_columns = [column for column, position in zip(columns, column_positions) if position == -1]
+            raise KeyError('{0} not in the columns of the dataframe'.format(missing_columns))
+        return self.reference_df.iloc[row_positions, column_positions]
 
     def manage_query_filters(self):
         '''
@@ -106,42 +421,82 @@ class Query():
             It takes as an input a dictionary, query_params, that will contain the set of
             filters we want to apply on the dataframe. 
         '''
-        query = Query.build_numeric_query_element('Play_Year', self.query_params['year'])
-        query = query + self.build_data_query()
-        return query
+        return '&'.join([query_element['query'] for query_element in self.query_elements])
+
+    def build_query_elements(self):
+        '''
+            Returns the list of query elements built from query_params, one per category,
+            starting with the year.
+            For a refined query, the elements of the parent query come first.
+        '''
+        if self.parent_query is None:
+            query_elements = []
+        else:
+            query_elements = list(self.parent_query.query_elements)
+        if self.parent_query is None or 'year' in self.query_params:
+            query_elements.append({'column':'Play_Year', 'query':Query.build_numeric_query_element('Play_Year', self.query_params['year']), 'values':list(self.query_params['year'])})
+        query_elements.extend(self.build_data_query_elements())
+        return query_elements
 
+    def get_match_mode(self, query_category):
+        '''
+            Returns the match mode to use for a category, as set with the 'match' key of query_params.
+            If no match mode is provided, 'regex' is used.
+        '''
+        match = self.query_params.get('match', 'regex')
+        if isinstance(match, dict):
+            match = match.get(query_category, 'regex')
+        if match not in ['exact', 'prefix', 'substring', 'regex']:
+            raise Exception('Unknown match mode: {0}. Please use exact, prefix, substring or regex.'.format(match))
+        return match
 
     @staticmethod
-    def build_string_query_element(category, query_values):
+    def build_string_query_element(category, query_values, match='regex'):
         '''
             This function builds the string that is used as a query to filter the dataframe.
             Depending on the number of arguments passed in query_values, the format of the query changes.
             This function focusing on a single category, the logical operator between each value is
             always going to be OR.
 
-            In this case the query will look for a string, and do an 'str.contains' comparison.
+            In this case the query will look for a string, and the comparison depends on the match mode
+            (see build_string_value_query_element). By default, it does an 'str.contains' comparison.
 
             Example:
             (genre 'Pop' OR 'Rock' OR 'Soundtrack')
         '''
-        if len(query_values) == 1:
-            query_element = '{0}.str.contains("{1}")'.format(category, query_values[0])
-        # if exactly two query values, we need only one OR (|)
-        elif len(query_values) == 2:
-            first_item = '{0}.str.contains("{1}")'.format(category, query_values[0])
-            last_item = '{0}.str.contains("{1}")'.format(category, query_values[-1])
-            query_element = '(' + first_item + '|' + last_item + ')'
-        # if more than two query values, we need to chain the OR (|)
+        value_query_elements = [Query.build_string_value_query_element(category, query_value, match) for query_value in query_values]
+        if len(value_query_elements) == 1:
+            query_element = value_query_elements[0]
+        # if more than one query value, we need to chain the OR (|)
         else:
-            first_item = '{0}.str.contains("{1}")'.format(category, query_values[0])
-            last_item = '{0}.str.contains("{1}")'.format(category, query_values[-1])
-            query_element = '(' + first_item + '|'
-            for k in range(1, len(query_values)-1):
-                query_element = query_element + '{0}.str.contains("{1}")'.format(category, query_values[k]) + '|'
-            query_element = query_element + last_item + ')'
-        
+            query_element = '(' + '|'.join(value_query_elements) + ')'
+
         return query_element
 
+    @staticmethod
+    def build_string_value_query_element(category, query_value, match='regex'):
+        '''
+            Returns the query string comparing a single value with a string category:
+                - 'regex': 'str.contains'
+                - 'substring': 'str.contains' with regex=False
+                - 'prefix': 'str.startswith', or for Genres and Rating a regex anchored on each '&&' separated value
+                - 'exact': '==', or for Genres and Rating a regex anchored on each '&&' separated value
+            Note that Query only evaluates this string for the 'regex' and 'substring' modes, the 'prefix'
+            and 'exact' modes being served from a StringIndex.
+        '''
+        if match == 'substring':
+            return '{0}.str.contains("{1}", regex=False)'.format(category, query_value)
+        if match in ['exact', 'prefix'] and category in ['Genres', 'Rating']:
+            value_regex = '(?:^|&& *)' + re.escape(query_value)
+            if match == 'exact':
+                value_regex += '(?: *&&|$)'
+            return '{0}.str.contains("{1}")'.format(category, value_regex.replace('\\', '\\\\'))
+        if match == 'exact':
+            return '{0}=="{1}"'.format(category, query_value)
+        if match == 'prefix':
+            return '{0}.str.startswith("{1}")'.format(category, query_value)
+        return '{0}.str.contains("{1}")'.format(category, query_value)
+
     @staticmethod
     def build_numeric_query_element(category, query_values):
         '''
@@ -191,39 +546,120 @@ class Query():
         return query_element
 
 
-    def build_data_query(self):
+    def build_data_query_elements(self):
         '''
             This function is in charge of choosing which column to use in the query 
             depending on the keys of the query_params dict.
             It uses the few functions build_string_query_element and build_boolean_query_element
-            to actually put together the query string.
+            to actually put together a query element for each category.
         '''
-        query = ''
+        query_elements = []
         for query_category in self.query_params.keys():
             target_values = self.query_params[query_category]
-            if query_category != 'year' and target_values != []:
-                query = query + '&'
+            if query_category not in ['year', 'match'] and target_values != []:
                 if query_category == 'genre':
-                    query = query + Query.build_string_query_element('Genres', target_values)
+                    query_elements.append(self.build_string_data_query_element('Genres', query_category, target_values))
                 elif query_category == 'artist':
-                    query = query + Query.build_string_query_element('Artist', target_values)
+                    query_elements.append(self.build_string_data_query_element('Artist', query_category, target_values))
                 elif query_category == 'title':
-                    query = query + Query.build_string_query_element('Title', target_values)
+                    query_elements.append(self.build_string_data_query_element('Title', query_category, target_values))
                 elif query_category == 'rating':
-                    query = query + Query.build_string_query_element('Rating', target_values)
+                    query_elements.append(self.build_string_data_query_element('Rating', query_category, target_values))
                 elif query_category == 'origin':
-                    query = query + Query.build_string_query_element('Track_origin', target_values)
+                    query_elements.append(self.build_string_data_query_element('Track_origin', query_category, target_values))
                 elif query_category == 'offline':
                     # as here we compare with booleans, we do not use build_query_element
-                    query = query + Query.build_boolean_query_element('Offline', target_values)
+                    query_elements.append({'column':'Offline', 'query':Query.build_boolean_query_element('Offline', target_values)})
                 elif query_category == 'library':
-                    query = query + Query.build_boolean_query_element('Library_Track', target_values)
+                    query_elements.append({'column':'Library_Track', 'query':Query.build_boolean_query_element('Library_Track', target_values)})
                 elif query_category == 'skipped':
                     if target_values is True:
-                        query = query + Query.build_boolean_query_element('Played_completely', False)
+                        query_elements.append({'column':'Played_completely', 'query':Query.build_boolean_query_element('Played_completely', False)})
                     else:
-                        query = query + Query.build_boolean_query_element('Played_completely', True)
-        return query
+                        query_elements.append({'column':'Played_completely', 'query':Query.build_boolean_query_element('Played_completely', True)})
+        return query_elements
+
+    def build_string_data_query_element(self, column, query_category, target_values):
+        '''
+            Returns the query element of a string category, using its match mode.
+        '''
+        match = self.get_match_mode(query_category)
+        return {'column':column, 'query':Query.build_string_query_element(column, target_values, match), 'match':match, 'values':list(target_values)}
+
+    def build_data_query(self):
+        '''
+            Returns the query string of all the categories other than the year, each
+            preceded by the AND operator.
+        '''
+        return ''.join(['&' + query_element['query'] for query_element in self.build_data_query_elements()])
+
 
 
+class StringIndex():
 
+    '''
+        This class is an index of the values of a string column of a dataframe, used by Query to find
+        the rows matching exact or prefix comparisons without going through each row with a regex.
+        The column is encoded once as integer codes (one per unique value), and the unique values are
+        kept both in a dictionary (exact match) and in a sorted list (prefix match), so that a comparison
+        costs a lookup among the unique values, and then a lookup of the code of each row.
+
+        Args:
+            serie - the column of the dataframe to index
+            separator - OPTIONAL, if provided each value of the column is split with it, and the comparisons
+            are made with each part (for example 'Soundtrack && Pop' matches both 'Soundtrack' and 'Pop')
+
+        Attributes:
+            codes - an array with the code of the value of each row of serie (-1 for NaN)
+            number_of_codes - the number of unique values of serie
+            tokens_codes - a dictionary with each unique value (or part of value) as a key, and the list
+            of codes of the values it appears in
+            sorted_tokens - the sorted list of the keys of tokens_codes
+
+        Methods:
+            __init__(serie, separator=None)
+            get_codes(values, match)
+            get_mask(values, match, row_positions=None)
+    '''
+
+    def __init__(self, serie, separator=None):
+        self.codes, uniques = pd.factorize(serie)
+        self.number_of_codes = len(uniques)
+        self.tokens_codes = {}
+        for code, value in enumerate(uniques):
+            if separator is None:
+                tokens = [str(value)]
+            else:
+                tokens = [token.strip() for token in str(value).split(separator)]
+            for token in tokens:
+                if token not in self.tokens_codes:
+                    self.tokens_codes[token] = []
+                self.tokens_codes[token].append(code)
+        self.sorted_tokens = sorted(self.tokens_codes.keys())
+
+    def get_codes(self, values, match):
+        '''
+            Returns the list of codes of the unique values matching any of values, either
+            exactly (match='exact') or that start with it (match='prefix').
+        '''
+        codes = []
+        for value in values:
+            if match == 'exact':
+                codes.extend(self.tokens_codes.get(value, []))
+            else:
+                position = bisect_left(self.sorted_tokens, value)
+                while position < len(self.sorted_tokens) and self.sorted_tokens[position].startswith(value):
+                    codes.extend(self.tokens_codes[self.sorted_tokens[position]])
+                    position += 1
+        return codes
+
+    def get_mask(self, values, match, row_positions=None):
+        '''
+            Returns a boolean array, True for each row of the indexed serie matching any of values.
+            If row_positions is provided, only those rows are looked up.
+        '''
+        # the last item of the lookup table is used for the code -1 (NaN), that never matches
+        lookup_table = np.zeros(self.number_of_codes + 1, dtype=bool)
+        lookup_table[self.get_codes(values, match)] = True
+        codes = self.codes if row_positions is None else self.codes[row_positions]
+        return lookup_table[codes]
@@ -0,0 +1,428 @@
+import copy
+import math
+import numpy as np
+import pandas as pd
+
+from apple_music_analyser.Utility import Utility
+
+class CountMinSketch():
+
+    '''
+        This class estimates the number of occurrences of any value of a stream, in a fixed amount of memory
+        (a table of depth x width counters), whatever the number of distinct values.
+        Each value is counted in one cell of each row of the table, chosen by a hash of the value, and its count is
+        estimated as the minimum of its cells. The values of other items can only add up in these cells, so:
+            - the estimate is never lower than the exact count
+            - the estimate is at most the exact count + epsilon*N, where N is the total count and epsilon = e/width,
+            with a probability of at least 1 - delta, where delta = exp(-depth)
+        from_error_bounds returns a sketch sized for a given epsilon and delta.
+        The sketch can be updated chunk by chunk, and two sketches with the same width, depth and seed (for example
+        of two users) can be merged: the result is the sketch of the concatenation of their streams.
+
+        Args:
+            width - OPTIONAL, the number of counters of each row (default 2048)
+            depth - OPTIONAL, the number of rows (default 5)
+            seed - OPTIONAL, the seed of the hash of the values (default 0)
+
+        Methods:
+            __init__(width=2048, depth=5, seed=0)
+            from_error_bounds(epsilon, delta, seed=0)
+            update(values, counts=None)
+            estimate(values)
+            merge(other)
+            get_error_bound()
+            get_cells(values)
+    '''
+
+    def __init__(self, width=2048, depth=5, seed=0):
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total_count = 0
+
+    @staticmethod
+    def from_error_bounds(epsilon, delta, seed=0):
+        '''
+            Returns a CountMinSketch whose estimates exceed the exact counts by at most epsilon*N (N being the total
+            count) with a probability of at least 1 - delta.
+        '''
+        return CountMinSketch(int(math.ceil(math.e/epsilon)), int(math.ceil(math.log(1/delta))), seed)
+
+    def get_cells(self, values):
+        '''
+            Returns an array of shape (depth, number of values) with the column of each value in each row of the table.
+            The columns of a row are derived from two 32 bits halves of a 64 bits hash of the value (h1 + row*h2).
+        '''
+        hashes = Utility.hash_values(values, self.seed)
+        first_hashes = hashes & np.uint64(0xffffffff)
+        second_hashes = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64).reshape(-1, 1)
+        return ((first_hashes + rows*second_hashes) % np.uint64(self.width)).astype(np.int64)
+
+    def update(self, values, counts=None):
+        '''
+            Counts the values (a list, numpy array or pandas serie, the missing values being ignored), or adds counts
+            (a sequence of the same length) to them if provided.
+        '''
+        if counts is None:
+            value_counts = pd.Series(values, dtype=object).value_counts()
+        else:
+            value_counts = pd.Series(np.asarray(counts, dtype=np.int64), index=pd.Index(values, dtype=object))
+        if value_counts.shape[0] == 0:
+            return
+        cells = self.get_cells(value_counts.index)
+        weights = value_counts.to_numpy(dtype=np.float64)
+        for row in range(self.depth):
+            self.table[row] += np.bincount(cells[row], weights=weights, minlength=self.width).astype(np.int64)
+        self.total_count += int(value_counts.sum())
+
+    def estimate(self, values):
+        '''
+            Returns a numpy array with the estimated count of each of the values.
+        '''
+        if len(values) == 0:
+            return np.zeros(0, dtype=np.int64)
+        cells = self.get_cells(values)
+        return self.table[np.arange(self.depth).reshape(-1, 1), cells].min(axis=0)
+
+    def merge(self, other):
+        '''
+            Adds the counts of other, a CountMinSketch with the same width, depth and seed.
+        '''
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError('Only sketches with the same width, depth and seed can be merged.')
+        self.table += other.table
+        self.total_count += other.total_count
+
+    def get_error_bound(self):
+        '''
+            Returns epsilon*N, the maximum difference between an estimate and the exact count (with a probability
+            of at least 1 - exp(-depth)).
+        '''
+        return math.e/self.width*self.total_count
+
+
+class FrequentItemsSketch():
+
+    '''
+        This class keeps track of the most frequent values of a stream (for example the top artists), with at most
+        capacity counters, whatever the number of distinct values. It is the mergeable version of the Misra-Gries
+        summary (the counts of Space-Saving are these counts plus the error below).
+        The counts of a new chunk are added to the counters, and if there are more than capacity counters, the
+        (capacity+1)-th largest count is subtracted from all of them, and the counters that are not positive anymore
+        are dropped. The sum of the counts subtracted so far is the error of the sketch, so that:
+            - the count of a value is never higher than its exact count, and lower by at most the error
+            - the error is at most (N - sum of the counters)/(capacity + 1), where N is the total count, so any value
+            with an exact count higher than N/(capacity + 1) is kept
+        The sketch can be updated chunk by chunk, and two sketches with the same capacity (for example of two users)
+        can be merged, with the same guarantees for the concatenation of their streams.
+
+        Args:
+            capacity - OPTIONAL, the maximum number of counters kept (default 100)
+
+        Methods:
+            __init__(capacity=100)
+            update(values, counts=None)
+            merge(other)
+            add_counts(counts, error, total_count)
+            estimate(values)
+            get_top_items(number_of_items=None)
+            get_error_bound()
+    '''
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.counters = pd.Series([], dtype=np.int64)
+        self.error = 0
+        self.total_count = 0
+
+    def update(self, values, counts=None):
+        '''
+            Counts the values (a list, numpy array or pandas serie, the missing values being ignored), or adds counts
+            (a sequence of the same length) to them if provided.
+        '''
+        if counts is None:
+            value_counts = pd.Series(values, dtype=object).value_counts()
+        else:
+            value_counts = pd.Series(np.asarray(counts, dtype=np.int64), index=pd.Index(values, dtype=object))
+            value_counts = value_counts.groupby(level=0, sort=False).sum()
+        self.add_counts(value_counts, 0, int(value_counts.sum()))
+
+    def merge(self, other):
+        '''
+            Adds the counters of other, a FrequentItemsSketch with the same capacity.
+        '''
+        if self.capacity != other.capacity:
+            raise ValueError('Only sketches with the same capacity can be merged.')
+        self.add_counts(other.counters, other.error, other.total_count)
+
+    def add_counts(self, counts, error, total_count):
+        '''
+            Adds counts (a serie of counts indexed by value, of total_count values with an error of error) to the
+            counters, and keeps at most capacity of them.
+        '''
+        counters = self.counters.add(counts, fill_value=0).astype(np.int64)
+        if counters.shape[0] > self.capacity:
+            threshold = int(counters.nlargest(self.capacity + 1).iloc[-1])
+            counters = counters - threshold
+            counters = counters[counters > 0]
+            self.error += threshold
+        self.counters = counters
+        self.error += error
+        self.total_count += total_count
+
+    def estimate(self, values):
+        '''
+            Returns a numpy array with the count of each of the values (0 for the values not kept). The exact
+            count is between this count and this count + get_error_bound().
+        '''
+        return self.counters.reindex(pd.Index(values, dtype=object), fill_value=0).to_numpy(dtype=np.int64)
+
+    def get_top_items(self, number_of_items=None):
+        '''
+            Returns a dictionary {value:count} of the number_of_items values with the largest counts (all the
+            values kept if number_of_items is None), from the largest count to the smallest.
+        '''
+        top_items = self.counters.sort_values(ascending=False, kind='stable')
+        if number_of_items is not None:
+            top_items = top_items.iloc[:number_of_items]
+        return {value:int(count) for value, count in top_items.items()}
+
+    def get_error_bound(self):
+        '''
+            Returns the maximum difference between the exact count of a value and its count in the sketch.
+        '''
+        return self.error
+
+
+class HyperLogLog():
+
+    '''
+        This class estimates the number of distinct values of a stream (for example distinct tracks), in 2**precision
+        bytes of memory. Each value goes to one of the 2**precision registers according to the first bits of its
+        hash, and each register keeps the largest position of the first bit set to 1 in the rest of the hashes it
+        received. The number of distinct values is estimated from the harmonic mean of the registers (with linear
+        counting for small numbers of values). The relative standard error of the estimate is 1.04/sqrt(2**precision),
+        for example 0.81% for a precision of 14: the estimate is within 3 times this error of the exact number of
+        distinct values in more than 99% of cases.
+        The sketch can be updated chunk by chunk, and two sketches with the same precision and seed (for example of
+        two users) can be merged: the result is the sketch of the union of their values.
+
+        Args:
+            precision - OPTIONAL, the number of bits of the hash choosing the register, between 4 and 18 (default 14)
+            seed - OPTIONAL, the seed of the hash of the values (default 0)
+
+        Methods:
+            __init__(precision=14, seed=0)
+            update(values)
+            merge(other)
+            count()
+            get_relative_error()
+            get_bit_lengths(values)
+    '''
+
+    def __init__(self, precision=14, seed=0):
+        if precision < 4 or precision > 18:
+            raise Exception('The precision of HyperLogLog must be between 4 and 18.')
+        self.precision = precision
+        self.seed = seed
+        self.registers = np.zeros(2**precision, dtype=np.uint8)
+
+    def update(self, values):
+        '''
+            Adds the values (a list, numpy array or pandas serie, the missing values being ignored).
+        '''
+        unique_values = pd.Series(values, dtype=object).dropna().unique()
+        if len(unique_values) == 0:
+            return
+        hashes = Utility.hash_values(unique_values, self.seed)
+        remaining_bits = 64 - self.precision
+        register_indexes = (hashes >> np.uint64(remaining_bits)).astype(np.int64)
+        remaining_hashes = hashes & np.uint64((1 << remaining_bits) - 1)
+        # position of the first bit set to 1 in the remaining bits
+        bit_lengths = HyperLogLog.get_bit_lengths(remaining_hashes)
+        ranks = (remaining_bits - bit_lengths + 1).astype(np.uint8)
+        np.maximum.at(self.registers, register_indexes, ranks)
+
+    def merge(self, other):
+        '''
+            Adds the values of other, a HyperLogLog with the same precision and seed.
+        '''
+        if (self.precision, self.seed) != (other.precision, other.seed):
+            raise ValueError('Only sketches with the same precision and seed can be merged.')
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        '''
+            Returns the estimated number of distinct values.
+        '''
+        registers_count = len(self.registers)
+        alpha = 0.7213/(1 + 1.079/registers_count)
+        estimate = alpha*registers_count**2/np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        empty_registers = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5*registers_count and empty_registers > 0:
+            # linear counting
+            estimate = registers_count*math.log(registers_count/empty_registers)
+        return int(round(estimate))
+
+    def get_relative_error(self):
+        '''
+            Returns the relative standard error of the estimate.
+        '''
+        return 1.04/math.sqrt(len(self.registers))
+
+    @staticmethod
+    def get_bit_lengths(values):
+        '''
+            Returns the number of bits of each of values, a numpy array of uint64 (0 for 0).
+            frexp returns the number of bits of a float, so it is applied to each half of 32 bits of the values,
+            which are exact as floats (a value larger than 2**53 can be rounded up to the next power of 2).
+        '''
+        _, high_bit_lengths = np.frexp((values >> np.uint64(32)).astype(np.float64))
+        _, low_bit_lengths = np.frexp((values & np.uint64(2**32 - 1)).astype(np.float64))
+        return np.where(high_bit_lengths > 0, high_bit_lengths + 32, low_bit_lengths)
+
+
+class SketchAggregator():
+
+    '''
+        This class builds the rankings per year of ranking_targets (see TrackSummaryObject.build_ranking_dict_per_year)
+        and the number of distinct tracks per year from chunks of df_viz, using sketches instead of exact counters, so
+        that its memory doesn't depend on the number of plays, artists or titles. This allows the processing of play
+        logs that don't fit in memory (chunk by chunk), and rollups across users (by merging their aggregators).
+        For each ranking target and each year, it keeps:
+            - a FrequentItemsSketch, for the top items and their counts
+            - a CountMinSketch, for the estimated count of any item
+        and for each year, a HyperLogLog of the tracks ('Title && Artist') played.
+        The error bounds of each sketch are described in its class. The genres of a play are counted separately, as
+        in TrackSummaryObject.build_genres_count_dict (the missing genres are not counted), and the plays with a
+        missing year are not counted.
+
+        Args:
+            capacity - OPTIONAL, the number of counters of each FrequentItemsSketch (default 100)
+            epsilon - OPTIONAL, the epsilon of each CountMinSketch (default 0.001)
+            delta - OPTIONAL, the delta of each CountMinSketch (default 0.01)
+            precision - OPTIONAL, the precision of each HyperLogLog (default 14)
+            ranking_targets - OPTIONAL, the columns of df_viz ranked (default ['Genres', 'Artist', 'Title'])
+
+        Methods:
+            __init__(capacity=100, epsilon=0.001, delta=0.01, precision=14, ranking_targets=None)
+            update(df_viz_chunk)
+            merge(other)
+            get_ranking_dict_per_year(ranking_target, number_of_items=None)
+            estimate_counts(ranking_target, year, items)
+            count_distinct_tracks(year=None)
+            get_target_values(df, ranking_target)
+            get_track_keys(df)
+
+        Example:
+            sketch_aggregator = SketchAggregator(capacity=200)
+            for df_viz_chunk in df_viz_chunks:
+                sketch_aggregator.update(df_viz_chunk)
+            # the aggregator of another user can be merged
+            sketch_aggregator.merge(other_sketch_aggregator)
+            top_artists = sketch_aggregator.get_ranking_dict_per_year('Artist', 10)
+            distinct_tracks = sketch_aggregator.count_distinct_tracks()
+    '''
+
+    default_ranking_targets = ['Genres', 'Artist', 'Title']
+
+    def __init__(self, capacity=100, epsilon=0.001, delta=0.01, precision=14, ranking_targets=None):
+        self.capacity = capacity
+        self.epsilon = epsilon
+        self.delta = delta
+        self.precision = precision
+        self.ranking_targets = ranking_targets if ranking_targets is not None else SketchAggregator.default_ranking_targets
+        # sketches per ranking target and year, of the form {ranking_target:{year:sketch}}
+        self.frequent_items = {ranking_target:{} for ranking_target in self.ranking_targets}
+        self.count_min = {ranking_target:{} for ranking_target in self.ranking_targets}
+        # sketches of the tracks per year, of the form {year:HyperLogLog}
+        self.distinct_tracks = {}
+
+    def update(self, df_viz_chunk):
+        '''
+            Adds the plays of df_viz_chunk (rows of df_viz) to the sketches.
+        '''
+        for year, year_df in df_viz_chunk.groupby('Play_Year', sort=True):
+            for ranking_target in self.ranking_targets:
+                values = SketchAggregator.get_target_values(year_df, ranking_target)
+                if year not in self.frequent_items[ranking_target]:
+                    self.frequent_items[ranking_target][year] = FrequentItemsSketch(self.capacity)
+                    self.count_min[ranking_target][year] = CountMinSketch.from_error_bounds(self.epsilon, self.delta)
+                self.frequent_items[ranking_target][year].update(values)
+                self.count_min[ranking_target][year].update(values)
+            if year not in self.distinct_tracks:
+                self.distinct_tracks[year] = HyperLogLog(self.precision)
+            self.distinct_tracks[year].update(SketchAggregator.get_track_keys(year_df))
+
+    def merge(self, other):
+        '''
+            Adds the sketches of other, a SketchAggregator with the same parameters and ranking_targets (for example
+            of another user).
+        '''
+        if (self.capacity, self.epsilon, self.delta, self.precision) != (other.capacity, other.epsilon, other.delta, other.precision):
+            raise ValueError('Only aggregators with the same parameters can be merged.')
+        if list(self.ranking_targets) != list(other.ranking_targets):
+            raise ValueError('Only aggregators with the same ranking targets can be merged.')
+        for sketches, other_sketches in [(self.frequent_items, other.frequent_items), (self.count_min, other.count_min)]:
+            for ranking_target in self.ranking_targets:
+                for year, sketch in other_sketches.get(ranking_target, {}).items():
+                    if year in sketches[ranking_target]:
+                        sketches[ranking_target][year].merge(sketch)
+                    else:
+                        sketches[ranking_target][year] = copy.deepcopy(sketch)
+        for year, sketch in other.distinct_tracks.items():
+            if year in self.distinct_tracks:
+                self.distinct_tracks[year].merge(sketch)
+            else:
+                self.distinct_tracks[year] = copy.deepcopy(sketch)
+
+    def get_ranking_dict_per_year(self, ranking_target, number_of_items=None):
+        '''
+            Returns a dictionary {year:{item:count}} of the items of ranking_target with the largest counts in each
+            year (at most capacity items, or number_of_items if provided), from the largest count to the smallest,
+            with the counts of the FrequentItemsSketch of each year.
+        '''
+        return {year:sketch.get_top_items(number_of_items) for year, sketch in sorted(self.frequent_items[ranking_target].items())}
+
+    def estimate_counts(self, ranking_target, year, items):
+        '''
+            Returns a numpy array with the estimated count of each of the items of ranking_target in year, from the
+            CountMinSketch of the year (the counts are never lower than the exact counts).
+        '''
+        if year not in self.count_min[ranking_target]:
+            return np.zeros(len(items), dtype=np.int64)
+        return self.count_min[ranking_target][year].estimate(items)
+
+    def count_distinct_tracks(self, year=None):
+        '''
+            Returns the estimated number of distinct tracks played in year, or over all the years if year is None.
+        '''
+        if year is not None:
+            return self.distinct_tracks[year].count() if year in self.distinct_tracks else 0
+        all_years = HyperLogLog(self.precision)
+        for sketch in self.distinct_tracks.values():
+            all_years.merge(sketch)
+        return all_years.count()
+
+    @staticmethod
+    def get_target_values(df, ranking_target):
+        '''
+            Returns the serie of the values of ranking_target of the rows of df, with a value per genre of each
+            row for the genres (separated by '&&' in df_viz, 'Unknown' meaning that the genre is missing, see
+            Utility.clean_col_with_list).
+        '''
+        if ranking_target == 'Genres':
+            genres = df['Genres'].dropna().astype(str).str.split('&&').explode().str.strip()
+            return genres[genres != 'Unknown']
+        return df[ranking_target].dropna()
+
+    @staticmethod
+    def get_track_keys(df):
+        '''
+            Returns the serie of the 'title && artist' keys of the rows of df with a title and an artist
+            (see Utility.concat_title_artist).
+        '''
+        tracks_df = df[['Title', 'Artist']].dropna()
+        return tracks_df['Title'].astype(str).str.strip() + ' && ' + tracks_df['Artist'].astype(str).str.strip()
@@ -0,0 +1,140 @@
+from apple_music_analyser.Utility import Utility
+
+class UserAggregates():
+
+    '''
+        This class holds the aggregates of the plays of a user needed by the classes of DataVisualization, so that
+        the standard charts can be rendered without loading df_viz (or the VisualizationDataframe instance, which
+        holds all the plays and the track instances). The aggregates are:
+            - the time cube of df_viz (see VisualizationDataframe.get_time_cube), for the heat maps and bar charts
+            - the ranking dictionaries per year (see TrackSummaryObject.build_ranking_dict_per_year) of each of the
+            ranking_targets, for the ranking lists and sunbursts. The items with a count of 0 are not kept.
+            - the count of each device model of the library activity ('Transaction Agent Model'), for the pie chart
+
+        The aggregates are computed once, for example after processing an archive (see BatchProcessor), and saved
+        in a small file with save. load reads the file back, and the build_<chart> methods return the instance of
+        the chart class built from the aggregates, ready to be rendered.
+
+        Args:
+            time_cube - the time cube of df_viz
+            rankings - a dictionary {ranking_target:ranking_dict}
+            device_counts - a dictionary {device model:count}
+
+        Methods:
+            __init__(time_cube, rankings, device_counts)
+            from_visualization_dataframe(visualization_dataframe)
+            build_rankings(track_summary_objects, df_viz)
+            save(file_path)
+            load(file_path)
+            get_time_cube()
+            get_ranking_dict(ranking_target)
+            get_device_counts()
+            build_heat_map(with_subplots=1, year=None, month=None)
+            build_bar_chart(with_subplots=0, year=None)
+            build_ranking_list(ranking_target, number_of_items=10)
+            build_sunburst(ranking_target, center_title='', number_of_items=None)
+            build_device_pie_chart(number_of_slices=None)
+
+        Example:
+            # once, after processing the archive of a user
+            UserAggregates.from_visualization_dataframe(viz_df_instance).save('user_aggregates.pkl')
+            # then, to render the charts
+            aggregates = UserAggregates.load('user_aggregates.pkl')
+            heat_map = aggregates.build_heat_map(year=2019)
+            heat_map.render_heat_map('DOW', '2019')
+            heat_map.figure.show()
+    '''
+
+    ranking_targets = ['Genres', 'Artist', 'Title', 'Track_origin']
+
+    def __init__(self, time_cube, rankings, device_counts):
+        self.time_cube = time_cube
+        self.rankings = rankings
+        self.device_counts = device_counts
+
+    @staticmethod
+    def from_visualization_dataframe(visualization_dataframe):
+        '''
+            Returns the aggregates of an instance of VisualizationDataframe (its pipeline is run if needed).
+        '''
+        df_viz = visualization_dataframe.get_df_viz()
+        rankings = UserAggregates.build_rankings(visualization_dataframe.track_summary_objects, df_viz)
+        device_counts = visualization_dataframe.get_library_activity_df()['Transaction Agent Model'].value_counts().to_dict()
+        return UserAggregates(visualization_dataframe.get_time_cube(), rankings, device_counts)
+
+    @staticmethod
+    def build_rankings(track_summary_objects, df_viz):
+        '''
+            Returns a dictionary with the ranking dictionary per year of each of the ranking_targets, without
+            the items with a count of 0.
+        '''
+        rankings = {}
+        for ranking_target in UserAggregates.ranking_targets:
+            ranking_dict = track_summary_objects.build_ranking_dict_per_year(df_viz, ranking_target)
+            rankings[ranking_target] = {year:{item:count for item, count in count_dict.items() if count > 0} for year, count_dict in ranking_dict.items()}
+        return rankings
+
+    def save(self, file_path):
+        '''
+            Saves the aggregates at file_path. The file only contains pandas and python objects, so it can be
+            loaded without this class.
+        '''
+        Utility.save_to_pickle({'time_cube':self.time_cube, 'rankings':self.rankings, 'device_counts':self.device_counts}, file_path)
+
+    @staticmethod
+    def load(file_path):
+        '''
+            Returns the instance of UserAggregates saved at file_path.
+        '''
+        aggregates = Utility.load_from_pickle(file_path)
+        if not isinstance(aggregates, dict) or sorted(aggregates.keys()) != ['device_counts', 'rankings', 'time_cube']:
+            raise Exception('The file {0} does not contain aggregates saved by UserAggregates.save.'.format(file_path))
+        return UserAggregates(aggregates['time_cube'], aggregates['rankings'], aggregates['device_counts'])
+
+    def get_time_cube(self):
+        return self.time_cube
+
+    def get_ranking_dict(self, ranking_target):
+        if ranking_target not in self.rankings:
+            raise Exception('No ranking for {0}. The rankings available are {1}.'.format(ranking_target, list(self.rankings.keys())))
+        return self.rankings[ranking_target]
+
+    def get_device_counts(self):
+        return self.device_counts
+
+    def build_heat_map(self, with_subplots=1, year=None, month=None):
+        '''
+            Returns a pre-aggregated instance of HeatMapVisualization for a year and/or a month, if provided
+            (see HeatMapVisualization.from_time_cube).
+        '''
+        from apple_music_analyser.DataVisualization import HeatMapVisualization
+        return HeatMapVisualization.from_time_cube(self.time_cube, with_subplots, year, month)
+
+    def build_bar_chart(self, with_subplots=0, year=None):
+        '''
+            Returns an instance of BarChartVisualization for a year or a list of years, if provided, whose plots
+            are rendered with render_period_bar_chart (see BarChartVisualization.from_time_cube).
+        '''
+        from apple_music_analyser.DataVisualization import BarChartVisualization
+        return BarChartVisualization.from_time_cube(self.time_cube, with_subplots, year)
+
+    def build_ranking_list(self, ranking_target, number_of_items=10):
+        '''
+            Returns an instance of RankingListVisualization of the ranking of ranking_target.
+        '''
+        from apple_music_analyser.DataVisualization import RankingListVisualization
+        return RankingListVisualization(self.get_ranking_dict(ranking_target), number_of_items)
+
+    def build_sunburst(self, ranking_target, center_title='', number_of_items=None):
+        '''
+            Returns an instance of SunburstVisualization of the ranking of ranking_target.
+        '''
+        from apple_music_analyser.DataVisualization import SunburstVisualization
+        return SunburstVisualization(self.get_ranking_dict(ranking_target), center_title, number_of_items)
+
+    def build_device_pie_chart(self, number_of_slices=None):
+        '''
+            Returns an instance of PieChartVisualization of the devices used, from their counts.
+        '''
+        from apple_music_analyser.DataVisualization import PieChartVisualization
+        return PieChartVisualization(self.device_counts, number_of_slices)
@@ -11,19 +11,31 @@ class Utility():
             get_df_from_archive(archive_path)
             get_df_from_file(file_path
             validate_input_df_files(input_df)
-            parse_date_time_column(df, input_timestamp_col)
-            extract_time_info_from_datetime(datetime_col)
+            parse_date_time_column(df, input_timestamp_col, compact=False)
+            extract_time_info_from_datetime(datetime_col, compact=False)
+            downcast_time_info(serie, dtype)
+            get_day_names(dow_serie)
             convert_to_local_time(datetime_serie, timezone_serie)
+            get_offsets_in_ns(offsets)
             add_time_related_columns(df, datetime_series, col_name_prefix='', col_name_suffix='')
             compute_similarity_score(a, b)
             concat_title_artist(title, artist)
             clean_col_with_list(x)
             compute_ratio_songs(serie)
+            compute_grouped_ratio_songs(df, target_column, group_columns='Play_Year')
+            select_time_period(df, year=None, month=None)
+            hash_values(values, seed=0)
             save_to_pickle(object_to_save, file_path)
             load_from_pickle(path_of_file)
 
     '''
 
+    # value of NaT in the int64 representation of datetimes and timedeltas
+    nat_in_ns = np.iinfo(np.int64).min
+
+    # names of the days of the week, in the order of their number (dt.dayofweek)
+    day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
     @staticmethod
     def get_df_from_archive(archive_path, target_files_dict=None):
         '''
@@ -139,17 +151,18 @@ class Utility():
 
 
     @staticmethod
-    def parse_date_time_column(df, input_timestamp_col):
+    def parse_date_time_column(df, input_timestamp_col, compact=False):
         '''
             This method returns a dictionary of series, parsed from a timestamp serie.
             input_timestamp_col is the name of the column of df containing the timestamp.
             
             This method calls extract_time_info_from_datetime to extract year, month,
-            day of the month, day of the week and hour of the day from the datetime column.
+            day of the month, day of the week and hour of the day from the datetime column
+            (see extract_time_info_from_datetime for the compact format).
 
         '''
         datetime_col = pd.to_datetime(df[input_timestamp_col])
-        year, month, dom, dow, hod = Utility.extract_time_info_from_datetime(datetime_col)
+        year, month, dom, dow, hod = Utility.extract_time_info_from_datetime(datetime_col, compact)
 
         datetime_series = {
             'datetime':datetime_col,
@@ -164,19 +177,52 @@ class Utility():
 
 
     @staticmethod
-    def extract_time_info_from_datetime(datetime_col):
+    def extract_time_info_from_datetime(datetime_col, compact=False):
         '''
             This method extracts year, month, day of the month, day of the week and
             hour of the day from a datetime serie.
+            By default, the day of the week is the name of the day (for example 'Monday'). If compact is True, the
+            day of the week is its number instead (0 for Monday to 6 for Sunday, see get_day_names to get the names back),
+            and all the series are stored as small integers (int16 for the year, int8 for the others).
         '''
         year=datetime_col.dt.year
         month=datetime_col.dt.month
         dom=datetime_col.dt.day
-        dow=datetime_col.dt.day_name()
         hod=datetime_col.dt.hour
+        if compact:
+            dow=Utility.downcast_time_info(datetime_col.dt.dayofweek, 'int8')
+            year=Utility.downcast_time_info(year, 'int16')
+            month=Utility.downcast_time_info(month, 'int8')
+            dom=Utility.downcast_time_info(dom, 'int8')
+            hod=Utility.downcast_time_info(hod, 'int8')
+        else:
+            dow=datetime_col.dt.day_name()
 
         return year, month, dom, dow, hod
 
+    @staticmethod
+    def downcast_time_info(serie, dtype):
+        '''
+            Returns serie converted to the integer dtype (for example 'int8'). If serie has missing values
+            (missing datetimes), the nullable version of dtype is used instead (for example 'Int8').
+        '''
+        if serie.isnull().any():
+            return serie.astype(dtype.capitalize())
+        return serie.astype(dtype)
+
+    @staticmethod
+    def get_day_names(dow_serie):
+        '''
+            Returns the days of the week of dow_serie as names. If dow_serie contains numbers (compact format,
+            see extract_time_info_from_datetime), an ordered categorical serie with the names is returned, so that
+            only the 7 names are stored. Otherwise dow_serie already contains names, and is returned as it is.
+        '''
+        if not pd.api.types.is_numeric_dtype(dow_serie):
+            return dow_serie
+        codes = pd.Series(dow_serie).fillna(-1).astype('int8').to_numpy()
+        day_names = pd.Categorical.from_codes(codes, categories=Utility.day_names, ordered=True)
+        return pd.Series(day_names, index=getattr(dow_serie, 'index', None), name=getattr(dow_serie, 'name', None))
+
     @staticmethod
     def convert_to_local_time(datetime_serie, timezone_serie):
         '''
@@ -185,16 +231,40 @@ class Utility():
             Both must be of the same size. 
             timezone_serie must contain an offset from GMT in seconds, so we validate that the value is in seconds.
             If it is provided in ms or in hours, we convert it to seconds. 
+
+            A user only has a handful of different offsets, so the unit of each distinct offset is guessed
+            once, and the offsets are then added to the datetime values (in nanoseconds) in a single pass.
+        '''
+        codes, offsets = pd.factorize(timezone_serie)
+        offsets_in_ns = Utility.get_offsets_in_ns(offsets)
+        # the code of the missing offsets is -1, so they get the last value of the lookup, NaT
+        offsets_in_ns = np.append(offsets_in_ns, Utility.nat_in_ns)[codes]
+
+        datetime_array = pd.array(datetime_serie)
+        local_time = datetime_array.asi8.copy()
+        missing_values = (local_time == Utility.nat_in_ns) | (offsets_in_ns == Utility.nat_in_ns)
+        local_time += offsets_in_ns
+        local_time[missing_values] = Utility.nat_in_ns
+        local_time = pd.arrays.DatetimeArray(local_time.view('M8[ns]'), dtype=datetime_array.dtype)
+
+        if isinstance(datetime_serie, pd.Series):
+            return pd.Series(local_time, index=datetime_serie.index, name=datetime_serie.name)
+        return pd.DatetimeIndex(local_time, name=getattr(datetime_serie, 'name', None))
+
+    @staticmethod
+    def get_offsets_in_ns(offsets):
         '''
+            Returns an array (int64) with the offsets from GMT in nanoseconds, from an array of offsets
+            in hours, minutes, seconds or milliseconds (see convert_to_local_time).
+        '''
+        offsets = np.asarray(offsets)
         #handles the case where the value provided is in hours
-        timezone_serie = np.where(abs(timezone_serie) <= 12, timezone_serie*3600, timezone_serie)
+        offsets = np.where(abs(offsets) <= 12, offsets*3600, offsets)
         #handles the case where the value provided is in minutes
-        timezone_serie = np.where(abs(timezone_serie/60) <= 12, timezone_serie*60, timezone_serie)
+        offsets = np.where(abs(offsets/60) <= 12, offsets*60, offsets)
         #handles the case where the value provided is in milliseconds
-        timezone_serie = np.where(abs(timezone_serie/3600) <= 12, timezone_serie, timezone_serie/1000)
-
-        timedelta = pd.to_timedelta(timezone_serie, unit='s')
-        return datetime_serie + timedelta
+        offsets = np.where(abs(offsets/3600) <= 12, offsets, offsets/1000)
+        return pd.to_timedelta(offsets, unit='s').asi8
 
     @staticmethod
     def add_time_related_columns(df, datetime_series, col_name_prefix='', col_name_suffix=''):
@@ -263,6 +333,51 @@ class Utility():
         '''
         return (serie.value_counts()/serie.count())*100
 
+    @staticmethod
+    def compute_grouped_ratio_songs(df, target_column, group_columns='Play_Year'):
+        '''
+            Returns the distribution of the values of target_column in each group of rows of df (group_columns is a
+            column name or a list of column names), computed for all the groups at once. The output is a dataframe
+            with a row per group and value, and the columns group_columns, target_column and 'Ratio' (percentage of
+            the rows of the group with this value), sorted by group, then from the largest ratio to the smallest.
+            df is either df_viz, or its time cube, in which case the column Play_count is used to weight the rows.
+        '''
+        if isinstance(group_columns, str):
+            group_columns = [group_columns]
+        else:
+            group_columns = list(group_columns)
+        if 'Play_count' in df.columns:
+            counts = df.groupby(group_columns + [target_column])['Play_count'].sum()
+            counts = counts[counts > 0]
+            ratios = counts/counts.groupby(level=group_columns).transform('sum')*100
+            ratio_df = ratios.rename('Ratio').reset_index()
+            return ratio_df.sort_values(group_columns + ['Ratio'], ascending=[True]*len(group_columns) + [False], kind='stable', ignore_index=True)
+        ratios = df.groupby(group_columns)[target_column].value_counts(normalize=True)*100
+        return ratios.rename('Ratio').reset_index()
+
+    @staticmethod
+    def select_time_period(df, year=None, month=None):
+        '''
+            Returns the rows of df (df_viz, or its time cube) of a year and/or a month (a value or a list of values
+            for each). If neither year nor month is provided, df is returned as it is.
+        '''
+        if year is None and month is None:
+            return df
+        selected_rows = np.ones(df.shape[0], dtype=bool)
+        for column, values in [('Play_Year', year), ('Play_Month', month)]:
+            if values is not None:
+                values = values if pd.api.types.is_list_like(values) else [values]
+                selected_rows &= df[column].isin(values).to_numpy()
+        return df[selected_rows]
+
+    @staticmethod
+    def hash_values(values, seed=0):
+        '''
+            Returns a numpy array with a 64 bits hash (uint64) of each of the values (a list, numpy array or pandas serie).
+            The hashes only depend on the values and the seed, so they are the same from a process to another.
+        '''
+        return pd.util.hash_array(np.asarray(values, dtype=object), hash_key='{0:016d}'.format(seed))
+
     @staticmethod
     def save_to_pickle(object_to_save, file_path):
         '''
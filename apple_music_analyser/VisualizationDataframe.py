@@ -1,9 +1,11 @@
+import os
 import pandas as pd
 import pickle
 
 from apple_music_analyser.Utility import Utility
 from apple_music_analyser.Parser import Parser
 from apple_music_analyser.Process import ProcessTracks, TrackSummaryObject
+from apple_music_analyser.Profiler import Profiler
 
 class VisualizationDataframe():
 
@@ -32,12 +34,20 @@ class VisualizationDataframe():
                 |_ Apple Music Library Activity.json.zip
                 |_ Apple Music Likes and Dislikes.csv
                 |_ Apple Music Activity/Apple Music Play Activity.csv
+            checkpoint_dir - OPTIONAL, a folder where the state of the pipeline is saved after each stage (see below)
+            track_memory - OPTIONAL, boolean, if True the peak memory of each stage is recorded in the profile (see below)
+            max_workers - OPTIONAL, if provided, the library tracks and the play activity are processed in parallel by
+            max_workers processes (see ProcessTracks.process_df_in_parallel), with the same result
+            compact_time_info - OPTIONAL, boolean, if True the time columns (year, month, day of the month, day of the week,
+            hour of the day) are stored as small integers, the day of the week being a number from 0 (Monday) to 6 (Sunday)
+            instead of its name (see Utility.extract_time_info_from_datetime)
 
         Raises:
             raises an exception if the input_df doesn't have the format described above
+            (this is checked when creating the instance)
 
         Methods:
-            __init__(input_df)
+            __init__(input_df, checkpoint_dir=None, track_memory=False, max_workers=None, compact_time_info=False)
             get_df_viz()
             get_source_dataframes()
             get_play_activity_df()
@@ -45,37 +55,118 @@ class VisualizationDataframe():
             get_library_tracks_df()
             get_library_activity_df()
             get_likes_dislikes_df()
+            get_time_cube()
+            build_time_cube(df_viz)
+            get_stage_timings()
+            get_profile(report_path=None)
+            run_pipeline()
+            ensure_stage(stage)
+            run_stage(stage)
+            get_parsed_dataframes()
+            save_checkpoint(stage)
+            load_checkpoint()
+            compute_input_fingerprint(input_df)
             get_df_from_source()
             process_tracks_in_df()
             build_df_visualisation()
+            merge_track_instance_infos(play_activity_df)
+            update(new_input_df)
+            find_new_rows(current_df, new_df)
+            hash_rows(df, columns)
 
         Modules:
-            When creating a new instance of this class, the following process is automatically carried on:
-            1. Create a instance of Parser with the input_df
-            2. The Parser instance has a source_dataframes dictionary that contains the parsed input_df (parsed = cleaned)
-            From this source_dataframes dictionary, get each dataframe.
+            When creating a new instance of this class, only the format of input_df is validated. The attributes are
+            then computed lazily, the first time they are used, following this process:
+            1. Parse each of the input dataframes (parsed = cleaned) with the methods of Parser, and create an instance
+            of Parser with the parsed dataframes
+            2. The source_dataframes dictionary contains the input dataframes, and each parsed dataframe is an attribute.
             3. Create an instance of ProcessTracks
             4. Process each of the individual dataframes
             5. Create an instance of TrackSummaryObject, used in particular to be able to merge infos between dataframes
             6. Build the output df_visualization dataframe
             Refer to the documentation of Parser and Process for more details.
 
+            These steps are run as the stages listed in pipeline_stages, and the time taken by each of them is recorded
+            (see get_stage_timings). Accessing an attribute runs only the stage computing it and the stages it depends on
+            (see attribute_stages and stage_dependencies): for example play_activity_df only requires parsing the play
+            activity, and library_activity_df only requires parsing the library activity, while df_visualization requires
+            all the process stages. run_pipeline computes all the attributes at once.
+            The stages are measured with an instance of Profiler: get_profile returns the duration (and peak memory
+            if track_memory is True) of each stage and of the steps of build_df_visualisation, along with the number of
+            title similarity scores computed by ProcessTracks and the number of rows not matched to a track.
+            If a checkpoint_dir is provided, the state of the pipeline is saved in this folder after each stage: the
+            parsed dataframes, the ProcessTracks instance, and finally the TrackSummaryObject instance (with the
+            dataframe index / track instance matching dictionary) and df_visualization. If the pipeline is interrupted,
+            creating a new instance with the same input_df and checkpoint_dir does not run again the stages completed.
+            The checkpoints of a different input_df are ignored (and overwritten).
+
+            When a new export of the same account is available, the update method can be used instead of creating a
+            new instance: only the rows of the play activity that were not in the previous export are parsed, processed
+            (using the existing track instances) and appended to df_visualization.
+
     '''
 
-    def __init__(self, input_df):
-        self.input_df = input_df
-        self.parser = Parser(input_df)
-        self.source_dataframes = self.parser.source_dataframes
-        self.likes_dislikes_df = None
-        self.play_activity_df = None
-        self.identifier_infos_df = None
-        self.library_tracks_df = None
-        self.library_activity_df = None
-        self.get_df_from_source()
-        self.process_tracks = ProcessTracks()
-        self.process_tracks_in_df()
-        self.track_summary_objects = TrackSummaryObject(self.process_tracks.track_instance_dict, self.process_tracks.artist_tracks_titles, self.process_tracks.genres_list, self.process_tracks.items_not_matched)
-        self.df_visualization = self.build_df_visualisation()
+    pipeline_stages = ['parse_likes_dislikes', 'parse_play_activity', 'parse_identifier_infos', 'parse_library_tracks',
+                       'parse_library_activity', 'parse', 'process_library_tracks', 'process_identifier_infos',
+                       'process_play_activity', 'process_likes_dislikes', 'build_df_visualization']
+
+    # the stages that must be completed before running each stage
+    stage_dependencies = {
+        'parse_likes_dislikes':[],
+        'parse_play_activity':[],
+        'parse_identifier_infos':[],
+        'parse_library_tracks':[],
+        'parse_library_activity':[],
+        'parse':['parse_likes_dislikes', 'parse_play_activity', 'parse_identifier_infos', 'parse_library_tracks', 'parse_library_activity'],
+        'process_library_tracks':['parse_library_tracks'],
+        'process_identifier_infos':['process_library_tracks', 'parse_identifier_infos'],
+        'process_play_activity':['process_identifier_infos', 'parse_play_activity'],
+        'process_likes_dislikes':['process_play_activity', 'parse_likes_dislikes'],
+        'build_df_visualization':['process_likes_dislikes']
+    }
+
+    # the time columns of df_visualization counted in the time cube (see build_time_cube)
+    time_cube_columns = ['Play_Year', 'Play_Month', 'Play_DOM', 'Play_DOW', 'Play_HOD']
+
+    # the stage computing each of the lazy attributes
+    attribute_stages = {
+        'likes_dislikes_df':'parse_likes_dislikes',
+        'play_activity_df':'parse_play_activity',
+        'identifier_infos_df':'parse_identifier_infos',
+        'library_tracks_df':'parse_library_tracks',
+        'library_activity_df':'parse_library_activity',
+        'parser':'parse',
+        'process_tracks':'process_likes_dislikes',
+        'track_summary_objects':'build_df_visualization',
+        'df_visualization':'build_df_visualization'
+    }
+
+    def __init__(self, input_df, checkpoint_dir=None, track_memory=False, max_workers=None, compact_time_info=False):
+        # a copy, so that update doesn't modify the dictionary of the caller
+        self.input_df = dict(input_df) if isinstance(input_df, dict) else input_df
+        self.checkpoint_dir = checkpoint_dir
+        self.max_workers = max_workers
+        self.compact_time_info = compact_time_info
+        # computed from df_visualization the first time get_time_cube is called
+        self.time_cube = None
+        self.profiler = Profiler(track_memory)
+        self.completed_stages = []
+        self.source_dataframes = Parser.parse_input_df(input_df)
+        if self.source_dataframes == {}:
+            raise Exception('No source dataframe provided. Please verify the format of the input_files dictionary you provided.')
+        # the ProcessTracks instance is exposed as process_tracks once all the process stages are completed
+        self.process_tracks_in_progress = ProcessTracks()
+        self.load_checkpoint()
+
+    def __getattr__(self, name):
+        '''
+            Called only when name is not (yet) an attribute of the instance: if name is one of the lazy attributes
+            listed in attribute_stages, its stage (and the stages it depends on) is run, which sets the attribute.
+        '''
+        if name not in VisualizationDataframe.attribute_stages or 'completed_stages' not in self.__dict__:
+            raise AttributeError("'VisualizationDataframe' object has no attribute '{0}'".format(name))
+        self.ensure_stage(VisualizationDataframe.attribute_stages[name])
+        return self.__dict__[name]
 
     def get_df_viz(self):
         return self.df_visualization
@@ -98,39 +189,218 @@ class VisualizationDataframe():
     def get_likes_dislikes_df(self):
         return self.likes_dislikes_df
 
+    def get_time_cube(self):
+        '''
+            Returns the time cube of df_visualization (see build_time_cube). It is built the first time it is
+            requested, and then kept until df_visualization is updated.
+        '''
+        if getattr(self, 'time_cube', None) is None:
+            self.time_cube = VisualizationDataframe.build_time_cube(self.df_visualization)
+        return self.time_cube
+
+    @staticmethod
+    def build_time_cube(df_viz):
+        '''
+            Returns a dataframe with a row per combination of year, month, day of the month, day of the week and hour
+            of the day that has plays in df_viz, with the number of plays ('Play_count') and the sum of their duration
+            ('Play_duration_in_minutes'). Its time columns have the same names as in df_viz, so it can be used in
+            place of df_viz (and filtered the same way on those columns) to build the bar charts and heat maps
+            (see BarChartVisualization.from_time_cube and HeatMapVisualization.from_time_cube), without going
+            through all the plays again. The plays with a missing time are not counted.
+        '''
+        grouped_df = df_viz.groupby(VisualizationDataframe.time_cube_columns, sort=True)
+        time_cube = grouped_df['Play_duration_in_minutes'].agg(['size', 'sum'])
+        time_cube.columns = ['Play_count', 'Play_duration_in_minutes']
+        return time_cube.reset_index()
+
+    def get_stage_timings(self):
+        '''
+            Returns a dictionary with the duration in seconds of each stage of the pipeline run so far.
+            For a pipeline resumed from a checkpoint, the durations of the stages already completed are
+            the ones recorded at the time.
+        '''
+        records = self.profiler.get_records()
+        return {stage:records[stage]['duration'] for stage in self.completed_stages if stage in records}
+
+    def get_profile(self, report_path=None):
+        '''
+            Returns a dictionary describing where the time goes when building the instance:
+                - 'steps': the duration in seconds and the peak memory in bytes (None if track_memory is False)
+                of each stage run so far, and of the steps of build_df_visualisation
+                - 'counters': the number of title similarity scores computed by ProcessTracks ('fuzzy_comparisons'),
+                the number of track instances, and the number of rows not matched for each processed dataframe
+                - 'total_duration': the sum of the durations of the stages
+            If report_path is provided, the profile is also saved there as a json file.
+            Getting the profile doesn't run any stage.
+        '''
+        process_tracks = self.process_tracks_in_progress
+        self.profiler.counters['fuzzy_comparisons'] = process_tracks.comparisons_count
+        self.profiler.counters['track_instances'] = len(set(process_tracks.track_instance_dict.values()))
+        for df_label, items in process_tracks.items_not_matched.items():
+            self.profiler.counters['not_matched_' + df_label] = len(items)
+        profile = self.profiler.get_report()
+        if report_path is not None:
+            Profiler.save_report(profile, report_path)
+        return profile
+
+    def run_pipeline(self):
+        '''
+            Runs all the stages of pipeline_stages that were not completed yet, so that all the attributes are computed.
+        '''
+        for stage in VisualizationDataframe.pipeline_stages:
+            self.ensure_stage(stage)
+
+    def ensure_stage(self, stage):
+        '''
+            Runs stage if it was not completed yet, after the stages it depends on (see stage_dependencies),
+            records its duration with the profiler, and saves a checkpoint.
+        '''
+        if stage in self.completed_stages:
+            return
+        for dependency in VisualizationDataframe.stage_dependencies[stage]:
+            self.ensure_stage(dependency)
+        with self.profiler.timer(stage):
+            self.run_stage(stage)
+        self.completed_stages.append(stage)
+        self.save_checkpoint(stage)
+
+    def run_stage(self, stage):
+        '''
+            Runs a single stage of the pipeline, assuming the stages it depends on are completed.
+            The parse and process stages raise an error if the input could not be validated (source_dataframes is empty).
+        '''
+        if stage == 'build_df_visualization':
+            process_tracks = self.process_tracks
+            self.track_summary_objects = TrackSummaryObject(process_tracks.track_instance_dict, process_tracks.artist_tracks_titles, process_tracks.genres_list, process_tracks.items_not_matched)
+            self.df_visualization = self.build_df_visualisation()
+        elif self.source_dataframes == {}:
+            raise Exception('No source dataframe provided.')
+        elif stage == 'parse_likes_dislikes':
+            self.likes_dislikes_df = Parser.parse_likes_dislikes_df(self.source_dataframes['likes_dislikes_df'])
+        elif stage == 'parse_play_activity':
+            self.play_activity_df = Parser.parse_play_activity_df(self.source_dataframes['play_activity_df'], compact_time_info=self.compact_time_info)
+        elif stage == 'parse_identifier_infos':
+            self.identifier_infos_df = self.source_dataframes['identifier_infos_df']
+        elif stage == 'parse_library_tracks':
+            self.library_tracks_df = Parser.parse_library_tracks_infos_df(self.source_dataframes['library_tracks_df'])
+        elif stage == 'parse_library_activity':
+            self.library_activity_df = Parser.parse_library_activity_df(self.source_dataframes['library_activity_df'], self.compact_time_info)
+        elif stage == 'parse':
+            self.parser = Parser(self.input_df, self.get_parsed_dataframes(), self.compact_time_info)
+        elif stage == 'process_library_tracks' and self.max_workers is not None:
+            self.process_tracks_in_progress.process_df_in_parallel(self.library_tracks_df, 'library_tracks_df', self.max_workers)
+        elif stage == 'process_library_tracks':
+            self.process_tracks_in_progress.process_library_tracks_df(self.library_tracks_df)
+        elif stage == 'process_identifier_infos':
+            self.process_tracks_in_progress.process_identifier_df(self.identifier_infos_df)
+        elif stage == 'process_play_activity' and self.max_workers is not None:
+            self.process_tracks_in_progress.process_df_in_parallel(self.play_activity_df, 'play_activity_df', self.max_workers)
+        elif stage == 'process_play_activity':
+            self.process_tracks_in_progress.process_play_df(self.play_activity_df)
+        elif stage == 'process_likes_dislikes':
+            self.process_tracks_in_progress.process_likes_dislikes_df(self.likes_dislikes_df)
+            self.process_tracks = self.process_tracks_in_progress
+
+    def get_parsed_dataframes(self):
+        '''
+            Returns a dictionary of the parsed dataframes, of the same structure as source_dataframes
+            (the dataframes not parsed yet are parsed).
+        '''
+        return {df_name:getattr(self, df_name) for df_name in ['likes_dislikes_df', 'play_activity_df', 'identifier_infos_df', 'library_tracks_df', 'library_activity_df']}
+
+    def save_checkpoint(self, stage):
+        '''
+            Saves the state of the pipeline after stage in checkpoint_dir (nothing is done if there is no checkpoint_dir):
+                - after a parse stage: the parsed dataframe (for example play_activity_df.pkl)
+                - after the process stages: the ProcessTracks instance (process_tracks.pkl)
+                - after 'build_df_visualization': the ProcessTracks and TrackSummaryObject instances, and
+                df_visualization (df_visualization.pkl)
+            The stages completed, the fingerprint of input_df and the records of the profiler are saved in pipeline_checkpoint.pkl.
+            Each file is written under a temporary name first, so that an interruption never leaves a partial file.
+        '''
+        if self.checkpoint_dir is None or stage == 'parse':
+            return
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        if stage == 'build_df_visualization':
+            checkpoint_files = {'df_visualization.pkl':{'process_tracks':self.process_tracks, 'track_summary_objects':self.track_summary_objects, 'df_visualization':self.df_visualization}}
+        elif stage.startswith('process'):
+            checkpoint_files = {'process_tracks.pkl':self.process_tracks_in_progress}
+        else:
+            df_name = [name for name, attribute_stage in VisualizationDataframe.attribute_stages.items() if attribute_stage == stage][0]
+            checkpoint_files = {df_name + '.pkl':getattr(self, df_name)}
+        completed_stages = [completed_stage for completed_stage in self.completed_stages if completed_stage != 'parse']
+        checkpoint_files['pipeline_checkpoint.pkl'] = {'input_fingerprint':self.input_fingerprint, 'compact_time_info':self.compact_time_info, 'completed_stages':completed_stages, 'profile_records':self.profiler.records}
+        for file_name, object_to_save in checkpoint_files.items():
+            file_path = os.path.join(self.checkpoint_dir, file_name)
+            Utility.save_to_pickle(object_to_save, file_path + '.tmp')
+            os.replace(file_path + '.tmp', file_path)
+
+    def load_checkpoint(self):
+        '''
+            Restores the state of the pipeline from the checkpoint saved in checkpoint_dir, if any, and if it was
+            saved for the same input_df and compact_time_info: the stages completed are not run again.
+            Returns the list of the stages completed.
+        '''
+        if self.checkpoint_dir is None:
+            return self.completed_stages
+        self.input_fingerprint = VisualizationDataframe.compute_input_fingerprint(self.input_df)
+        checkpoint_path = os.path.join(self.checkpoint_dir, 'pipeline_checkpoint.pkl')
+        if not os.path.exists(checkpoint_path):
+            return self.completed_stages
+        checkpoint = Utility.load_from_pickle(checkpoint_path)
+        if checkpoint['input_fingerprint'] != self.input_fingerprint or checkpoint.get('compact_time_info', False) != self.compact_time_info:
+            return self.completed_stages
+
+        completed_stages = checkpoint['completed_stages']
+        for df_name, stage in VisualizationDataframe.attribute_stages.items():
+            if stage.startswith('parse_') and stage in completed_stages:
+                setattr(self, df_name, Utility.load_from_pickle(os.path.join(self.checkpoint_dir, df_name + '.pkl')))
+        if 'build_df_visualization' in completed_stages:
+            saved_output = Utility.load_from_pickle(os.path.join(self.checkpoint_dir, 'df_visualization.pkl'))
+            self.process_tracks = self.process_tracks_in_progress = saved_output['process_tracks']
+            self.track_summary_objects = saved_output['track_summary_objects']
+            self.df_visualization = saved_output['df_visualization']
+        elif 'process_library_tracks' in completed_stages:
+            self.process_tracks_in_progress = Utility.load_from_pickle(os.path.join(self.checkpoint_dir, 'process_tracks.pkl'))
+            if 'process_likes_dislikes' in completed_stages:
+                self.process_tracks = self.process_tracks_in_progress
+        self.completed_stages = list(completed_stages)
+        self.profiler.records = dict(checkpoint['profile_records'])
+        return self.completed_stages
+
+    @staticmethod
+    def compute_input_fingerprint(input_df):
+        '''
+            Returns a value identifying the content of input_df, used to make sure a checkpoint
+            was saved for the same input.
+        '''
+        fingerprint = []
+        for key in sorted(input_df.keys()):
+            df = input_df[key]
+            rows_hash = pd.util.hash_pandas_object(df.astype(str), index=True).sum()
+            fingerprint.append((key, df.shape, tuple(df.columns), int(rows_hash)))
+        return tuple(fingerprint)
+
     def get_df_from_source(self):
         '''
-            Sets dataframes as instance properties.
-            If the parsing of the input failed (Parser.source_dataframes is empty), an error is raised.
+            Parses the dataframes of source_dataframes that were not parsed yet, and sets them as instance properties.
+            If the input could not be validated (source_dataframes is empty), an error is raised.
         '''
         if self.source_dataframes != {}:
-            # we get the parsed likes dislikes df
-            self.likes_dislikes_df = self.parser.likes_dislikes_df
-            # we get the parsed play activity df
-            self.play_activity_df = self.parser.play_activity_df
-            # we get the parsed identifier infos df
-            self.identifier_infos_df = self.parser.identifier_infos_df
-            # we get the parsed library tracks df
-            self.library_tracks_df = self.parser.library_tracks_df
-            # we get the parsed library activity df
-            self.library_activity_df = self.parser.library_activity_df
+            for stage in ['parse_likes_dislikes', 'parse_play_activity', 'parse_identifier_infos', 'parse_library_tracks', 'parse_library_activity']:
+                self.ensure_stage(stage)
         else:
             raise Exception('No source dataframe provided.')
 
     def process_tracks_in_df(self):
         '''
-            Calls the process methods of the ProcessTracks instance on the parsed dataframes.
-            If the parsing of the input failed (Parser.source_dataframes is empty), an error is raised.
+            Calls the process methods of the ProcessTracks instance on the parsed dataframes (for the ones not called yet).
+            If the input could not be validated (source_dataframes is empty), an error is raised.
         '''
         if self.source_dataframes != {}:
-            # we process the library tracks
-            self.process_tracks.process_library_tracks_df(self.library_tracks_df)
-            # # we process the identifier infos
-            self.process_tracks.process_identifier_df(self.identifier_infos_df)
-            # # we process the play activity
-            self.process_tracks.process_play_df(self.play_activity_df)
-            # # we process the likes dislikes
-            self.process_tracks.process_likes_dislikes_df(self.likes_dislikes_df)
+            # we process the library tracks, the identifier infos, the play activity and the likes dislikes
+            for stage in ['process_library_tracks', 'process_identifier_infos', 'process_play_activity', 'process_likes_dislikes']:
+                self.ensure_stage(stage)
         else:
             raise Exception('No source dataframe provided.')
 
@@ -143,12 +413,25 @@ class VisualizationDataframe():
         # build a dict matching the indexes of play_activity that are linked to a track instance
         # note that this is possible since play_activity_df was used to create/update track instances, and that the index
         # of each row used was recorded by the track instance
-        self.track_summary_objects.build_index_track_instance_dict('play_activity')
+        with self.profiler.timer('build_index_track_instance_dict'):
+            self.track_summary_objects.build_index_track_instance_dict('play_activity')
+        with self.profiler.timer('merge_track_instance_infos'):
+            df_visualization = self.merge_track_instance_infos(self.play_activity_df)
+        return df_visualization
+
+    def merge_track_instance_infos(self, play_activity_df):
+        '''
+            Returns play_activity_df (or a subset of its rows) merged with the information of the track instances
+            associated to each of its rows, i.e. the rows of df_visualization matching the rows of play_activity_df.
+            The dataframe index / track instance matching dictionary of track_summary_objects must be built beforehand.
+        '''
         match_index_instance_activity = self.track_summary_objects.match_index_instance
+        if play_activity_df is not self.play_activity_df:
+            match_index_instance_activity = {index:match_index_instance_activity[index] for index in play_activity_df.index if index in match_index_instance_activity}
         # we create a df from this dict
         index_instance_df = pd.DataFrame.from_dict(match_index_instance_activity, orient='index', columns=['Track Instance', 'Library Track', 'Rating', 'Genres'])
         # we remove the existing 'Genre' column of play_activity_df, and merge the two df
-        df_visualization = self.play_activity_df.drop(['Genre'], axis=1, errors='ignore')
+        df_visualization = play_activity_df.drop(['Genre'], axis=1, errors='ignore')
         df_visualization = pd.concat([df_visualization,index_instance_df], axis=1)
         # we clean the added columns: 'Rating' and 'Genres' are lists that we transform into str, and we fill NAN of 'Library Track'
         df_visualization['Rating'] = df_visualization['Rating'].apply(Utility.clean_col_with_list)
@@ -158,9 +441,107 @@ class VisualizationDataframe():
         df_visualization.columns = [c.replace(' ', '_') for c in df_visualization.columns]
         return df_visualization
 
+    def update(self, new_input_df):
+        '''
+            Ingests a new export of the same account, without rebuilding everything from scratch.
+            new_input_df is a dictionary of dataframes of the same format as input_df (only its play_activity_df
+            is actually required).
+            The rows of the new play activity that were not in the current one are detected (see find_new_rows),
+            and only those rows are parsed, processed with the existing ProcessTracks instance (so with the existing
+            track instances and titles of each artist), and appended to df_visualization. The likes dislikes that could
+            not be matched to a track instance so far are processed again, as they may match the tracks of the new rows.
+            The rows of df_visualization of the track instances updated by the new rows are rebuilt as well, as their
+            library flag, genres or rating may have changed.
+            The other dataframes (library tracks, likes dislikes,...) are not updated: if they changed in a way that
+            matters for the analysis, a new instance of VisualizationDataframe should be created instead.
+            If there is a checkpoint_dir, the checkpoint is saved again for the updated input_df.
+            Returns the rows added to df_visualization.
+        '''
+        if 'play_activity_df' not in new_input_df or not isinstance(new_input_df['play_activity_df'], pd.DataFrame):
+            raise Exception('No play activity dataframe provided.')
 
+        # the rows of df_visualization are updated, so it must be built first
+        self.ensure_stage('build_df_visualization')
+        current_play_activity_df = self.input_df['play_activity_df']
+        new_rows = VisualizationDataframe.find_new_rows(current_play_activity_df, new_input_df['play_activity_df'])
+        if new_rows.shape[0] == 0:
+            return self.df_visualization.iloc[0:0]
+        # the new rows get indexes following the current ones, as the track instances and df_visualization
+        # use the index to match a row to a track instance
+        first_new_index = current_play_activity_df.index.max() + 1 if current_play_activity_df.shape[0] > 0 else 0
+        new_rows.index = pd.RangeIndex(first_new_index, first_new_index + new_rows.shape[0])
+        self.input_df = dict(self.input_df, play_activity_df=pd.concat([current_play_activity_df, new_rows]))
+        self.source_dataframes['play_activity_df'] = self.input_df['play_activity_df']
 
+        # we parse and process only the new rows
+        parsed_new_rows = Parser.parse_play_activity_df(new_rows, compact_time_info=self.compact_time_info)
+        self.play_activity_df = pd.concat([self.play_activity_df, parsed_new_rows])
+        if 'parse' in self.completed_stages:
+            self.parser.play_activity_df = self.play_activity_df
+        self.process_tracks.process_play_df(parsed_new_rows)
+        # the likes dislikes that could not be matched before may match the tracks of the new rows
+        likes_dislikes_not_matched = self.process_tracks.items_not_matched['likes_dislikes']
+        self.process_tracks.items_not_matched['likes_dislikes'] = []
+        self.process_tracks.process_likes_dislikes_df(self.likes_dislikes_df.loc[likes_dislikes_not_matched])
+        likes_dislikes_not_matched = set(likes_dislikes_not_matched)
+        self.track_summary_objects.genres_list = TrackSummaryObject.simplify_genre_list(self.process_tracks.genres_list)
 
+        # the new rows may have updated track instances already listened to (library flag, genres, rating), so the
+        # rows of df_visualization of these track instances are rebuilt along with the new rows
+        self.track_summary_objects.build_index_track_instance_dict('play_activity')
+        match_index_instance = self.track_summary_objects.match_index_instance
+        updated_instances = [match_index_instance[index][0] for index in parsed_new_rows.index if index in match_index_instance]
+        for instance in set(self.process_tracks.track_instance_dict.values()):
+            for appearance in instance.appearances:
+                if appearance['source'] == 'likes_dislikes' and appearance['df_index'] in likes_dislikes_not_matched:
+                    updated_instances.append(instance)
+                    break
+        rows_to_build = set(parsed_new_rows.index)
+        for instance in updated_instances:
+            rows_to_build.update([appearance['df_index'] for appearance in instance.appearances if 'play_activity' in appearance['source']])
+        for index in rows_to_build:
+            match_index_instance.pop(index, None)
+        self.track_summary_objects.build_index_track_instance_dict('play_activity')
+        rows_to_build = self.play_activity_df.index[self.play_activity_df.index.isin(rows_to_build)]
+        df_visualization_rows = self.merge_track_instance_infos(self.play_activity_df.loc[rows_to_build])
+        df_visualization_rows = df_visualization_rows.reindex(columns=self.df_visualization.columns)
 
+        # we replace the rebuilt rows, and append the new ones, keeping the order of play_activity_df
+        df_visualization = self.df_visualization.drop(rows_to_build, errors='ignore')
+        self.df_visualization = pd.concat([df_visualization, df_visualization_rows]).loc[self.play_activity_df.index]
+        self.time_cube = None
+        if self.checkpoint_dir is not None:
+            # the checkpoint is now the one of the updated input_df
+            self.input_fingerprint = VisualizationDataframe.compute_input_fingerprint(self.input_df)
+            self.save_checkpoint('parse_play_activity')
+            self.save_checkpoint('build_df_visualization')
+        return self.df_visualization.loc[parsed_new_rows.index]
 
+    @staticmethod
+    def find_new_rows(current_df, new_df):
+        '''
+            Returns the rows of new_df that are not in current_df.
+            Each row is identified with a hash of its values (event timestamps included) on the columns the two
+            dataframes have in common, and with the number of identical rows preceding it, so that a row repeated
+            more times in new_df than in current_df is detected as new as well.
+        '''
+        common_columns = [column for column in current_df.columns if column in new_df.columns]
+        current_keys = VisualizationDataframe.hash_rows(current_df, common_columns)
+        new_keys = VisualizationDataframe.hash_rows(new_df, common_columns)
+        return new_df[~new_keys.isin(current_keys)].copy()
 
+    @staticmethod
+    def hash_rows(df, columns):
+        '''
+            Returns a MultiIndex of (hash of the values of the row, occurrence of this hash so far) for each row of df.
+            The numeric columns are converted to float first, and the values are hashed as strings, so that a column
+            read with a different type in two exports (for example int, and float because of a missing value) still
+            gives the same hash.
+        '''
+        values_df = df[columns].copy()
+        for column in columns:
+            if pd.api.types.is_numeric_dtype(values_df[column]) and not pd.api.types.is_bool_dtype(values_df[column]):
+                values_df[column] = values_df[column].astype('float64')
+        hashes = pd.util.hash_pandas_object(values_df.astype(str), index=False).to_numpy()
+        occurrences = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+        return pd.MultiIndex.from_arrays([hashes, occurrences])
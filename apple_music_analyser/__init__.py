@@ -4,5 +4,26 @@ from apple_music_analyser.Track import Track
 from apple_music_analyser.Query import Query, QueryFactory
 from apple_music_analyser.Parser import Parser
 from apple_music_analyser.Process import ProcessTracks, TrackSummaryObject
+from apple_music_analyser.Profiler import Profiler
 from apple_music_analyser.VisualizationDataframe import VisualizationDataframe
-from apple_music_analyser.DataVisualization import SunburstVisualization, RankingListVisualization, HeatMapVisualization, PieChartVisualization, BarChartVisualization
\ No newline at end of file
+from apple_music_analyser.UserAggregates import UserAggregates
+from apple_music_analyser.Sketches import CountMinSketch, FrequentItemsSketch, HyperLogLog, SketchAggregator
+from apple_music_analyser.BatchProcessor import BatchProcessor
+from apple_music_analyser.FigureExporter import FigureExporter
+
+# the visualization classes are imported on first use, so that parsing and querying don't pay for the import of plotly
+_visualization_classes = ['SunburstVisualization', 'RankingListVisualization', 'HeatMapVisualization', 'PieChartVisualization', 'BarChartVisualization']
+
+__all__ = ['Utility', 'Track', 'Query', 'QueryFactory', 'Parser', 'ProcessTracks', 'TrackSummaryObject', 'Profiler',
+    'VisualizationDataframe', 'UserAggregates', 'CountMinSketch', 'FrequentItemsSketch', 'HyperLogLog', 'SketchAggregator',
+    'BatchProcessor', 'FigureExporter'] + _visualization_classes
+
+# module level __getattr__ and __dir__ need python 3.7 or later (PEP 562)
+def __getattr__(name):
+    if name in _visualization_classes:
+        from apple_music_analyser import DataVisualization
+        return getattr(DataVisualization, name)
+    raise AttributeError('module {0} has no attribute {1}'.format(__name__, name))
+
+def __dir__():
+    return sorted(list(globals().keys()) + _visualization_classes)
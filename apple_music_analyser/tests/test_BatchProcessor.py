@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from apple_music_analyser.Utility import Utility
+from apple_music_analyser.VisualizationDataframe import VisualizationDataframe
+from apple_music_analyser.UserAggregates import UserAggregates
+from apple_music_analyser.BatchProcessor import BatchProcessor
+
+
+class TestBatchProcessor(unittest.TestCase):
+
+    def setUp(self):
+        self.target_files = {
+            'identifier_infos_path' : 'test_df/Apple Music Activity/Identifier Information.json.zip',
+            'library_tracks_path' : 'test_df/Apple Music Activity/Apple Music Library Tracks.json.zip',
+            'library_activity_path': 'test_df/Apple Music Activity/Apple Music Library Activity.json.zip',
+            'likes_dislikes_path' : 'test_df/Apple Music Activity/Apple Music Likes and Dislikes.csv',
+            'play_activity_path': 'test_df/Apple Music Activity/Apple Music Play Activity.csv'
+        }
+        self.temp_dir = tempfile.mkdtemp()
+        self.archive_dir = os.path.join(self.temp_dir, 'archives')
+        self.output_dir = os.path.join(self.temp_dir, 'output')
+        os.makedirs(self.archive_dir)
+        for user in ['user_a', 'user_b']:
+            shutil.copy('apple_music_analyser/tests/test_df.zip', os.path.join(self.archive_dir, user + '.zip'))
+        # not a zip file
+        with open(os.path.join(self.archive_dir, 'user_c.zip'), 'w') as invalid_archive:
+            invalid_archive.write('not an archive')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_from_directory(self):
+        batch_processor = BatchProcessor.from_directory(self.archive_dir, self.output_dir, max_workers=2)
+        self.assertEqual([BatchProcessor.get_user_name(path) for path in batch_processor.archive_paths], ['user_a', 'user_b', 'user_c'])
+        self.assertEqual(batch_processor.max_workers, 2)
+
+    def test_from_manifest(self):
+        manifest_path = os.path.join(self.temp_dir, 'manifest.txt')
+        with open(manifest_path, 'w') as manifest:
+            manifest.write('# archives of the night\narchives/user_b.zip\n\narchives/user_a.zip\n')
+        batch_processor = BatchProcessor.from_manifest(manifest_path, self.output_dir)
+        self.assertEqual(batch_processor.archive_paths, [os.path.join(self.temp_dir, 'archives/user_b.zip'), os.path.join(self.temp_dir, 'archives/user_a.zip')])
+
+    def test_init_duplicated_user_names(self):
+        with self.assertRaises(Exception):
+            BatchProcessor(['first/user_a.zip', 'second/user_a.zip'], self.output_dir)
+
+    def test_run(self):
+        batch_processor = BatchProcessor.from_directory(self.archive_dir, self.output_dir, max_workers=2, target_files_dict=self.target_files)
+        result = batch_processor.run()
+        self.assertEqual(result['User'].tolist(), ['user_a', 'user_b', 'user_c'])
+        self.assertEqual(result['Status'].tolist(), ['done', 'done', 'failed'])
+        self.assertTrue(os.path.isfile(os.path.join(self.output_dir, 'summary.csv')))
+        # the failure of an archive is isolated and reported
+        self.assertIn('BadZipFile', result.loc[2, 'Error'])
+        self.assertEqual(result.loc[2, 'Snapshot'], None)
+        # the snapshots hold the processed instance, and the timings of each stage are in the summary
+        snapshot = Utility.load_from_pickle(result.loc[0, 'Snapshot'])
+        self.assertTrue(isinstance(snapshot, VisualizationDataframe))
+        self.assertEqual(snapshot.get_df_viz().shape[0], result.loc[0, 'Play_count'])
+        for stage in VisualizationDataframe.pipeline_stages:
+            self.assertTrue(result.loc[0, stage] >= 0)
+        self.assertTrue(result.loc[0, 'Duration'] >= result.loc[0, 'build_df_visualization'])
+        self.assertTrue(result.loc[0, 'Peak_memory'] > 0)
+        self.assertTrue(result['Aggregates'].isnull().all())
+
+    def test_run_save_aggregates(self):
+        batch_processor = BatchProcessor([os.path.join(self.archive_dir, 'user_a.zip')], self.output_dir, target_files_dict=self.target_files, save_aggregates=True)
+        result = batch_processor.run()
+        self.assertEqual(result.loc[0, 'Aggregates'], os.path.join(self.output_dir, 'user_a.aggregates.pkl'))
+        aggregates = UserAggregates.load(result.loc[0, 'Aggregates'])
+        self.assertEqual(aggregates.get_time_cube()['Play_count'].sum(), result.loc[0, 'Play_count'])
+        self.assertTrue(result.loc[0, 'save_aggregates'] >= 0)
+
+    def test_run_time_limit(self):
+        batch_processor = BatchProcessor([os.path.join(self.archive_dir, 'user_a.zip')], self.output_dir, time_limit=1, target_files_dict=self.target_files)
+        with patch('apple_music_analyser.BatchProcessor.BatchProcessor.process_archive', side_effect=lambda *args: time.sleep(30)):
+            result = batch_processor.run()
+        self.assertEqual(result.loc[0, 'Status'], 'timeout')
+        self.assertTrue(result.loc[0, 'Duration'] < 30)
+
+    def test_run_memory_limit(self):
+        batch_processor = BatchProcessor([os.path.join(self.archive_dir, 'user_a.zip')], self.output_dir, memory_limit=10**9, target_files_dict=self.target_files)
+        with patch('apple_music_analyser.BatchProcessor.BatchProcessor.process_archive', side_effect=lambda *args: bytearray(2*10**9)):
+            result = batch_processor.run()
+        self.assertEqual(result.loc[0, 'Status'], 'failed')
+        self.assertIn('MemoryError', result.loc[0, 'Error'])
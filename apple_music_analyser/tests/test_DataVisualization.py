@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+import unittest
+
+from apple_music_analyser.Utility import Utility
+from apple_music_analyser.VisualizationDataframe import VisualizationDataframe
+from apple_music_analyser.DataVisualization import SunburstVisualization, RankingListVisualization, HeatMapVisualization, PieChartVisualization, BarChartVisualization
+
+
+class TestSunburstVisualization(unittest.TestCase):
+
+    def setUp(self):
+        self.viz_dict = {
+            2019: {'Rock': 5, 'Pop': 3, 'Jazz': 3, 'Dance': 1},
+            2020: {'Pop': 2}
+        }
+
+    def test_build_sunburst_arrays(self):
+        sunburst = SunburstVisualization(self.viz_dict, 'Genre')
+        self.assertEqual(sunburst.ids, ['2019', '2019 - Rock', '2019 - Pop', '2019 - Jazz', '2019 - Dance', '2020', '2020 - Pop'])
+        self.assertEqual(sunburst.labels, ['2019', 'Rock', 'Pop', 'Jazz', 'Dance', '2020', 'Pop'])
+        self.assertEqual(sunburst.parents, ['Genre', '2019', '2019', '2019', '2019', 'Genre', '2020'])
+        self.assertEqual(sunburst.values, [12, 5, 3, 3, 1, 2, 2])
+
+    def test_build_sunburst_arrays_number_of_items(self):
+        sunburst = SunburstVisualization(self.viz_dict, 'Genre', number_of_items=2)
+        # the ties keep the order of the rows, and the other items are summed up
+        self.assertEqual(sunburst.ids, ['2019', '2019 - Rock', '2019 - Pop', '2019 - Other', '2020', '2020 - Pop'])
+        self.assertEqual(sunburst.values, [12, 5, 3, 4, 2, 2])
+
+    def test_build_sunburst_arrays_real_other_item(self):
+        # a real item 'Other' is not merged with the grouped items
+        sunburst = SunburstVisualization({2019: {'Other': 5, 'A': 10, 'B': 1, 'C': 1}}, 'Genre', number_of_items=2)
+        self.assertEqual(sunburst.ids, ['2019', '2019 - Other', '2019 - A', '2019 - Other (grouped)'])
+        self.assertEqual(sunburst.labels, ['2019', 'Other', 'A', 'Other (grouped)'])
+        self.assertEqual(sunburst.values, [17, 5, 10, 2])
+
+    def test_build_sunburst_arrays_long_df(self):
+        long_df = SunburstVisualization.build_long_df(self.viz_dict)
+        self.assertEqual(long_df.columns.tolist(), ['Year', 'Label', 'Count'])
+        self.assertEqual(long_df.shape[0], 5)
+        from_df = SunburstVisualization(long_df, 'Genre', number_of_items=2)
+        from_dict = SunburstVisualization(self.viz_dict, 'Genre', number_of_items=2)
+        self.assertEqual((from_df.ids, from_df.labels, from_df.parents, from_df.values),
+            (from_dict.ids, from_dict.labels, from_dict.parents, from_dict.values))
+
+    def test_build_sunburst_arrays_empty_year(self):
+        # a year without any item is kept, with a count of 0
+        viz_dict = {2019: {}, 2020: {'a': 1}}
+        sunburst = SunburstVisualization(viz_dict, 'Genre')
+        self.assertEqual(sunburst.ids, ['2019', '2020', '2020 - a'])
+        self.assertEqual(sunburst.labels, ['2019', '2020', 'a'])
+        self.assertEqual(sunburst.parents, ['Genre', 'Genre', '2020'])
+        self.assertEqual(sunburst.values, [0, 1, 1])
+        long_df = SunburstVisualization.build_long_df(viz_dict)
+        self.assertEqual(SunburstVisualization.compute_sunburst_arrays(long_df, 'Genre', years=[2019, 2020]),
+            (sunburst.ids, sunburst.labels, sunburst.parents, sunburst.values))
+        self.assertEqual(SunburstVisualization(viz_dict, 'Genre', number_of_items=1).values, [0, 1, 1])
+        self.assertEqual(SunburstVisualization({2019: {}}, 'Genre').ids, ['2019'])
+
+
+class TestRankingListVisualization(unittest.TestCase):
+
+    def setUp(self):
+        self.viz_dict = {
+            2019: {'Pop': 3, 'Rock': 5, 'Jazz': 3, 'Dance': 1, 'Soundtrack': 5},
+            2020: {'Pop': 2}
+        }
+
+    def test_rank_items_in_dict(self):
+        result = RankingListVisualization(self.viz_dict, 3).get_ranked_dict()
+        # the ties keep the order of the dictionary
+        self.assertEqual(list(result[2019].items()), [('Rock', 5), ('Soundtrack', 5), ('Pop', 3)])
+        self.assertEqual(result[2020], {'Pop': 2})
+
+    def test_select_top_items(self):
+        rng = np.random.default_rng(0)
+        for size in [10, RankingListVisualization.array_ranking_min_size + 500]:
+            count_dict = {'item_' + str(position):int(count) for position, count in enumerate(rng.integers(0, 20, size))}
+            for number_of_items in [0, 1, 7, 50, size + 1]:
+                expected = sorted(count_dict, key=count_dict.get, reverse=True)[:number_of_items]
+                self.assertEqual(RankingListVisualization.select_top_items(count_dict, number_of_items), expected)
+
+    def test_get_ranked_dicts(self):
+        ranking = RankingListVisualization(self.viz_dict)
+        result = ranking.get_ranked_dicts([1, 4])
+        self.assertEqual(list(result.keys()), [1, 4])
+        self.assertEqual(result[1], RankingListVisualization(self.viz_dict, 1).get_ranked_dict())
+        self.assertEqual(result[4], RankingListVisualization(self.viz_dict, 4).get_ranked_dict())
+
+
+class TestHeatMapVisualization(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Play_Year':[2019, 2019, 2020, 2020, 2020],
+            'Play_Month':[1, 1, 12, 2, np.nan],
+            'Play_DOM':[1, 1, 31, 28, 3],
+            'Play_DOW':['Wednesday', 'Wednesday', 'Thursday', 'Friday', 'Monday'],
+            'Play_HOD':[0, 0, 23, 12, 5],
+            'Play_duration_in_minutes':[2.5, 1.0, 3.0, np.nan, 4.0]
+        })
+
+    def test_compute_heat_map_grid_dom(self):
+        x_values, y_values, grid = HeatMapVisualization.compute_heat_map_grid(self.df, 'DOM')
+        self.assertEqual(x_values, list(range(1, 13)))
+        self.assertEqual(y_values, list(range(1, 32)))
+        self.assertEqual(grid.shape, (31, 12))
+        self.assertEqual(grid[0, 0], 3.5)
+        self.assertEqual(grid[30, 11], 3.0)
+        # the plays with a missing month or duration are ignored
+        self.assertEqual(grid.sum(), 6.5)
+
+    def test_compute_heat_map_grid_dow(self):
+        x_values, y_values, grid = HeatMapVisualization.compute_heat_map_grid(self.df, 'DOW')
+        self.assertEqual(x_values, Utility.day_names)
+        self.assertEqual(grid.shape, (24, 7))
+        self.assertEqual(grid[0, 2], 3.5)
+        self.assertEqual(grid[23, 3], 3.0)
+        self.assertEqual(grid[5, 0], 4.0)
+        # the days of the week can be numbers (compact time columns)
+        compact_df = self.df.assign(Play_DOW=pd.Series([2, 2, 3, 4, 0], dtype='int8'))
+        self.assertTrue(np.array_equal(HeatMapVisualization.compute_heat_map_grid(compact_df, 'DOW')[2], grid))
+
+    def test_render_heat_map_pre_aggregated(self):
+        heat_map = HeatMapVisualization(self.df, 2, pre_aggregated=True)
+        heat_map.render_heat_map('DOM', '2020')
+        heat_map.render_heat_map('DOW', '2020')
+        self.assertEqual([trace.type for trace in heat_map.figure.data], ['heatmap', 'heatmap'])
+        self.assertEqual(np.array(heat_map.figure.data[1].z).shape, (24, 7))
+        self.assertEqual(heat_map.height, 1000)
+
+    def test_from_time_cube(self):
+        time_cube = VisualizationDataframe.build_time_cube(self.df)
+        heat_map = HeatMapVisualization.from_time_cube(time_cube, year=2019)
+        self.assertTrue(heat_map.pre_aggregated)
+        self.assertEqual(heat_map.df['Play_count'].sum(), 2)
+        expected = HeatMapVisualization.compute_heat_map_grid(self.df[self.df['Play_Year']==2019], 'DOW')[2]
+        self.assertTrue(np.array_equal(HeatMapVisualization.compute_heat_map_grid(heat_map.df, 'DOW')[2], expected))
+
+    def test_render_batch(self):
+        heat_map = HeatMapVisualization(self.df, 2, pre_aggregated=True)
+        batch_heat_map = HeatMapVisualization(self.df, 2, pre_aggregated=True, batch_rendering=True)
+        for rendered_heat_map in [heat_map, batch_heat_map]:
+            rendered_heat_map.render_heat_map('DOM', '2019')
+            rendered_heat_map.render_heat_map('DOW', '2020')
+        # the traces are only added by render_batch
+        self.assertEqual(len(batch_heat_map.figure.data), 0)
+        batch_heat_map.render_batch()
+        self.assertEqual(batch_heat_map.figure.to_json(), heat_map.figure.to_json())
+
+
+class TestPieChartVisualization(unittest.TestCase):
+
+    def setUp(self):
+        self.serie = pd.Series(['iPhone', 'Mac', 'Mac', 'iPad', 'iPad', 'iPad', 'Web'])
+
+    def test_compute_pie_counts(self):
+        self.assertEqual(PieChartVisualization.compute_pie_counts(self.serie), (['iPad', 'Mac', 'iPhone', 'Web'], [3, 2, 1, 1]))
+        self.assertEqual(PieChartVisualization.compute_pie_counts(self.serie, 2), (['iPad', 'Mac', 'Other'], [3, 2, 2]))
+        # counts provided as a dictionary, or as a serie of counts
+        self.assertEqual(PieChartVisualization.compute_pie_counts({'Mac':1, 'iPad':5, 'Web':5}, 1), (['iPad', 'Other'], [5, 6]))
+        self.assertEqual(PieChartVisualization.compute_pie_counts(self.serie.value_counts(), 2, pre_aggregated=True), (['iPad', 'Mac', 'Other'], [3, 2, 2]))
+        # the grouped labels get their own slice, whose label doesn't collide with a label 'Other'
+        self.assertEqual(PieChartVisualization.compute_pie_counts({'Other':4, 'Mac':2, 'Web':1}, 2), (['Other', 'Mac', 'Other (grouped)'], [4, 2, 1]))
+        self.assertEqual(PieChartVisualization.compute_pie_counts({'a':3, 'Other':1, 'b':2, 'c':1}, 2), (['a', 'b', 'Other (grouped)'], [3, 2, 2]))
+
+    def test_render_pie_chart(self):
+        pie_chart = PieChartVisualization(self.serie, number_of_slices=2)
+        pie_chart.render_pie_chart()
+        self.assertEqual(list(pie_chart.figure.data[0].labels), ['iPad', 'Mac', 'Other'])
+        self.assertEqual(list(pie_chart.figure.data[0].values), [3, 2, 2])
+
+
+class TestBarChartVisualization(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Play_Year':[2019, 2019, 2019, 2020],
+            'Play_Month':[3, 1, 1, 1],
+            'Play_DOM':[1, 2, 2, 3],
+            'Play_DOW':['Sunday', 'Monday', 'Monday', 'Tuesday'],
+            'Play_HOD':[10, 11, 11, 12],
+            'Play_duration_in_minutes':[1.0, 2.0, 3.0, 4.0]
+        })
+        self.time_cube = VisualizationDataframe.build_time_cube(self.df)
+
+    def test_compute_period_counts(self):
+        self.assertEqual(BarChartVisualization.compute_period_counts(self.df, 'Month'), ([1, 3], [3, 1]))
+        self.assertEqual(BarChartVisualization.compute_period_counts(self.df, 'DOW'), (['Monday', 'Tuesday', 'Sunday'], [2, 1, 1]))
+        self.assertEqual(BarChartVisualization.compute_period_counts(self.df, 'HOD', ratio=True), ([10, 11, 12], [25.0, 50.0, 25.0]))
+        # the time cube gives the same counts
+        self.assertEqual(BarChartVisualization.compute_period_counts(self.time_cube, 'DOW'), (['Monday', 'Tuesday', 'Sunday'], [2, 1, 1]))
+        # days of the week as numbers (compact time columns)
+        compact_df = self.df.assign(Play_DOW=pd.Series([6, 0, 0, 1], dtype='int8'))
+        self.assertEqual(BarChartVisualization.compute_period_counts(compact_df, 'DOW'), (['Monday', 'Tuesday', 'Sunday'], [2, 1, 1]))
+
+    def test_render_period_bar_chart(self):
+        bar_chart = BarChartVisualization.from_time_cube(self.time_cube)
+        bar_chart.render_period_bar_chart('Month', '2019', year=2019)
+        bar_chart.render_period_bar_chart('Month', '2020', year=[2020])
+        self.assertEqual(list(bar_chart.figure.data[0].x), [1, 3])
+        self.assertEqual(list(bar_chart.figure.data[0].y), [2, 1])
+        self.assertEqual(list(bar_chart.figure.data[1].y), [1])
+
+    def test_render_grouped_bar_chart(self):
+        bar_chart = BarChartVisualization(self.df)
+        bar_chart.render_grouped_bar_chart(Utility.compute_grouped_ratio_songs(self.df, 'Play_DOW'), 'Play_DOW')
+        self.assertEqual([trace.name for trace in bar_chart.figure.data], ['2019', '2020'])
+        self.assertEqual(list(bar_chart.figure.data[0].x), ['Monday', 'Sunday'])
+        self.assertEqual([round(y, 2) for y in bar_chart.figure.data[0].y], [66.67, 33.33])
+        # the days of the week in compact format (numbers) are displayed with their names
+        compact_df = self.df.assign(Play_DOW=self.df['Play_DOW'].map(Utility.day_names.index).astype('int8'))
+        compact_bar_chart = BarChartVisualization(compact_df)
+        compact_bar_chart.render_grouped_bar_chart(Utility.compute_grouped_ratio_songs(compact_df, 'Play_DOW'), 'Play_DOW')
+        self.assertEqual(list(compact_bar_chart.figure.data[0].x), ['Monday', 'Sunday'])
+        self.assertEqual(list(compact_bar_chart.figure.data[1].x), ['Tuesday'])
+
+    def test_render_batch(self):
+        for with_subplots in [0, 2]:
+            bar_chart = BarChartVisualization.from_time_cube(self.time_cube, with_subplots)
+            batch_bar_chart = BarChartVisualization.from_time_cube(self.time_cube, with_subplots, batch_rendering=True)
+            for rendered_bar_chart in [bar_chart, batch_bar_chart]:
+                rendered_bar_chart.render_period_bar_chart('Month', '2019', year=2019)
+                rendered_bar_chart.render_period_bar_chart('Month', '2020', year=2020)
+            self.assertEqual(len(batch_bar_chart.figure.data), 0)
+            batch_bar_chart.render_batch()
+            self.assertEqual(batch_bar_chart.figure.to_json(), bar_chart.figure.to_json())
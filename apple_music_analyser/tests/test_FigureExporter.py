@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import plotly.graph_objs as go
+
+from apple_music_analyser.FigureExporter import FigureExporter
+
+
+class TestFigureExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.figure = go.Figure(go.Heatmap(z=np.arange(6, dtype=float).reshape(2, 3), x=[1, 2, 3], y=['a', 'b']))
+        self.figure.update_layout(title='User 1')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_encode_array(self):
+        result = FigureExporter.encode_array(np.array([1, 2, 300]))
+        self.assertEqual(result['dtype'], 'i2')
+        self.assertTrue(np.array_equal(FigureExporter.decode_array(result), [1, 2, 300]))
+        result = FigureExporter.encode_array(np.array([[1.5, -2], [3, 4]]))
+        self.assertEqual((result['dtype'], result['shape']), ('f8', '2,2'))
+        self.assertTrue(np.array_equal(FigureExporter.decode_array(result), [[1.5, -2], [3, 4]]))
+
+    def test_figure_to_dict(self):
+        result = FigureExporter(typed_arrays=True).figure_to_dict(self.figure)
+        trace = result['data'][0]
+        self.assertEqual(trace['z']['shape'], '2,3')
+        self.assertEqual(trace['x']['dtype'], 'i1')
+        # the arrays of strings are not encoded
+        self.assertEqual(trace['y'], ['a', 'b'])
+        # by default, the arrays are written as lists, readable by any version of plotly.js
+        result = FigureExporter().figure_to_dict(self.figure)
+        self.assertEqual(result['data'][0]['z'], [[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]])
+        self.assertEqual(result['data'][0]['x'], [1, 2, 3])
+
+    def test_write_figure(self):
+        file_path = os.path.join(self.temp_dir, 'figure.json')
+        FigureExporter(typed_arrays=True).write_figure(self.figure, file_path)
+        with open(file_path, 'r') as figure_file:
+            self.assertNotIn(', ', figure_file.read())
+        result = go.Figure(FigureExporter.read_figure(file_path))
+        self.assertEqual(json.loads(result.to_json()), json.loads(self.figure.to_json()))
+
+    def test_write_batch(self):
+        other_figure = go.Figure(self.figure)
+        other_figure.update_layout(title='User 2', height=300)
+        result = FigureExporter().write_batch({'user_1':{'heat_map':self.figure}, 'user_2':{'heat_map':other_figure}}, self.temp_dir)
+        self.assertTrue(os.path.isfile(os.path.join(self.temp_dir, 'templates', 'heat_map.json')))
+        with open(result['user_2']['heat_map'], 'r') as figure_file:
+            figure_dict = json.load(figure_file)
+        # only the difference with the layout of the first user is written
+        self.assertEqual(set(figure_dict['layout'].keys()), {'title', 'height'})
+        for user, figure in [('user_1', self.figure), ('user_2', other_figure)]:
+            read_figure = go.Figure(FigureExporter.read_figure(result[user]['heat_map']))
+            self.assertEqual(json.loads(read_figure.to_json()), json.loads(figure.to_json()))
+
+    def test_layout_diff(self):
+        layout_template = {'title':{'text':'A', 'x':0.5}, 'height':500, 'width':300}
+        layout = {'title':{'text':'B', 'x':0.5}, 'height':500}
+        result = FigureExporter.get_layout_diff(layout, layout_template)
+        self.assertEqual(result, {'width':None, 'title':{'text':'B'}})
+        self.assertEqual(FigureExporter.merge_layout(layout_template, result), layout)
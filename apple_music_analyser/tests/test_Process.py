@@ -79,6 +79,8 @@ class TestProcess(unittest.TestCase):
         self.assertEqual(result_no_match, 'No match')
         result_match = self.process.compare_titles_for_artist('Artist_1', 'Title_2')
         self.assertTrue(isinstance(result_match, Track))
+        # two titles compared without match, then one compared with a match
+        self.assertEqual(self.process.get_comparisons_count(), 3)
 
 
     def test_update_track_instance_play(self):
@@ -144,6 +146,46 @@ class TestProcess(unittest.TestCase):
         self.assertEqual(self.process.track_instance_dict['The Unforgiven && Metallica'].apple_music_id, [])
 
 
+    def test_process_df_in_parallel(self):
+        self.process.process_library_tracks_df(self.library_tracks_df)
+        self.process.process_identifier_df(self.identifier_infos_df)
+        self.process.process_play_df(self.play_activity_df)
+        result = ProcessTracks()
+        result.process_df_in_parallel(self.library_tracks_df, 'library_tracks_df', max_workers=2)
+        result.process_identifier_df(self.identifier_infos_df)
+        result.process_df_in_parallel(self.play_activity_df, 'play_activity_df', max_workers=2, shards_count=5)
+        # the result is the same as when processing the rows one by one, including the identifiers and the order
+        self.assertEqual(result.increment, self.process.increment)
+        self.assertEqual(list(result.track_instance_dict.keys()), list(self.process.track_instance_dict.keys()))
+        for key, track_instance in self.process.track_instance_dict.items():
+            result_instance = result.track_instance_dict[key]
+            self.assertEqual(result_instance.identifier, track_instance.identifier)
+            self.assertEqual(result_instance.titles, track_instance.titles)
+            self.assertEqual(result_instance.appearances, track_instance.appearances)
+            self.assertEqual(result_instance.apple_music_id, track_instance.apple_music_id)
+            self.assertEqual(result_instance.is_in_lib, track_instance.is_in_lib)
+        self.assertEqual(list(result.artist_tracks_titles.items()), list(self.process.artist_tracks_titles.items()))
+        self.assertEqual([str(genre) for genre in result.genres_list], [str(genre) for genre in self.process.genres_list])
+        self.assertEqual(result.items_not_matched, self.process.items_not_matched)
+        self.assertEqual(result.comparisons_count, self.process.comparisons_count)
+        # the keys associated to the same track instance are still associated to the same object
+        self.assertEqual(len(set(result.track_instance_dict.values())), len(set(self.process.track_instance_dict.values())))
+
+    def test_process_df_in_parallel_artist_whitespace_variants(self):
+        # the row of 'X ' with the title of 'X' doesn't add 'X ' to artist_tracks_titles, the last one does
+        play_activity_df = self.play_activity_df[self.play_activity_df['Title'].astype(str) != 'nan'].head(4).copy()
+        play_activity_df['Title'] = ['Title_1', 'Title_1', 'Title_2', 'Title_3']
+        play_activity_df['Artist'] = ['X', 'X ', 'Y', 'X ']
+        self.process.process_play_df(play_activity_df)
+        self.assertEqual(list(self.process.artist_tracks_titles.keys()), ['X', 'Y', 'X '])
+        result = ProcessTracks()
+        result.process_df_in_parallel(play_activity_df, 'play_activity_df', max_workers=2, shards_count=1)
+        self.assertEqual(list(result.artist_tracks_titles.items()), list(self.process.artist_tracks_titles.items()))
+        self.assertEqual(list(result.track_instance_dict.keys()), list(self.process.track_instance_dict.keys()))
+
+    def test_process_df_in_parallel_other_df(self):
+        self.assertRaises(Exception, self.process.process_df_in_parallel, self.likes_dislikes_df, 'likes_dislikes_df')
+
     def test_process_likes_dislikes_df(self):
         # we expect modifications of the process objects only if they are not empty
         self.process.process_likes_dislikes_df(self.likes_dislikes_df)
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import patch
+
+from apple_music_analyser.Profiler import Profiler
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = Profiler()
+
+    def test_init_profiler(self):
+        self.assertTrue(isinstance(self.profiler, Profiler))
+        self.assertEqual(self.profiler.track_memory, False)
+        self.assertEqual(self.profiler.get_records(), {})
+        self.assertEqual(self.profiler.get_counters(), {})
+
+    def test_timer(self):
+        with self.profiler.timer('step'):
+            with self.profiler.timer('sub_step'):
+                pass
+        result = self.profiler.get_records()
+        self.assertEqual(list(result.keys()), ['step/sub_step', 'step'])
+        self.assertTrue(result['step']['duration'] >= result['step/sub_step']['duration'])
+        self.assertEqual(result['step']['peak_memory'], None)
+
+    def test_timer_exception(self):
+        with self.assertRaises(ValueError):
+            with self.profiler.timer('step'):
+                raise ValueError()
+        self.assertIn('step', self.profiler.get_records())
+        self.assertEqual(self.profiler.running_steps, [])
+
+    def test_timer_track_memory(self):
+        profiler = Profiler(track_memory=True)
+        with profiler.timer('step'):
+            with profiler.timer('sub_step'):
+                data = bytearray(10**6)
+                del data
+            data = bytearray(10**5)
+        result = profiler.get_records()
+        self.assertTrue(result['step/sub_step']['peak_memory'] >= 10**6)
+        # the peak of a step includes the peak of its sub steps
+        self.assertTrue(result['step']['peak_memory'] >= result['step/sub_step']['peak_memory'])
+
+    def test_timer_track_memory_without_reset_peak(self):
+        # tracemalloc.reset_peak is not available before python 3.9
+        with patch('apple_music_analyser.Profiler.tracemalloc', wraps=tracemalloc) as mocked_tracemalloc:
+            del mocked_tracemalloc.reset_peak
+            profiler = Profiler(track_memory=True)
+            with profiler.timer('step'):
+                with profiler.timer('sub_step'):
+                    data = bytearray(10**6)
+                    del data
+        result = profiler.get_records()
+        self.assertTrue(result['step/sub_step']['peak_memory'] >= 10**6)
+        self.assertTrue(result['step']['peak_memory'] >= result['step/sub_step']['peak_memory'])
+        mocked_tracemalloc.clear_traces.assert_called()
+
+    def test_increment(self):
+        self.profiler.increment('counter')
+        self.profiler.increment('counter', 2)
+        self.assertEqual(self.profiler.get_counters(), {'counter':3})
+
+    def test_get_report(self):
+        with self.profiler.timer('step'):
+            with self.profiler.timer('sub_step'):
+                pass
+        with self.profiler.timer('other_step'):
+            pass
+        result = self.profiler.get_report()
+        self.assertEqual(list(result.keys()), ['steps', 'counters', 'total_duration'])
+        self.assertEqual(result['total_duration'], result['steps']['step']['duration'] + result['steps']['other_step']['duration'])
+
+    def test_save_report(self):
+        with self.profiler.timer('step'):
+            pass
+        with tempfile.TemporaryDirectory() as report_dir:
+            report_path = os.path.join(report_dir, 'report.json')
+            Profiler.save_report(self.profiler.get_report(), report_path)
+            with open(report_path) as report_file:
+                result = json.load(report_file)
+        self.assertEqual(result, self.profiler.get_report())
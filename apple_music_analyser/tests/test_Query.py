@@ -1,7 +1,8 @@
 import pandas as pd
 import unittest
+from unittest.mock import patch
 
-from apple_music_analyser.Query import Query, QueryFactory
+from apple_music_analyser.Query import Query, QueryFactory, StringIndex
 
 class TestQueryFactory(unittest.TestCase):
 
@@ -60,12 +61,83 @@ class TestQueryFactory(unittest.TestCase):
         self.assertEqual(len(query.query_params['year']), 1)
         self.assertEqual(query.query_params['genre'], ['Genre_1'])
 
+    def test_create_queries(self):
+        params_dicts = [
+            {'year':[2020], 'rating':['LOVE']},
+            {'year':[2019], 'rating':['LOVE']},
+            {'year':[2019]},
+            None
+        ]
+        result = self.query_factory.create_queries(self.reference_df, params_dicts)
+        self.assertEqual(len(result), 4)
+        for query in result:
+            self.assertTrue(isinstance(query, Query))
+            # the rows are computed as part of the batch
+            self.assertIsNotNone(query.row_positions)
+        self.assertEqual(result[0].get_row_positions().tolist(), [0])
+        self.assertEqual(result[1].get_row_positions().tolist(), [])
+        self.assertEqual(result[2].get_row_positions().tolist(), [1])
+        self.assertEqual(result[3].get_row_positions().tolist(), [0, 1])
+
+    def test_create_queries_shares_masks(self):
+        params_dicts = [
+            {'year':[2020], 'rating':['LOVE']},
+            {'year':[2019], 'rating':['LOVE']},
+            {'year':[2019], 'offline':True}
+        ]
+        with patch.object(Query, 'evaluate_query_element', wraps=Query.evaluate_query_element) as evaluate:
+            self.query_factory.create_queries(self.reference_df, params_dicts)
+        # 'Play_Year==2020', 'Play_Year==2019', 'Rating.str.contains("LOVE")' and 'Offline.isin([True])'
+        self.assertEqual(evaluate.call_count, 4)
+
+    def test_create_queries_shares_conditions(self):
+        params_dicts = [
+            {'year':[2019, 2020], 'genre':['Genre_1', 'Genre_2']},
+            {'year':[2020], 'genre':['Genre_1']},
+            {'year':[2019], 'genre':['Genre_2']}
+        ]
+        with patch.object(Query, 'evaluate_query_element', wraps=Query.evaluate_query_element) as evaluate:
+            result = self.query_factory.create_queries(self.reference_df, params_dicts)
+        # each year and genre is evaluated once, even when it is part of several categories
+        self.assertEqual(evaluate.call_count, 4)
+        for query, params_dict in zip(result, params_dicts):
+            expected = self.query_factory.create_query(self.reference_df, params_dict).get_row_positions()
+            self.assertEqual(query.get_row_positions().tolist(), expected.tolist())
+        self.assertEqual(result[0].get_row_positions().tolist(), [0, 1])
+        self.assertEqual(result[1].get_row_positions().tolist(), [0])
+        self.assertEqual(result[2].get_row_positions().tolist(), [1])
+
     @classmethod
     def tearDownClass(self):
         self.reference_df = None
         self.query_factory = None
 
 
+class TestStringIndex(unittest.TestCase):
+
+    def test_init_StringIndex(self):
+        serie = pd.Series(['Pop', 'Rock && Pop', None, 'Pop'])
+        string_index = StringIndex(serie, separator='&&')
+        self.assertEqual(string_index.codes.tolist(), [0, 1, -1, 0])
+        self.assertEqual(string_index.number_of_codes, 2)
+        self.assertEqual(string_index.tokens_codes, {'Pop':[0, 1], 'Rock':[1]})
+        self.assertEqual(string_index.sorted_tokens, ['Pop', 'Rock'])
+
+    def test_get_codes(self):
+        serie = pd.Series(['Pop', 'Pop Punk', 'K-Pop', 'Rock'])
+        string_index = StringIndex(serie)
+        self.assertEqual(string_index.get_codes(['Pop'], 'exact'), [0])
+        self.assertEqual(sorted(string_index.get_codes(['Pop'], 'prefix')), [0, 1])
+        self.assertEqual(string_index.get_codes(['Jazz'], 'exact'), [])
+        self.assertEqual(string_index.get_codes(['Jazz'], 'prefix'), [])
+
+    def test_get_mask(self):
+        serie = pd.Series(['Pop', 'Pop Punk', None, 'Rock'])
+        string_index = StringIndex(serie)
+        self.assertEqual(string_index.get_mask(['Pop', 'Rock'], 'exact').tolist(), [True, False, False, True])
+        self.assertEqual(string_index.get_mask(['Pop'], 'prefix', [1, 2, 3]).tolist(), [True, False, False])
+
+
 class TestQuery(unittest.TestCase):
 
     @classmethod
@@ -118,6 +190,166 @@ class TestQuery(unittest.TestCase):
         self.assertEqual(result.shape[0], 1)
         self.assertEqual(result['Play_Year'][0], 2020)
 
+    def test_init_Query_is_lazy(self):
+        query = Query(self.reference_df, self.query_params)
+        self.assertIsNone(query.row_positions)
+        self.assertEqual(len(query.query_elements), 9)
+
+    def test_get_row_positions(self):
+        query = Query(self.reference_df, {'year':[2019, 2020]})
+        result = query.get_row_positions()
+        self.assertEqual(result.tolist(), [0, 1])
+        # the positions are cached after the first call
+        self.assertIs(query.get_row_positions(), result)
+
+    def test_get_filtered_df_with_columns(self):
+        result = self.query.get_filtered_df(columns=['Artist', 'Play_Year'])
+        self.assertTrue(isinstance(result, pd.DataFrame))
+        self.assertEqual(result.columns.tolist(), ['Artist', 'Play_Year'])
+        self.assertEqual(result.shape[0], 1)
+        self.assertEqual(result['Artist'][0], 'Artist_1')
+
+    def test_get_filtered_df_with_unknown_column(self):
+        with self.assertRaises(KeyError):
+            self.query.get_filtered_df(columns=['Nonexistent'])
+        with self.assertRaises(KeyError):
+            self.query.get_filtered_df(columns=['Artist', 'Nonexistent'])
+
+    def test_filtered_df_property(self):
+        result = self.query.filtered_df
+        self.assertTrue(isinstance(result, pd.DataFrame))
+        self.assertEqual(result.shape, (1, self.reference_df.shape[1]))
+        # the filtered df is built once
+        self.assertIs(self.query.filtered_df, result)
+
+    def test_get_series(self):
+        result = self.query.get_series('Title')
+        self.assertTrue(isinstance(result, pd.Series))
+        self.assertEqual(result.tolist(), ['Title_1'])
+
+    def test_count(self):
+        self.assertEqual(self.query.count(), 1)
+        query = Query(self.reference_df, {'year':[2018]})
+        self.assertEqual(query.count(), 0)
+
+    def test_refine(self):
+        df = pd.DataFrame.from_dict({
+            'Play_Year':[2020, 2020, 2019, 2020],
+            'Genres':['Pop', 'Rock', 'Pop', 'Pop'],
+            'Artist':['Artist_1', 'Artist_1', 'Artist_1', 'Artist_2']
+            })
+        year_query = Query(df, {'year':[2020]})
+        genre_query = year_query.refine({'genre':['Pop']})
+        artist_query = genre_query.refine({'artist':['Artist_2']})
+        self.assertTrue(isinstance(genre_query, Query))
+        self.assertIs(genre_query.parent_query, year_query)
+        self.assertEqual(genre_query.get_query_params(), {'genre':['Pop']})
+        self.assertEqual(genre_query.get_query_string(), 'Play_Year==2020&Genres.str.contains("Pop")')
+        self.assertEqual(artist_query.get_query_string(), 'Play_Year==2020&Genres.str.contains("Pop")&Artist.str.contains("Artist_2")')
+        self.assertEqual(genre_query.get_row_positions().tolist(), [0, 3])
+        self.assertEqual(artist_query.get_row_positions().tolist(), [3])
+        # same rows as a query built from scratch with all the filters
+        full_query = Query(df, {'year':[2020], 'genre':['Pop'], 'artist':['Artist_2']})
+        self.assertEqual(artist_query.get_row_positions().tolist(), full_query.get_row_positions().tolist())
+
+    def test_refine_evaluates_only_parent_rows(self):
+        df = pd.DataFrame.from_dict({
+            'Play_Year':[2020, 2019, 2019, 2020],
+            'Genres':['Pop', 'Rock', 'Pop', 'Pop']
+            })
+        year_query = Query(df, {'year':[2020]})
+        year_query.get_row_positions()
+        genre_query = year_query.refine({'genre':['Pop']})
+        with patch.object(Query, 'evaluate_query_element', wraps=Query.evaluate_query_element) as evaluate:
+            result = genre_query.get_row_positions()
+        self.assertEqual(result.tolist(), [0, 3])
+        self.assertEqual(evaluate.call_count, 1)
+        self.assertEqual(evaluate.call_args[0][0].shape, (2, 1))
+
+    def test_aggregate(self):
+        df = pd.DataFrame.from_dict({
+            'Play_Year':[2020, 2020, 2019, 2020, 2020],
+            'Artist':['Artist_1', 'Artist_2', 'Artist_1', None, 'Artist_1'],
+            'Play_duration_in_minutes':[1.0, 2.0, 3.0, 4.0, 5.0],
+            'Track_Instance':['Track_1', 'Track_2', 'Track_1', 'Track_1', 'Track_3']
+            })
+        query = Query(df, {'year':[2020]})
+        result = query.aggregate('Artist', ['count', 'minutes', 'distinct_tracks'])
+        self.assertTrue(isinstance(result, pd.DataFrame))
+        self.assertEqual(result.index.tolist(), ['Artist_1', 'Artist_2'])
+        self.assertEqual(result['Count'].tolist(), [2, 1])
+        self.assertEqual(result['Play_duration_in_minutes'].tolist(), [6.0, 2.0])
+        self.assertEqual(result['Distinct_tracks'].tolist(), [2, 1])
+
+    def test_aggregate_multiple_keys(self):
+        df = pd.DataFrame.from_dict({
+            'Play_Year':[2020, 2020, 2019, 2020],
+            'Artist':['Artist_1', 'Artist_2', 'Artist_1', 'Artist_1'],
+            })
+        query = Query(df, {'year':[2019, 2020]})
+        result = query.aggregate(['Play_Year', 'Artist'])
+        self.assertEqual(result.index.names, ['Play_Year', 'Artist'])
+        self.assertEqual(result.index.tolist(), [(2019, 'Artist_1'), (2020, 'Artist_1'), (2020, 'Artist_2')])
+        self.assertEqual(result['Count'].tolist(), [1, 2, 1])
+        # same result as a pandas groupby on the filtered df
+        expected = query.get_filtered_df().groupby(['Play_Year', 'Artist']).size()
+        self.assertEqual(result['Count'].tolist(), expected.tolist())
+
+    def test_aggregate_unknown_measure(self):
+        self.assertRaises(Exception, self.query.aggregate, 'Artist', ['unknown'])
+
+    def test_match_modes(self):
+        df = pd.DataFrame.from_dict({
+            'Play_Year':[2020, 2020, 2020, 2020, 2020],
+            'Genres':['Pop', 'K-Pop', 'Pop Punk', 'Soundtrack && Pop', 'Rock'],
+            'Artist':['Artist', 'Artist_1', 'The Artist', None, 'Artist.']
+            })
+        expected_positions = {
+            'exact':{'genre':[0, 3], 'artist':[0]},
+            'prefix':{'genre':[0, 2, 3], 'artist':[0, 1, 4]},
+            'substring':{'genre':[0, 1, 2, 3], 'artist':[0, 1, 2, 4]},
+            'regex':{'genre':[0, 1, 2, 3], 'artist':[0, 1, 2, 4]}
+        }
+        for match in expected_positions.keys():
+            for category, value in [('genre', 'Pop'), ('artist', 'Artist')]:
+                query = Query(df, {'year':[2020], category:[value], 'match':match})
+                result = query.get_row_positions().tolist()
+                self.assertEqual(result, expected_positions[match][category])
+                # the query string gives the same result as the index
+                query_string_result = Query.evaluate_query_element(df, query.query_elements[1]['query'])
+                self.assertEqual(query_string_result.nonzero()[0].tolist(), result)
+
+    def test_match_mode_per_category(self):
+        df = pd.DataFrame.from_dict({
+            'Play_Year':[2020, 2020, 2020],
+            'Genres':['Pop', 'K-Pop', 'Pop'],
+            'Artist':['Artist_1', 'Artist_1', 'Artist_2']
+            })
+        query = Query(df, {'year':[2020], 'genre':['Pop'], 'artist':['Artist'], 'match':{'genre':'exact'}})
+        self.assertEqual(query.query_elements[1]['match'], 'exact')
+        self.assertEqual(query.query_elements[2]['match'], 'regex')
+        self.assertEqual(query.get_row_positions().tolist(), [0, 2])
+        self.assertEqual(query.get_query_string(), 'Play_Year==2020&Genres.str.contains("(?:^|&& *)Pop(?: *&&|$)")&Artist.str.contains("Artist")')
+
+    def test_match_mode_unknown(self):
+        self.assertRaises(Exception, Query, self.reference_df, {'year':[2020], 'genre':['Pop'], 'match':'fuzzy'})
+
+    def test_match_mode_shares_string_index(self):
+        query_factory = QueryFactory()
+        query = query_factory.create_query(self.reference_df, {'year':[2020], 'artist':['Artist_1'], 'match':'exact'})
+        query.get_row_positions()
+        other_query = query_factory.create_query(self.reference_df, {'year':[2019], 'artist':['Artist_2'], 'match':'exact'})
+        self.assertIs(other_query.string_indexes, query.string_indexes)
+        self.assertIn('Artist', other_query.string_indexes)
+        self.assertEqual(other_query.get_row_positions().tolist(), [1])
+        refined_query = query.refine({'title':['Title'], 'match':'prefix'})
+        self.assertEqual(refined_query.get_row_positions().tolist(), [0])
+
+    def test_evaluate_query_element_with_nan(self):
+        df = pd.DataFrame.from_dict({'Title':['Title_1', None, 'Other']})
+        result = Query.evaluate_query_element(df, 'Title.str.contains("Title")')
+        self.assertEqual(result.tolist(), [True, False, False])
+
     def test_build_string_query_element(self):
         result_one_string = self.query.build_string_query_element('Category', ['value_1'])
         result_two_strings = self.query.build_string_query_element('Category', ['value_1', 'value_2'])
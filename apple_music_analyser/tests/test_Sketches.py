@@ -0,0 +1,155 @@
+import math
+import numpy as np
+import pandas as pd
+import unittest
+from collections import Counter
+
+from apple_music_analyser.Utility import Utility
+from apple_music_analyser.VisualizationDataframe import VisualizationDataframe
+from apple_music_analyser.Sketches import CountMinSketch, FrequentItemsSketch, HyperLogLog, SketchAggregator
+
+
+class TestSketches(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        # a skewed stream, as the plays of artists or titles
+        self.values = np.array(['item_' + str(value) for value in rng.zipf(1.3, 100000)], dtype=object)
+        self.chunks = np.array_split(self.values, 7)
+        self.exact_counts = Counter(self.values)
+        self.items = list(self.exact_counts.keys())
+        self.exact = np.array([self.exact_counts[item] for item in self.items])
+
+    def test_count_min_sketch(self):
+        sketch = CountMinSketch.from_error_bounds(0.001, 0.01)
+        self.assertEqual((sketch.width, sketch.depth), (2719, 5))
+        for chunk in self.chunks:
+            sketch.update(chunk)
+        self.assertEqual(sketch.total_count, len(self.values))
+        estimates = sketch.estimate(self.items)
+        # never lower than the exact count, and higher by at most epsilon*N for at least 1-delta of the items
+        self.assertTrue((estimates >= self.exact).all())
+        self.assertTrue(np.mean(estimates - self.exact <= sketch.get_error_bound()) >= 0.99)
+
+    def test_count_min_sketch_merge(self):
+        whole_sketch = CountMinSketch(512, 4)
+        whole_sketch.update(self.values)
+        sketch = CountMinSketch(512, 4)
+        for chunk in self.chunks:
+            other_sketch = CountMinSketch(512, 4)
+            other_sketch.update(pd.Series(chunk).value_counts().index, pd.Series(chunk).value_counts().values)
+            sketch.merge(other_sketch)
+        self.assertTrue((sketch.table == whole_sketch.table).all())
+        with self.assertRaises(Exception):
+            sketch.merge(CountMinSketch(512, 4, seed=1))
+
+    def test_frequent_items_sketch(self):
+        capacity = 100
+        sketch = FrequentItemsSketch(capacity)
+        for chunk in self.chunks:
+            sketch.update(chunk)
+        self.assertTrue(len(sketch.counters) <= capacity)
+        estimates = sketch.estimate(self.items)
+        # never higher than the exact count, and lower by at most the error, itself at most N/(capacity+1)
+        self.assertTrue((estimates <= self.exact).all())
+        self.assertTrue((self.exact - estimates <= sketch.get_error_bound()).all())
+        self.assertTrue(sketch.get_error_bound() <= len(self.values)/(capacity + 1))
+        # the items counted more than N/(capacity+1) times are kept, in the exact order
+        heavy_hitters = [item for item, count in self.exact_counts.most_common() if count > len(self.values)/(capacity + 1)]
+        self.assertEqual(list(sketch.get_top_items(len(heavy_hitters)).keys()), heavy_hitters)
+
+    def test_frequent_items_sketch_merge(self):
+        sketches = []
+        for chunk in self.chunks:
+            sketches.append(FrequentItemsSketch(50))
+            sketches[-1].update(chunk)
+        merged_sketch = sketches[0]
+        for sketch in sketches[1:]:
+            merged_sketch.merge(sketch)
+        self.assertEqual(merged_sketch.total_count, len(self.values))
+        estimates = merged_sketch.estimate(self.items)
+        self.assertTrue((estimates <= self.exact).all())
+        self.assertTrue((self.exact - estimates <= merged_sketch.get_error_bound()).all())
+        self.assertTrue(merged_sketch.get_error_bound() <= len(self.values)/51)
+        with self.assertRaises(Exception):
+            merged_sketch.merge(FrequentItemsSketch(10))
+
+    def test_hyper_log_log(self):
+        for distinct_count in [10, 1000, 50000]:
+            sketch = HyperLogLog(12)
+            values = np.array(['track_' + str(value) for value in range(distinct_count)], dtype=object)
+            for chunk in np.array_split(np.concatenate([values, values[:distinct_count//2]]), 5):
+                sketch.update(chunk)
+            # within 3 relative standard errors
+            self.assertTrue(abs(sketch.count() - distinct_count) <= 3*sketch.get_relative_error()*distinct_count)
+        with self.assertRaises(Exception):
+            HyperLogLog(3)
+
+    def test_hyper_log_log_bit_lengths(self):
+        # the values larger than 2**53 are not rounded
+        values = np.array([0, 1, 2**32 - 1, 2**32, 2**53 + 1, 2**60 - 1, 2**64 - 1], dtype=np.uint64)
+        self.assertEqual(HyperLogLog.get_bit_lengths(values).tolist(), [0, 1, 32, 33, 54, 60, 64])
+        # with a low precision, the remaining hashes have up to 60 bits
+        sketch = HyperLogLog(4)
+        sketch.update(['track_' + str(value) for value in range(1000)])
+        self.assertTrue(abs(sketch.count() - 1000) <= 3*sketch.get_relative_error()*1000)
+
+    def test_hyper_log_log_merge(self):
+        whole_sketch = HyperLogLog()
+        whole_sketch.update(self.values)
+        sketch = HyperLogLog()
+        for chunk in self.chunks:
+            other_sketch = HyperLogLog()
+            other_sketch.update(chunk)
+            sketch.merge(other_sketch)
+        self.assertEqual(sketch.count(), whole_sketch.count())
+        self.assertTrue(abs(sketch.count() - len(self.exact_counts)) <= 3*sketch.get_relative_error()*len(self.exact_counts))
+
+
+class TestSketchAggregator(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        target_files = {
+            'identifier_infos_path' : 'test_df/Apple Music Activity/Identifier Information.json.zip',
+            'library_tracks_path' : 'test_df/Apple Music Activity/Apple Music Library Tracks.json.zip',
+            'library_activity_path': 'test_df/Apple Music Activity/Apple Music Library Activity.json.zip',
+            'likes_dislikes_path' : 'test_df/Apple Music Activity/Apple Music Likes and Dislikes.csv',
+            'play_activity_path': 'test_df/Apple Music Activity/Apple Music Play Activity.csv'
+        }
+        input_df = Utility.get_df_from_archive('apple_music_analyser/tests/test_df.zip', target_files)
+        cls.visualization_dataframe = VisualizationDataframe(input_df)
+        cls.df_viz = cls.visualization_dataframe.get_df_viz()
+
+    def test_update(self):
+        sketch_aggregator = SketchAggregator(capacity=1000)
+        for chunk in np.array_split(np.arange(self.df_viz.shape[0]), 4):
+            sketch_aggregator.update(self.df_viz.iloc[chunk])
+        # the capacity is larger than the number of items: the rankings are exact
+        for ranking_target in SketchAggregator.default_ranking_targets:
+            exact_ranking = self.visualization_dataframe.track_summary_objects.build_ranking_dict_per_year(self.df_viz, ranking_target)
+            ranking = sketch_aggregator.get_ranking_dict_per_year(ranking_target)
+            for year, count_dict in exact_ranking.items():
+                self.assertEqual(ranking[year], {item:count for item, count in count_dict.items() if count > 0})
+                items = list(ranking[year].keys())
+                self.assertTrue((sketch_aggregator.estimate_counts(ranking_target, year, items) >= np.array(list(ranking[year].values()))).all())
+        for year in self.df_viz['Play_Year'].unique():
+            year_df = self.df_viz[self.df_viz['Play_Year'] == year].dropna(subset=['Title', 'Artist'])
+            exact_count = len(set(zip(year_df['Title'].str.strip(), year_df['Artist'].str.strip())))
+            self.assertEqual(sketch_aggregator.count_distinct_tracks(year), exact_count)
+
+    def test_merge(self):
+        whole_aggregator = SketchAggregator()
+        whole_aggregator.update(self.df_viz)
+        # for example the plays of two users
+        first_aggregator = SketchAggregator()
+        first_aggregator.update(self.df_viz.iloc[:80])
+        second_aggregator = SketchAggregator()
+        second_aggregator.update(self.df_viz.iloc[80:])
+        first_aggregator.merge(second_aggregator)
+        self.assertEqual(first_aggregator.get_ranking_dict_per_year('Artist'), whole_aggregator.get_ranking_dict_per_year('Artist'))
+        self.assertEqual(first_aggregator.count_distinct_tracks(), whole_aggregator.count_distinct_tracks())
+        with self.assertRaises(ValueError):
+            first_aggregator.merge(SketchAggregator(capacity=10))
+        with self.assertRaises(ValueError):
+            first_aggregator.merge(SketchAggregator(ranking_targets=['Artist']))
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+from apple_music_analyser.Utility import Utility
+from apple_music_analyser.VisualizationDataframe import VisualizationDataframe
+from apple_music_analyser.UserAggregates import UserAggregates
+from apple_music_analyser.DataVisualization import HeatMapVisualization, BarChartVisualization
+
+
+class TestUserAggregates(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        target_files = {
+            'identifier_infos_path' : 'test_df/Apple Music Activity/Identifier Information.json.zip',
+            'library_tracks_path' : 'test_df/Apple Music Activity/Apple Music Library Tracks.json.zip',
+            'library_activity_path': 'test_df/Apple Music Activity/Apple Music Library Activity.json.zip',
+            'likes_dislikes_path' : 'test_df/Apple Music Activity/Apple Music Likes and Dislikes.csv',
+            'play_activity_path': 'test_df/Apple Music Activity/Apple Music Play Activity.csv'
+        }
+        input_df = Utility.get_df_from_archive('apple_music_analyser/tests/test_df.zip', target_files)
+        cls.visualization_dataframe = VisualizationDataframe(input_df)
+        cls.aggregates = UserAggregates.from_visualization_dataframe(cls.visualization_dataframe)
+
+    def test_from_visualization_dataframe(self):
+        df_viz = self.visualization_dataframe.get_df_viz()
+        self.assertEqual(list(self.aggregates.rankings.keys()), UserAggregates.ranking_targets)
+        # the rankings are the ones of the track summary objects, without the counts of 0
+        artist_ranking = self.visualization_dataframe.track_summary_objects.build_ranking_dict_per_year(df_viz, 'Artist')
+        for year, count_dict in artist_ranking.items():
+            self.assertEqual(self.aggregates.get_ranking_dict('Artist')[year], {artist:count for artist, count in count_dict.items() if count > 0})
+        self.assertEqual(self.aggregates.get_time_cube()['Play_count'].sum(), df_viz.dropna(subset=VisualizationDataframe.time_cube_columns).shape[0])
+        library_activity_df = self.visualization_dataframe.get_library_activity_df()
+        self.assertEqual(self.aggregates.get_device_counts(), library_activity_df['Transaction Agent Model'].value_counts().to_dict())
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_path = os.path.join(temp_dir, 'aggregates.pkl')
+            self.aggregates.save(file_path)
+            loaded_aggregates = UserAggregates.load(file_path)
+            # the file only holds the aggregates
+            self.assertTrue(isinstance(Utility.load_from_pickle(file_path), dict))
+            Utility.save_to_pickle(self.visualization_dataframe, os.path.join(temp_dir, 'snapshot.pkl'))
+            with self.assertRaises(Exception):
+                UserAggregates.load(os.path.join(temp_dir, 'snapshot.pkl'))
+        self.assertTrue(loaded_aggregates.get_time_cube().equals(self.aggregates.get_time_cube()))
+        self.assertEqual(loaded_aggregates.rankings, self.aggregates.rankings)
+        self.assertEqual(loaded_aggregates.get_device_counts(), self.aggregates.get_device_counts())
+
+    def test_build_charts(self):
+        df_viz = self.visualization_dataframe.get_df_viz()
+        year = sorted(df_viz['Play_Year'].dropna().unique())[0]
+        heat_map = self.aggregates.build_heat_map(year=year)
+        heat_map.render_heat_map('DOW', str(year))
+        self.assertEqual(heat_map.figure.data[0].z.tolist(), HeatMapVisualization.compute_heat_map_grid(df_viz[df_viz['Play_Year'] == year], 'DOW')[2].tolist())
+        bar_chart = self.aggregates.build_bar_chart()
+        bar_chart.render_period_bar_chart('HOD', 'all')
+        self.assertEqual(list(bar_chart.figure.data[0].y), BarChartVisualization.compute_period_counts(df_viz, 'HOD')[1])
+        ranking_list = self.aggregates.build_ranking_list('Genres', 3)
+        self.assertTrue(all([len(ranking) <= 3 for ranking in ranking_list.get_ranked_dict().values()]))
+        sunburst = self.aggregates.build_sunburst('Artist', 'Artist', 5)
+        self.assertEqual(sunburst.parents[0], 'Artist')
+        pie_chart = self.aggregates.build_device_pie_chart(2)
+        pie_chart.render_pie_chart()
+        self.assertTrue(len(pie_chart.figure.data[0].labels) <= 3)
+        with self.assertRaises(Exception):
+            self.aggregates.get_ranking_dict('Album')
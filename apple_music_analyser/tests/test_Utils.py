@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 import unittest
 
 from apple_music_analyser.Utility import Utility
@@ -10,6 +11,29 @@ class TestUtils(unittest.TestCase):
         result = Utility.compute_ratio_songs(serie).tolist()
         self.assertEqual(result, [40.0, 40.0, 20.0])
 
+    def test_compute_grouped_ratio_songs(self):
+        df = pd.DataFrame({
+            'Play_Year':[2019, 2019, 2019, 2020, 2020, np.nan],
+            'Play_Month':[1, 1, 2, 3, 3, 4],
+            'Play_DOM':[1, 1, 1, 1, 1, 1],
+            'Play_DOW':['Monday', 'Monday', 'Sunday', 'Friday', np.nan, 'Monday'],
+            'Play_HOD':[1, 1, 1, 1, 1, 1],
+            'Play_duration_in_minutes':[1.0, 1.0, 1.0, 1.0, 1.0, 1.0]
+        })
+        result = Utility.compute_grouped_ratio_songs(df, 'Play_DOW')
+        self.assertEqual(result.columns.tolist(), ['Play_Year', 'Play_DOW', 'Ratio'])
+        self.assertEqual(result['Play_DOW'].tolist(), ['Monday', 'Sunday', 'Friday'])
+        self.assertEqual(result['Ratio'].round(2).tolist(), [66.67, 33.33, 100.0])
+        # the same as compute_ratio_songs on each year
+        expected = Utility.compute_ratio_songs(df[df['Play_Year'] == 2019]['Play_DOW'])
+        self.assertEqual(result[result['Play_Year'] == 2019]['Ratio'].tolist(), expected.tolist())
+        # the time cube gives the same ratios
+        time_cube = df.groupby(['Play_Year', 'Play_Month', 'Play_DOM', 'Play_DOW', 'Play_HOD']).size().rename('Play_count').reset_index()
+        self.assertTrue(Utility.compute_grouped_ratio_songs(time_cube, 'Play_DOW').equals(result))
+        # several grouping columns
+        result = Utility.compute_grouped_ratio_songs(df, 'Play_DOW', ['Play_Year', 'Play_Month'])
+        self.assertEqual(result['Ratio'].tolist(), [100.0, 100.0, 100.0])
+
     def test_clean_col_with_list(self):
         serie = pd.Series([['Rock'], ['Pop'], ['Soundtrack', 'Pop']])
         result = serie.apply(Utility.clean_col_with_list).tolist()
@@ -28,6 +52,22 @@ class TestUtils(unittest.TestCase):
         result = [str(x) for x in result]
         self.assertEqual(result, ['2020-01-01 01:00:00', '2019-12-31 23:00:00', '2020-01-01 02:00:00', '2020-01-01 04:00:00', '2020-01-01 02:00:00', '2020-01-01 06:00:00', '2020-01-01 04:00:00', '2020-01-01 08:00:00', '2020-01-01 06:00:00'])
 
+    def test_convert_to_local_time_serie(self):
+        serie = pd.Series(pd.to_datetime(['2020-01-01T10:00:00Z', None, '2020-01-01T10:00:00Z', '2020-01-01T10:00:00Z']), index=[3, 4, 5, 6], name='Activity date time')
+        timezone_serie = pd.Series([3600, 3600, np.nan, 3600500], index=[3, 4, 5, 6])
+        result = Utility.convert_to_local_time(serie, timezone_serie)
+        self.assertEqual(result.name, 'Activity date time')
+        self.assertEqual(result.index.tolist(), [3, 4, 5, 6])
+        self.assertEqual(result.dtype, serie.dtype)
+        self.assertEqual(result[3], pd.Timestamp('2020-01-01T11:00:00Z'))
+        self.assertTrue(pd.isnull(result[4]))
+        self.assertTrue(pd.isnull(result[5]))
+        self.assertEqual(result[6], pd.Timestamp('2020-01-01T11:00:00.500Z'))
+
+    def test_get_offsets_in_ns(self):
+        result = Utility.get_offsets_in_ns(np.array([1, -2, 60, 3600, 3600000]))
+        self.assertEqual(result.tolist(), [3600*10**9, -7200*10**9, 3600*10**9, 3600*10**9, 3600*10**9])
+
     def test_extract_time_info_from_datetime(self):
         serie = pd.to_datetime(pd.Series('2020-01-01'))
         year, month, dom, dow, hod = Utility.extract_time_info_from_datetime(serie)
@@ -37,6 +77,32 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(dow.values[0], 'Wednesday')
         self.assertEqual(hod.values[0], 0)
 
+    def test_extract_time_info_from_datetime_compact(self):
+        serie = pd.to_datetime(pd.Series(['2020-01-01 10:00', None]))
+        year, month, dom, dow, hod = Utility.extract_time_info_from_datetime(serie[:1], compact=True)
+        self.assertEqual([year.dtype, month.dtype, dom.dtype, dow.dtype, hod.dtype], ['int16', 'int8', 'int8', 'int8', 'int8'])
+        self.assertEqual([year[0], month[0], dom[0], dow[0], hod[0]], [2020, 1, 1, 2, 10])
+        # with missing datetimes, the nullable integer dtypes are used
+        year, month, dom, dow, hod = Utility.extract_time_info_from_datetime(serie, compact=True)
+        self.assertEqual(str(dow.dtype), 'Int8')
+        self.assertTrue(pd.isnull(dow[1]))
+
+    def test_select_time_period(self):
+        df = pd.DataFrame({'Play_Year':[2019, 2019, 2020], 'Play_Month':[1, 2, 1]})
+        self.assertIs(Utility.select_time_period(df), df)
+        self.assertEqual(Utility.select_time_period(df, year=2019).index.tolist(), [0, 1])
+        self.assertEqual(Utility.select_time_period(df, year=[2019, 2020], month=1).index.tolist(), [0, 2])
+
+    def test_get_day_names(self):
+        dow_serie = pd.Series([2, 0, 6, None], index=[4, 5, 6, 7], dtype='Int8')
+        result = Utility.get_day_names(dow_serie)
+        self.assertEqual(result.tolist()[:3], ['Wednesday', 'Monday', 'Sunday'])
+        self.assertTrue(pd.isnull(result[7]))
+        self.assertEqual(result.index.tolist(), [4, 5, 6, 7])
+        self.assertEqual(result.cat.categories.tolist(), Utility.day_names)
+        names_serie = pd.Series(['Monday'])
+        self.assertIs(Utility.get_day_names(names_serie), names_serie)
+
     def test_parse_date_time_column(self):
         '''
             We only test if it returns a dict, as the values come from another function tested
@@ -1,5 +1,9 @@
+import os
+import numpy as np
 import pandas as pd
+import tempfile
 import unittest
+from unittest.mock import patch
 
 from apple_music_analyser.Utility import Utility
 from apple_music_analyser.Parser import Parser
@@ -112,6 +116,132 @@ class TestVisualizationDataframe(unittest.TestCase):
         self.df_visualization.source_dataframes = {}
         self.assertRaises(Exception, self.df_visualization.process_tracks_in_df)
 
+    def test_get_stage_timings(self):
+        self.df_visualization.run_pipeline()
+        result = self.df_visualization.get_stage_timings()
+        self.assertEqual(sorted(result.keys()), sorted(VisualizationDataframe.pipeline_stages))
+        for duration in result.values():
+            self.assertTrue(duration >= 0)
+
+    def test_get_profile(self):
+        self.df_visualization.get_df_viz()
+        result = self.df_visualization.get_profile()
+        self.assertEqual(list(result.keys()), ['steps', 'counters', 'total_duration'])
+        self.assertIn('build_df_visualization/merge_track_instance_infos', result['steps'])
+        self.assertEqual(result['steps']['process_play_activity']['peak_memory'], None)
+        self.assertEqual(result['total_duration'], sum(self.df_visualization.get_stage_timings().values()))
+        self.assertEqual(result['counters']['fuzzy_comparisons'], self.df_visualization.process_tracks.comparisons_count)
+        self.assertEqual(result['counters']['not_matched_play_activity'], len(self.df_visualization.process_tracks.items_not_matched['play_activity']))
+        with tempfile.TemporaryDirectory() as report_dir:
+            report_path = os.path.join(report_dir, 'profile.json')
+            self.df_visualization.get_profile(report_path)
+            self.assertTrue(os.path.exists(report_path))
+
+    def test_get_profile_track_memory(self):
+        result = VisualizationDataframe(self.input_df, track_memory=True)
+        result.get_play_activity_df()
+        profile = result.get_profile()
+        self.assertEqual(list(profile['steps'].keys()), ['parse_play_activity'])
+        self.assertTrue(profile['steps']['parse_play_activity']['peak_memory'] > 0)
+        self.assertEqual(profile['counters']['fuzzy_comparisons'], 0)
+
+    def test_max_workers(self):
+        result = VisualizationDataframe(self.input_df, max_workers=2)
+        expected = self.df_visualization.get_df_viz()
+        self.assertTrue(result.df_visualization.drop(columns=['Track_Instance']).equals(expected.drop(columns=['Track_Instance'])))
+        result_identifiers = result.df_visualization['Track_Instance'].apply(lambda track_instance: getattr(track_instance, 'identifier', None))
+        expected_identifiers = expected['Track_Instance'].apply(lambda track_instance: getattr(track_instance, 'identifier', None))
+        self.assertTrue(result_identifiers.equals(expected_identifiers))
+
+    def test_compact_time_info(self):
+        result = VisualizationDataframe(self.input_df, compact_time_info=True).get_df_viz()
+        expected = self.df_visualization.get_df_viz()
+        self.assertEqual(result['Play_DOW'].dtype, 'int8')
+        self.assertEqual(result['Play_Year'].dtype, 'int16')
+        self.assertTrue((Utility.get_day_names(result['Play_DOW']).astype(object) == expected['Play_DOW']).all())
+        for column in ['Play_Year', 'Play_Month', 'Play_DOM', 'Play_HOD']:
+            self.assertTrue((result[column].values == expected[column].values).all())
+
+    def test_get_time_cube(self):
+        df_viz = self.df_visualization.get_df_viz()
+        result = self.df_visualization.get_time_cube()
+        self.assertIs(self.df_visualization.get_time_cube(), result)
+        self.assertEqual(result.columns.tolist(), VisualizationDataframe.time_cube_columns + ['Play_count', 'Play_duration_in_minutes'])
+        self.assertEqual(result['Play_count'].sum(), df_viz.dropna(subset=VisualizationDataframe.time_cube_columns).shape[0])
+        self.assertAlmostEqual(result['Play_duration_in_minutes'].sum(), df_viz['Play_duration_in_minutes'].sum())
+        self.assertFalse(result.duplicated(subset=VisualizationDataframe.time_cube_columns).any())
+
+    def test_init_invalid_input(self):
+        partial_input_df = dict(self.input_df)
+        del partial_input_df['library_activity_df']
+        self.assertRaises(Exception, VisualizationDataframe, partial_input_df)
+
+    def test_lazy_attributes(self):
+        result = VisualizationDataframe(self.input_df)
+        self.assertEqual(result.completed_stages, [])
+        self.assertTrue(isinstance(result.play_activity_df, pd.DataFrame))
+        self.assertEqual(result.completed_stages, ['parse_play_activity'])
+        self.assertTrue(isinstance(result.library_activity_df, pd.DataFrame))
+        self.assertEqual(result.completed_stages, ['parse_play_activity', 'parse_library_activity'])
+        # the attributes already computed are not computed again
+        with patch.object(VisualizationDataframe, 'run_stage') as run_stage:
+            result.get_play_activity_df()
+        run_stage.assert_not_called()
+
+    def test_lazy_attributes_dependencies(self):
+        result = VisualizationDataframe(self.input_df)
+        self.assertTrue(isinstance(result.process_tracks, ProcessTracks))
+        self.assertEqual(result.completed_stages, ['parse_library_tracks', 'process_library_tracks', 'parse_identifier_infos', 'process_identifier_infos',
+                                                   'parse_play_activity', 'process_play_activity', 'parse_likes_dislikes', 'process_likes_dislikes'])
+        self.assertTrue(isinstance(result.df_visualization, pd.DataFrame))
+        self.assertEqual(result.completed_stages[-1], 'build_df_visualization')
+        self.assertNotIn('parse_library_activity', result.completed_stages)
+        self.assertTrue(result.df_visualization.drop(columns=['Track_Instance']).equals(self.df_visualization.df_visualization.drop(columns=['Track_Instance'])))
+        self.assertRaises(AttributeError, getattr, result, 'not_an_attribute')
+
+    def test_checkpoint_dir(self):
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            result = VisualizationDataframe(self.input_df, checkpoint_dir)
+            result.run_pipeline()
+            self.assertEqual(sorted(os.listdir(checkpoint_dir)), ['df_visualization.pkl', 'identifier_infos_df.pkl', 'library_activity_df.pkl', 'library_tracks_df.pkl',
+                                                                  'likes_dislikes_df.pkl', 'pipeline_checkpoint.pkl', 'play_activity_df.pkl', 'process_tracks.pkl'])
+            self.assertTrue(result.df_visualization.drop(columns=['Track_Instance']).equals(self.df_visualization.df_visualization.drop(columns=['Track_Instance'])))
+            # the pipeline is complete, so nothing is run again (except the creation of the Parser instance)
+            with patch.object(VisualizationDataframe, 'run_stage', side_effect=VisualizationDataframe.run_stage, autospec=True) as run_stage:
+                resumed = VisualizationDataframe(self.input_df, checkpoint_dir)
+                resumed.run_pipeline()
+            self.assertEqual([call.args[1] for call in run_stage.call_args_list], ['parse'])
+            self.assertTrue(resumed.df_visualization.drop(columns=['Track_Instance']).equals(result.df_visualization.drop(columns=['Track_Instance'])))
+            self.assertEqual(resumed.get_stage_timings()['build_df_visualization'], result.get_stage_timings()['build_df_visualization'])
+            # the track instances of df_visualization are the ones of the process_tracks instance
+            track_instance = resumed.df_visualization['Track_Instance'].dropna().iloc[0]
+            self.assertIn(track_instance, resumed.process_tracks.track_instance_dict.values())
+
+    def test_checkpoint_dir_resume(self):
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            # the pipeline is interrupted during the processing of the play activity
+            with patch.object(ProcessTracks, 'process_play_df', side_effect=KeyboardInterrupt):
+                self.assertRaises(KeyboardInterrupt, getattr, VisualizationDataframe(self.input_df, checkpoint_dir), 'df_visualization')
+            self.assertNotIn('df_visualization.pkl', os.listdir(checkpoint_dir))
+            with patch.object(VisualizationDataframe, 'run_stage', side_effect=VisualizationDataframe.run_stage, autospec=True) as run_stage:
+                result = VisualizationDataframe(self.input_df, checkpoint_dir)
+                result.get_df_viz()
+            stages_run = [call.args[1] for call in run_stage.call_args_list]
+            self.assertEqual(stages_run, ['process_play_activity', 'parse_likes_dislikes', 'process_likes_dislikes', 'build_df_visualization'])
+            self.assertTrue(result.df_visualization.drop(columns=['Track_Instance']).equals(self.df_visualization.df_visualization.drop(columns=['Track_Instance'])))
+
+    def test_checkpoint_dir_other_input(self):
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            VisualizationDataframe(self.input_df, checkpoint_dir).run_pipeline()
+            other_input_df = dict(self.input_df)
+            other_input_df['play_activity_df'] = self.input_df['play_activity_df'].iloc[:100]
+            with patch.object(VisualizationDataframe, 'run_stage', side_effect=VisualizationDataframe.run_stage, autospec=True) as run_stage:
+                result = VisualizationDataframe(other_input_df, checkpoint_dir)
+                result.run_pipeline()
+            self.assertEqual(run_stage.call_count, len(VisualizationDataframe.pipeline_stages))
+            self.assertEqual(result.df_visualization.shape[0], result.play_activity_df.shape[0])
+            self.assertTrue(result.df_visualization.shape[0] < self.df_visualization.df_visualization.shape[0])
+
     def test_build_df_visualisation_play_activity(self):
         result = self.df_visualization.build_df_visualisation()
         self.assertEqual(result.shape[0], self.df_visualization.play_activity_df.shape[0])
@@ -124,5 +254,57 @@ class TestVisualizationDataframe(unittest.TestCase):
         for column_name in result.columns:
             self.assertNotIn(' ', column_name)
 
+    def test_update(self):
+        partial_input_df = dict(self.input_df)
+        partial_input_df['play_activity_df'] = self.input_df['play_activity_df'].iloc[:100]
+        df_visualization = VisualizationDataframe(partial_input_df)
+        self.assertEqual(df_visualization.df_visualization.shape[0], 99)
+        result = df_visualization.update(self.input_df)
+        # 66 rows are new, and the whole df is the same as when built from the full input
+        self.assertEqual(result.shape[0], 66)
+        self.assertEqual(df_visualization.play_activity_df.shape[0], 165)
+        self.assertEqual(df_visualization.input_df['play_activity_df'].shape[0], 166)
+        expected = self.df_visualization.df_visualization.drop(['Track_Instance'], axis=1)
+        updated = df_visualization.df_visualization.drop(['Track_Instance'], axis=1)
+        pd.testing.assert_frame_equal(updated, expected, check_dtype=False)
+
+    def test_update_without_new_rows(self):
+        result = self.df_visualization.update(self.input_df)
+        self.assertEqual(result.shape[0], 0)
+        self.assertEqual(self.df_visualization.df_visualization.shape[0], 165)
+
+    def test_update_no_play_activity(self):
+        self.assertRaises(Exception, self.df_visualization.update, {})
+
+    def test_find_new_rows(self):
+        current_df = pd.DataFrame.from_dict({'Event Start Timestamp':['2020-01-01', '2020-01-02', '2020-01-02'], 'Content Name':['Title_1', 'Title_2', 'Title_2']})
+        new_df = pd.DataFrame.from_dict({'Event Start Timestamp':['2020-01-01', '2020-01-02', '2020-01-02', '2020-01-02', '2020-01-03'],
+            'Content Name':['Title_1', 'Title_2', 'Title_2', 'Title_2', 'Title_3'], 'New Column':[1, 2, 3, 4, 5]})
+        result = VisualizationDataframe.find_new_rows(current_df, new_df)
+        # the third occurrence of the same row is new, as well as the last row
+        self.assertEqual(result.index.tolist(), [3, 4])
+
+    def test_find_new_rows_int_to_float(self):
+        # a missing value in the new export turns an int column into a float column
+        current_df = pd.DataFrame.from_dict({'Content Name':['Title_1', 'Title_2'], 'Play Duration Milliseconds':[1000, 2000]})
+        new_df = pd.DataFrame.from_dict({'Content Name':['Title_1', 'Title_2', 'Title_3'], 'Play Duration Milliseconds':[1000, 2000, np.nan]})
+        result = VisualizationDataframe.find_new_rows(current_df, new_df)
+        self.assertEqual(result.index.tolist(), [2])
+
+    def test_update_input_df_and_checkpoint(self):
+        partial_input_df = dict(self.input_df)
+        partial_input_df['play_activity_df'] = self.input_df['play_activity_df'].iloc[:100]
+        with tempfile.TemporaryDirectory() as checkpoint_dir:
+            df_visualization = VisualizationDataframe(partial_input_df, checkpoint_dir)
+            df_visualization.update(self.input_df)
+            # the dictionary of the caller is not modified
+            self.assertEqual(partial_input_df['play_activity_df'].shape[0], 100)
+            # the checkpoint is the one of the updated input
+            with patch.object(VisualizationDataframe, 'run_stage') as run_stage:
+                resumed = VisualizationDataframe(df_visualization.input_df, checkpoint_dir)
+                self.assertEqual(resumed.df_visualization.shape[0], 165)
+                self.assertEqual(resumed.play_activity_df.shape[0], 165)
+                run_stage.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
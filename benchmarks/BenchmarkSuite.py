@@ -0,0 +1,136 @@
+import os
+import tempfile
+
+from apple_music_analyser.Utility import Utility
+from apple_music_analyser.Query import QueryFactory
+from apple_music_analyser.Profiler import Profiler
+from apple_music_analyser.VisualizationDataframe import VisualizationDataframe
+from benchmarks.SyntheticExportGenerator import SyntheticExportGenerator
+
+class BenchmarkSuite():
+
+    '''
+        This class times the pipeline of the package on synthetic archives (see SyntheticExportGenerator), for
+        several sizes of play activity. For each size, the following steps are timed:
+            - the generation of the archive ('generate_archive', not part of the package)
+            - the reading of the archive with Utility.get_df_from_archive ('get_df_from_archive')
+            - each stage of VisualizationDataframe: the parsing of each dataframe (the methods of Parser), each pass
+            of ProcessTracks, and build_df_visualisation (see VisualizationDataframe.pipeline_stages)
+            - a Query filtering df_visualization on years, genres and ratings ('query'), and the same filter
+            built for each year at once with QueryFactory.create_queries ('query_per_year')
+            - the ranking dictionaries per year of TrackSummaryObject for Genres, Artist, Title and Track_origin
+            (for example 'ranking_Genres')
+        along with the counters of VisualizationDataframe.get_profile (number of title comparisons, rows not matched,...).
+
+        Note that the processing of ProcessTracks goes through each row in python, so the larger sizes take a long time
+        (hours for 10M plays), and need a lot of memory (several GB for 10M plays).
+
+        Args:
+            sizes - OPTIONAL, a list of keys of scenario_sizes or of numbers of plays (default ['10k'])
+            library_ratio - OPTIONAL, the number of tracks of the library for a play (default 0.05, at most 50000 tracks)
+            seed - OPTIONAL, the seed of the synthetic archives (default 0)
+            track_memory - OPTIONAL, boolean, if True the peak memory of each step is recorded too (default False)
+            max_workers - OPTIONAL, if provided, the library tracks and play activity are processed by max_workers processes
+
+        Methods:
+            __init__(sizes=None, library_ratio=0.05, seed=0, track_memory=False, max_workers=None)
+            run(report_path=None)
+            run_scenario(play_count)
+            get_play_count(size)
+            format_summary(results)
+    '''
+
+    scenario_sizes = {'10k':10000, '1M':1000000, '10M':10000000}
+
+    def __init__(self, sizes=None, library_ratio=0.05, seed=0, track_memory=False, max_workers=None):
+        if sizes is None:
+            sizes = ['10k']
+        self.sizes = sizes
+        self.library_ratio = library_ratio
+        self.seed = seed
+        self.track_memory = track_memory
+        self.max_workers = max_workers
+
+    def run(self, report_path=None):
+        '''
+            Runs the scenario of each size, and returns a dictionary {size:report}, where each report has
+            the format of Profiler.get_report. If report_path is provided, the results are saved there as a json file.
+        '''
+        results = {}
+        for size in self.sizes:
+            results[str(size)] = self.run_scenario(BenchmarkSuite.get_play_count(size))
+        if report_path is not None:
+            Profiler.save_report(results, report_path)
+        return results
+
+    def run_scenario(self, play_count):
+        '''
+            Times each step of the pipeline on a synthetic archive of play_count plays, and returns the report of the profiler.
+        '''
+        profiler = Profiler(self.track_memory)
+        library_size = max(min(int(play_count*self.library_ratio), 50000), 1)
+        generator = SyntheticExportGenerator(play_count, library_size, seed=self.seed)
+        with tempfile.TemporaryDirectory() as archive_dir:
+            archive_path = os.path.join(archive_dir, 'synthetic_archive.zip')
+            with profiler.timer('generate_archive'):
+                generator.write_archive(archive_path)
+            with profiler.timer('get_df_from_archive'):
+                input_df = Utility.get_df_from_archive(archive_path)
+
+        # the stages of the pipeline are timed by the profiler of VisualizationDataframe
+        visualization_dataframe = VisualizationDataframe(input_df, track_memory=self.track_memory, max_workers=self.max_workers)
+        visualization_dataframe.run_pipeline()
+        pipeline_profile = visualization_dataframe.get_profile()
+        profiler.records.update(pipeline_profile['steps'])
+        profiler.counters.update(pipeline_profile['counters'])
+
+        df_viz = visualization_dataframe.get_df_viz()
+        years = sorted(df_viz['Play_Year'].unique())
+        query_params = {'year':years, 'genre':['Pop', 'Rock', 'Alternative'], 'rating':['LOVE']}
+        with profiler.timer('query'):
+            QueryFactory().create_query(df_viz, query_params).get_filtered_df()
+        with profiler.timer('query_per_year'):
+            for query in QueryFactory().create_queries(df_viz, [dict(query_params, year=[year]) for year in years]):
+                query.get_filtered_df()
+        for ranking_target in ['Genres', 'Artist', 'Title', 'Track_origin']:
+            with profiler.timer('ranking_' + ranking_target):
+                visualization_dataframe.track_summary_objects.build_ranking_dict_per_year(df_viz, ranking_target)
+
+        profiler.increment('play_count', play_count)
+        profiler.increment('library_size', library_size)
+        return profiler.get_report()
+
+    @staticmethod
+    def get_play_count(size):
+        '''
+            Returns the number of plays of a size, either a key of scenario_sizes ('10k', '1M' or '10M') or a number.
+        '''
+        if size in BenchmarkSuite.scenario_sizes:
+            return BenchmarkSuite.scenario_sizes[size]
+        try:
+            return int(size)
+        except ValueError:
+            raise Exception('Unknown benchmark size {0}, please use one of {1} or a number of plays.'.format(size, list(BenchmarkSuite.scenario_sizes.keys())))
+
+    @staticmethod
+    def format_summary(results):
+        '''
+            Returns a table (str) with the duration in seconds of each step (rows) for each size (columns).
+        '''
+        sizes = list(results.keys())
+        steps = []
+        for report in results.values():
+            steps += [step for step in report['steps'] if step not in steps]
+        step_width = max([len(step) for step in steps + ['total_duration']])
+        lines = [' '*step_width + ''.join(['{0:>14}'.format(size) for size in sizes])]
+        for step in steps + ['total_duration']:
+            durations = []
+            for size in sizes:
+                if step == 'total_duration':
+                    durations.append('{0:>14.3f}'.format(results[size]['total_duration']))
+                elif step in results[size]['steps']:
+                    durations.append('{0:>14.3f}'.format(results[size]['steps'][step]['duration']))
+                else:
+                    durations.append('{0:>14}'.format('-'))
+            lines.append(step.ljust(step_width) + ''.join(durations))
+        return '\n'.join(lines)
@@ -0,0 +1,79 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+class ImportBenchmark():
+
+    '''
+        This class times the import of the modules of the package. Each import is timed in a new python process,
+        so that nothing is already imported, and the process reports which heavy dependencies (pandas, numpy, plotly)
+        the import loaded. Parsing and querying only need the core modules, so importing them should not load plotly:
+        it is only imported when a visualization is built.
+
+        Args:
+            modules - OPTIONAL, a list of names of modules to import (default core_modules)
+            repeat - OPTIONAL, the number of processes started for each module, the median duration is kept (default 5)
+
+        Methods:
+            __init__(modules=None, repeat=5)
+            run(report_path=None)
+            time_import(module)
+            format_summary(results)
+    '''
+
+    core_modules = ['apple_music_analyser', 'apple_music_analyser.Utility', 'apple_music_analyser.Parser',
+        'apple_music_analyser.Query', 'apple_music_analyser.Process', 'apple_music_analyser.VisualizationDataframe',
+        'apple_music_analyser.DataVisualization']
+    dependencies = ['numpy', 'pandas', 'plotly']
+
+    # run in the new process: times the import, and prints the duration and the dependencies loaded as json
+    import_script = '''
+import json, sys, time
+start_time = time.perf_counter()
+import {module}
+duration = time.perf_counter() - start_time
+print(json.dumps({{'duration':duration, 'loaded':[name for name in {dependencies} if name in sys.modules]}}))
+'''
+
+    def __init__(self, modules=None, repeat=5):
+        self.modules = modules if modules is not None else ImportBenchmark.core_modules
+        self.repeat = repeat
+
+    def run(self, report_path=None):
+        '''
+            Returns a dictionary {module:{'duration':float (seconds), 'loaded':list}} with the median duration of the
+            import of each module, and the dependencies it loaded. If report_path is provided, the results are saved
+            there as a json file.
+        '''
+        results = {}
+        for module in self.modules:
+            measures = [self.time_import(module) for _ in range(self.repeat)]
+            results[module] = {'duration':statistics.median([measure['duration'] for measure in measures]), 'loaded':measures[0]['loaded']}
+        if report_path is not None:
+            with open(report_path, 'w') as report_file:
+                json.dump(results, report_file, indent=4)
+        return results
+
+    def time_import(self, module):
+        '''
+            Imports module in a new python process and returns the measure it reports.
+        '''
+        script = ImportBenchmark.import_script.format(module=module, dependencies=ImportBenchmark.dependencies)
+        # the package is imported from the root of the repository, even if it is not installed
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        environment = dict(os.environ, PYTHONPATH=os.pathsep.join([root_dir, os.environ.get('PYTHONPATH', '')]))
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True, env=environment).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    @staticmethod
+    def format_summary(results):
+        '''
+            Returns a table (str) with the import duration in milliseconds of each module, and the dependencies it loaded.
+        '''
+        module_width = max([len(module) for module in results])
+        lines = [' '*module_width + '{0:>14}   {1}'.format('duration (ms)', 'loaded')]
+        for module, result in results.items():
+            lines.append(module.ljust(module_width) + '{0:>14.1f}   {1}'.format(result['duration']*1000, ', '.join(result['loaded'])))
+        return '\n'.join(lines)
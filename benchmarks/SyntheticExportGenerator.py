@@ -0,0 +1,366 @@
+import io
+import numpy as np
+import pandas as pd
+from zipfile import ZipFile, ZIP_DEFLATED
+
+class SyntheticExportGenerator():
+
+    '''
+        This class generates a synthetic archive of the Apple Music activity of a user, with the five files
+        used by the package (same names, columns and formats as in the archive received from Apple), so that
+        the pipeline can be run on inputs of any size.
+        The generation is deterministic: the same parameters (seed included) always give the same dataframes.
+
+        The generated data is built from a catalog of tracks, each with a title, an artist, a genre and an
+        identifier used by Apple:
+            - the artists have a popularity following a Zipf law of exponent artist_skew, so a few artists
+            get most of the plays (and most of the tracks of the library), like in a real listening history
+            - within an artist, the first tracks are played more often than the others
+            - library_size tracks of the catalog are in the library
+            - the play activity has play_count rows, with a share title_noise of the titles spelled differently
+            (lower case, a suffix such as ' (Remastered)', or a missing character), as it happens in the real exports
+            and makes the matching of ProcessTracks compare titles
+            - the likes dislikes, identifier information and library activity are built from the library tracks, along with
+            a few playlists (whose identifiers are not numeric, so the identifiers are read as strings like in a real archive)
+
+        Args:
+            play_count - the number of rows of the play activity
+            library_size - the number of tracks in the library
+            catalog_size - OPTIONAL, the number of distinct tracks (default 3 times library_size, or more if play_count requires it)
+            artist_count - OPTIONAL, the number of distinct artists (default a tenth of catalog_size)
+            artist_skew - OPTIONAL, the exponent of the Zipf law of the popularity of the artists (default 1.1, 0 for a uniform popularity)
+            title_noise - OPTIONAL, the share of the rows of the play activity with a different spelling of the title (default 0.05)
+            seed - OPTIONAL, the seed of the random generator (default 0)
+
+        Methods:
+            __init__(play_count, library_size, catalog_size=None, artist_count=None, artist_skew=1.1, title_noise=0.05, seed=0)
+            generate()
+            write_archive(archive_path, dataframes=None)
+            build_catalog()
+            build_library_tracks_df()
+            build_play_activity_df()
+            build_likes_dislikes_df()
+            build_identifier_infos_df()
+            build_library_activity_df()
+            build_playlists(count)
+            build_names(count, min_words, max_words)
+            add_title_noise(titles, noise_types)
+            format_timestamps(seconds, with_milliseconds=True)
+    '''
+
+    archive_files = {
+        'identifier_infos_df':'Apple_Media_Services/Apple Music Activity/Identifier Information.json.zip',
+        'library_tracks_df':'Apple_Media_Services/Apple Music Activity/Apple Music Library Tracks.json.zip',
+        'library_activity_df':'Apple_Media_Services/Apple Music Activity/Apple Music Library Activity.json.zip',
+        'likes_dislikes_df':'Apple_Media_Services/Apple Music Activity/Apple Music Likes and Dislikes.csv',
+        'play_activity_df':'Apple_Media_Services/Apple Music Activity/Apple Music Play Activity.csv'
+    }
+
+    syllables = ['ka', 'lo', 'mi', 'ra', 'su', 'ne', 'to', 'va', 'de', 'lu', 'shi', 'mo', 'ri', 'an', 'el', 'or',
+                 'ta', 'po', 'ge', 'ni', 'ba', 'ze', 'fu', 'ly', 'xo', 'qui', 'dra', 'mel', 'son', 'tri']
+
+    genres = ['Pop', 'Rock', 'Alternative', 'Electronic', 'Hip-Hop/Rap', 'Jazz', 'Classical', 'Soundtrack',
+              'R&B/Soul', 'Country', 'Dance', 'Indie Pop', 'Metal', 'Reggae', 'Blues', 'Folk']
+
+    feature_names = ['library / playlist_detail', 'my-music', 'search / album_detail', 'browse', 'for_you / recently_played',
+                     'for_you / personalized_mix', 'for_you', 'radio', 'now_playing', np.nan]
+
+    user_agents = ['itunescloudd/1.0 iOS/9.3.2 model/iPhone6,2 hwp/s5l8960x build/13F69 (6; dt:90)',
+                   'itunescloudd/1.0 iOS/12.1 model/iPhone10,4 hwp/t8015 build/16B92 (6; dt:157)',
+                   'iTunes/12.4.1 (Macintosh; OS X 10.11.5) AppleWebKit/601.6.17',
+                   'Music/1.0 iOS/13.3 model/iPad7,5 hwp/t8010 build/17C54 (5; dt:176)']
+
+    # beginning of 2016 and of 2021, in seconds since the epoch
+    first_timestamp = 1451606400
+    last_timestamp = 1609459200
+
+    def __init__(self, play_count, library_size, catalog_size=None, artist_count=None, artist_skew=1.1, title_noise=0.05, seed=0):
+        self.play_count = play_count
+        self.library_size = library_size
+        if catalog_size is None:
+            catalog_size = max(3*library_size, play_count//50, 1)
+        self.catalog_size = max(catalog_size, library_size)
+        if artist_count is None:
+            artist_count = max(self.catalog_size//10, 1)
+        self.artist_count = artist_count
+        self.artist_skew = artist_skew
+        self.title_noise = title_noise
+        self.seed = seed
+        self.random_generator = None
+        self.catalog = None
+        self.library_positions = None
+
+    def generate(self):
+        '''
+            Returns a dictionary of the five dataframes, of the same format as the output of Utility.get_df_from_archive.
+        '''
+        self.random_generator = np.random.default_rng(self.seed)
+        self.catalog = self.build_catalog()
+        library_tracks_df = self.build_library_tracks_df()
+        return {
+            'identifier_infos_df':self.build_identifier_infos_df(),
+            'library_tracks_df':library_tracks_df,
+            'library_activity_df':self.build_library_activity_df(),
+            'likes_dislikes_df':self.build_likes_dislikes_df(),
+            'play_activity_df':self.build_play_activity_df()
+        }
+
+    def write_archive(self, archive_path, dataframes=None):
+        '''
+            Writes the dataframes (generated if not provided) in a zip file with the structure of the archive received
+            from Apple, that can be read with Utility.get_df_from_archive(archive_path).
+        '''
+        if dataframes is None:
+            dataframes = self.generate()
+        with ZipFile(archive_path, 'w', ZIP_DEFLATED) as archive:
+            for df_name, file_path in SyntheticExportGenerator.archive_files.items():
+                if file_path.endswith('.csv'):
+                    archive.writestr(file_path, dataframes[df_name].to_csv(index=False))
+                else:
+                    # the json files are themselves zipped in the archive
+                    json_archive = io.BytesIO()
+                    with ZipFile(json_archive, 'w', ZIP_DEFLATED) as json_file:
+                        json_file.writestr(file_path.split('/')[-1][:-len('.zip')], dataframes[df_name].to_json(orient='records'))
+                    archive.writestr(file_path, json_archive.getvalue())
+
+    def build_catalog(self):
+        '''
+            Returns a dataframe with one row per track of the catalog (Title, Artist, Genre, Apple Id, Duration),
+            and the probability of each track to be played (Popularity).
+        '''
+        artists = self.build_names(self.artist_count, 1, 3)
+        artist_popularity = 1/np.arange(1, self.artist_count + 1)**self.artist_skew
+        artist_popularity = artist_popularity/artist_popularity.sum()
+        # each artist gets at least one track, and the others are distributed following the popularity of the artists
+        track_artists = np.concatenate([np.arange(min(self.artist_count, self.catalog_size)),
+                                        self.random_generator.choice(self.artist_count, self.catalog_size - min(self.artist_count, self.catalog_size), p=artist_popularity)])
+        track_artists = np.sort(track_artists)
+        # rank of each track within its artist
+        artist_start = np.searchsorted(track_artists, track_artists)
+        rank_in_artist = np.arange(self.catalog_size) - artist_start
+        popularity = artist_popularity[track_artists]/(1 + rank_in_artist)
+        track_artist_counts = np.bincount(track_artists, minlength=self.artist_count)
+        popularity = popularity/(1/np.arange(1, track_artist_counts.max() + 1)).cumsum()[track_artist_counts[track_artists] - 1]
+
+        artist_genres = self.random_generator.integers(len(SyntheticExportGenerator.genres), size=self.artist_count)
+        catalog = pd.DataFrame({
+            'Title':self.build_names(self.catalog_size, 1, 4),
+            'Artist':np.array(artists, dtype=object)[track_artists],
+            'Genre':np.array(SyntheticExportGenerator.genres, dtype=object)[artist_genres[track_artists]],
+            'Apple Id':200000000 + self.random_generator.permutation(self.catalog_size)*7,
+            'Duration':self.random_generator.integers(90000, 420000, size=self.catalog_size),
+            'Popularity':popularity/popularity.sum()
+        })
+        return catalog
+
+    def build_library_tracks_df(self):
+        '''
+            Returns the library tracks dataframe, with library_size tracks of the catalog, the most popular ones being
+            more likely to be in the library.
+        '''
+        random_generator = self.random_generator
+        self.library_positions = np.sort(random_generator.choice(self.catalog_size, self.library_size, replace=False, p=self.catalog['Popularity'].to_numpy()))
+        library = self.catalog.iloc[self.library_positions]
+        size = self.library_size
+        # most tracks of the library are matched to the Apple Music catalog, the others are purchased or imported tracks
+        in_catalog = random_generator.random(size) < 0.8
+        purchased = ~in_catalog & (random_generator.random(size) < 0.5)
+        apple_ids = library['Apple Id'].to_numpy().astype(float)
+        date_added = random_generator.integers(SyntheticExportGenerator.first_timestamp - 5*365*86400, SyntheticExportGenerator.last_timestamp, size=size)
+        return pd.DataFrame({
+            'Content Type':'Song',
+            'Track Identifier':182857498 + np.arange(size)*4,
+            'Title':library['Title'].to_numpy(),
+            'Sort Name':library['Title'].to_numpy(),
+            'Artist':library['Artist'].to_numpy(),
+            'Sort Artist':library['Artist'].to_numpy(),
+            'Is Part of Compilation':random_generator.random(size) < 0.1,
+            'Album':library['Title'].to_numpy(),
+            'Album Artist':library['Artist'].to_numpy(),
+            'Genre':library['Genre'].to_numpy(),
+            'Track Year':random_generator.integers(1960, 2021, size=size),
+            'Track Duration':library['Duration'].to_numpy(),
+            'Track Play Count':random_generator.integers(0, 200, size=size),
+            'Date Added To Library':self.format_timestamps(date_added, with_milliseconds=False),
+            'Skip Count':random_generator.integers(0, 20, size=size),
+            'Is Purchased':np.where(purchased, 1.0, np.nan),
+            'Release Date':self.format_timestamps(date_added - random_generator.integers(0, 10*365*86400, size=size), with_milliseconds=False),
+            'Purchased Track Identifier':np.where(purchased, apple_ids, np.nan),
+            'Track Like Rating':np.where(random_generator.random(size) < 0.1, 'LIKE', 'UNDEFINED'),
+            'Apple Music Track Identifier':np.where(in_catalog, apple_ids, np.nan),
+            'Tag Matched Track Identifier':np.where(in_catalog & (random_generator.random(size) < 0.3), apple_ids, np.nan)
+        })
+
+    def build_play_activity_df(self):
+        '''
+            Returns the play activity dataframe, with play_count rows.
+        '''
+        random_generator = self.random_generator
+        size = self.play_count
+        track_positions = random_generator.choice(self.catalog_size, size, p=self.catalog['Popularity'].to_numpy())
+        plays = self.catalog.iloc[track_positions]
+
+        titles = plays['Title'].to_numpy().copy()
+        noisy_rows = np.flatnonzero(random_generator.random(size) < self.title_noise)
+        titles[noisy_rows] = self.add_title_noise(titles[noisy_rows], random_generator.integers(3, size=noisy_rows.shape[0]))
+        # a few rows have no title (tracks that are not available anymore for example)
+        titles[random_generator.random(size) < 0.005] = np.nan
+
+        media_duration = plays['Duration'].to_numpy()
+        played_completely = random_generator.random(size) < 0.6
+        play_duration = np.where(played_completely, media_duration, (media_duration*random_generator.random(size)).astype(np.int64))
+        start = random_generator.integers(SyntheticExportGenerator.first_timestamp*1000, SyntheticExportGenerator.last_timestamp*1000, size=size)
+        end = start + play_duration
+        event_start = self.format_timestamps(start/1000)
+        event_start[random_generator.random(size) < 0.02] = np.nan
+        end_reasons = np.array(['TRACK_SKIPPED_FORWARDS', 'SCRUB_END', 'PLAYBACK_MANUALLY_PAUSED', 'NOT_APPLICABLE'], dtype=object)
+        end_reason = np.where(played_completely, 'NATURAL_END_OF_TRACK', end_reasons[random_generator.integers(len(end_reasons), size=size)])
+        feature_names = np.array(SyntheticExportGenerator.feature_names, dtype=object)
+
+        return pd.DataFrame({
+            'Apple Id Number':456135196,
+            'Apple Music Subscription':True,
+            'Artist Name':plays['Artist'].to_numpy(),
+            'Build Version':np.array(SyntheticExportGenerator.user_agents, dtype=object)[random_generator.integers(len(SyntheticExportGenerator.user_agents), size=size)],
+            'Client IP Address':'90.63.250.137',
+            'Content Name':titles,
+            'Content Provider':'Synthetic Records',
+            'Content Specific Type':'Song',
+            'Device Identifier':'21169dd63730bf565a369dd9cb00be73d4e1fc27',
+            'End Position In Milliseconds':play_duration.astype(float),
+            'End Reason Type':end_reason,
+            'Event End Timestamp':self.format_timestamps(end/1000),
+            'Event Reason Hint Type':'NOT_SPECIFIED',
+            'Event Received Timestamp':self.format_timestamps(end/1000 + 0.006),
+            'Event Start Timestamp':event_start,
+            'Event Type':'PLAY_END',
+            'Feature Name':feature_names[random_generator.integers(len(feature_names), size=size)],
+            'Genre':plays['Genre'].to_numpy(),
+            'Item Type':'ORIGINAL_CONTENT',
+            'Media Duration In Milliseconds':media_duration,
+            'Media Type':'AUDIO',
+            'Metrics Bucket Id':9374,
+            'Metrics Client Id':'3zUk5fkzGrNz4TZz90fzulu7DWGV',
+            'Milliseconds Since Play':random_generator.integers(0, 1000, size=size),
+            'Offline':random_generator.random(size) < 0.1,
+            'Original Title':np.nan,
+            'Play Duration Milliseconds':play_duration.astype(float),
+            'Source Type':'ORIGINATING_DEVICE',
+            'Start Position In Milliseconds':0,
+            'Store Country Name':'France',
+            'UTC Offset In Seconds':np.array([0, 3600, 7200, -18000])[random_generator.choice(4, size=size, p=[0.2, 0.4, 0.3, 0.1])]
+        })
+
+    def build_likes_dislikes_df(self):
+        '''
+            Returns the likes dislikes dataframe, with a tenth of the tracks of the library.
+        '''
+        random_generator = self.random_generator
+        positions = random_generator.choice(self.library_positions, max(self.library_size//10, 1), replace=False)
+        liked = self.catalog.iloc[np.sort(positions)]
+        playlists = self.build_playlists(max(liked.shape[0]//50, 1))
+        size = liked.shape[0] + playlists.shape[0]
+        return pd.DataFrame({
+            'Item Description':np.concatenate([liked['Artist'].to_numpy() + ' - ' + liked['Title'].to_numpy(), playlists['Title'].to_numpy() + ' - Apple Music']),
+            'Preference':np.where(random_generator.random(size) < 0.85, 'LOVE', 'DISLIKE'),
+            'Created':self.format_timestamps(random_generator.integers(SyntheticExportGenerator.first_timestamp, SyntheticExportGenerator.last_timestamp, size=size)),
+            'Last Modified':np.nan,
+            'Item Reference':np.concatenate([liked['Apple Id'].astype(str).to_numpy(), playlists['Identifier'].to_numpy()])
+        })
+
+    def build_identifier_infos_df(self):
+        '''
+            Returns the identifier information dataframe, with the identifiers of the tracks of the library
+            and of as many other tracks of the catalog.
+        '''
+        other_positions = self.random_generator.choice(self.catalog_size, min(self.library_size, self.catalog_size), replace=False)
+        identified = self.catalog.iloc[np.concatenate([self.library_positions, other_positions])]
+        identified_tracks = pd.DataFrame({
+            'Identifier':identified['Apple Id'].astype(str).to_numpy(),
+            'Title':identified['Title'].to_numpy()
+        })
+        return pd.concat([identified_tracks, self.build_playlists(max(identified_tracks.shape[0]//50, 1))], ignore_index=True)
+
+    def build_library_activity_df(self):
+        '''
+            Returns the library activity dataframe, with one transaction for two tracks of the library.
+        '''
+        random_generator = self.random_generator
+        size = max(self.library_size//2, 1)
+        transaction_types = np.array(['addItems', 'updateItems', 'removeItems', 'updateUser', 'playlistAddItems'], dtype=object)
+        tracks = self.catalog.iloc[random_generator.choice(self.library_positions, size)]
+        return pd.DataFrame({
+            'Transaction Type':transaction_types[random_generator.integers(len(transaction_types), size=size)],
+            'Transaction Identifier':10000002.0 + np.arange(size),
+            'Transaction Date':self.format_timestamps(np.sort(random_generator.integers(SyntheticExportGenerator.first_timestamp, SyntheticExportGenerator.last_timestamp, size=size)), with_milliseconds=False),
+            'UserAgent':np.array(SyntheticExportGenerator.user_agents, dtype=object)[random_generator.integers(len(SyntheticExportGenerator.user_agents), size=size)],
+            'Country':'FRA',
+            'Language':'fr-fr',
+            'Content Type':'Song',
+            'Title':tracks['Title'].to_numpy(),
+            'Artist':tracks['Artist'].to_numpy(),
+            'Genre':tracks['Genre'].to_numpy(),
+            'Track Duration':tracks['Duration'].to_numpy().astype(float)
+        })
+
+    def build_playlists(self, count):
+        '''
+            Returns a dataframe of count playlists, with an Identifier of the format used by Apple ('pl.u-...')
+            and a Title.
+        '''
+        identifiers = self.random_generator.integers(16**12, 16**13, size=count)
+        return pd.DataFrame({
+            'Identifier':['pl.u-{0:x}'.format(identifier) for identifier in identifiers],
+            'Title':self.build_names(count, 1, 3)
+        })
+
+    def build_names(self, count, min_words, max_words):
+        '''
+            Returns a list of count distinct names, made of min_words to max_words capitalized words.
+        '''
+        names = []
+        known_names = set()
+        syllables = np.array(SyntheticExportGenerator.syllables, dtype=object)
+        while len(names) < count:
+            missing = count - len(names)
+            word_counts = self.random_generator.integers(min_words, max_words + 1, size=missing)
+            word_syllables = syllables[self.random_generator.integers(len(syllables), size=(missing, max_words, 3))]
+            for name_syllables, word_count in zip(word_syllables, word_counts):
+                name = ' '.join([''.join(word).capitalize() for word in name_syllables[:word_count]])
+                if name not in known_names:
+                    known_names.add(name)
+                    names.append(name)
+        return names
+
+    def add_title_noise(self, titles, noise_types):
+        '''
+            Returns a different spelling of each title, depending on its noise type:
+                - 0: the title in lower case
+                - 1: the title followed by ' (Remastered)'
+                - 2: the title without one of its characters
+        '''
+        noisy_titles = np.empty(titles.shape[0], dtype=object)
+        for position, (title, noise_type) in enumerate(zip(titles, noise_types)):
+            if noise_type == 0:
+                noisy_titles[position] = title.lower()
+            elif noise_type == 1:
+                noisy_titles[position] = title + ' (Remastered)'
+            else:
+                removed = (position*7919) % len(title)
+                noisy_titles[position] = title[:removed] + title[removed + 1:]
+        return noisy_titles
+
+    @staticmethod
+    def format_timestamps(seconds, with_milliseconds=True):
+        '''
+            Returns an array of the timestamps (in seconds since the epoch) formatted like in the files of the archive,
+            for example '2018-04-09T14:11:10.613Z' (or '2018-04-09T14:11:10Z' without milliseconds).
+        '''
+        seconds = np.asarray(seconds)
+        if with_milliseconds:
+            datetimes = (seconds*1000).astype(np.int64).astype('datetime64[ms]')
+            formatted = np.datetime_as_string(datetimes, unit='ms')
+        else:
+            datetimes = seconds.astype(np.int64).astype('datetime64[s]')
+            formatted = np.datetime_as_string(datetimes, unit='s')
+        return np.char.add(formatted, 'Z').astype(object)
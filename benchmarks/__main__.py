@@ -0,0 +1,27 @@
+import argparse
+
+from benchmarks.BenchmarkSuite import BenchmarkSuite
+from benchmarks.ImportBenchmark import ImportBenchmark
+
+# Usage, from the root of the repository:
+#     python -m benchmarks --sizes 10k 1M --report benchmark_report.json
+# or, to time the import of the modules of the package:
+#     python -m benchmarks --imports
+
+parser = argparse.ArgumentParser(description='Times the pipeline of apple_music_analyser on synthetic archives.')
+parser.add_argument('--sizes', nargs='+', default=['10k'], help='sizes of the play activity: 10k, 1M, 10M or a number of plays')
+parser.add_argument('--library-ratio', type=float, default=0.05, help='number of tracks of the library for a play')
+parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic archives')
+parser.add_argument('--track-memory', action='store_true', help='record the peak memory of each step (slower)')
+parser.add_argument('--workers', type=int, default=None, help='number of processes used to process the library tracks and play activity')
+parser.add_argument('--imports', action='store_true', help='time the import of each module of the package instead of the pipeline')
+parser.add_argument('--report', default=None, help='path of a json file where the results are saved')
+args = parser.parse_args()
+
+if args.imports:
+    results = ImportBenchmark().run(args.report)
+    print(ImportBenchmark.format_summary(results))
+else:
+    benchmark_suite = BenchmarkSuite(args.sizes, args.library_ratio, args.seed, args.track_memory, args.workers)
+    results = benchmark_suite.run(args.report)
+    print(BenchmarkSuite.format_summary(results))
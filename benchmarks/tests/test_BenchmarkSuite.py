@@ -0,0 +1,30 @@
+import unittest
+
+from benchmarks.BenchmarkSuite import BenchmarkSuite
+from apple_music_analyser.VisualizationDataframe import VisualizationDataframe
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+
+    def test_run(self):
+        results = BenchmarkSuite(sizes=[300]).run()
+        self.assertEqual(list(results.keys()), ['300'])
+        steps = results['300']['steps']
+        for step in VisualizationDataframe.pipeline_stages + ['get_df_from_archive', 'query', 'query_per_year', 'ranking_Genres']:
+            self.assertIn(step, steps)
+        self.assertEqual(results['300']['counters']['play_count'], 300)
+        summary = BenchmarkSuite.format_summary(results)
+        self.assertIn('process_play_activity', summary)
+        self.assertIn('total_duration', summary)
+
+    def test_init_default_sizes(self):
+        benchmark_suite = BenchmarkSuite()
+        self.assertEqual(benchmark_suite.sizes, ['10k'])
+        # each instance gets its own list
+        benchmark_suite.sizes.append('1M')
+        self.assertEqual(BenchmarkSuite().sizes, ['10k'])
+
+    def test_get_play_count(self):
+        self.assertEqual(BenchmarkSuite.get_play_count('1M'), 1000000)
+        self.assertEqual(BenchmarkSuite.get_play_count('2500'), 2500)
+        self.assertRaises(Exception, BenchmarkSuite.get_play_count, '1G')
@@ -0,0 +1,33 @@
+import unittest
+
+from benchmarks.ImportBenchmark import ImportBenchmark
+
+
+class TestImportBenchmark(unittest.TestCase):
+
+    def test_run(self):
+        results = ImportBenchmark(['apple_music_analyser', 'apple_music_analyser.DataVisualization'], repeat=1).run()
+        self.assertEqual(list(results.keys()), ['apple_music_analyser', 'apple_music_analyser.DataVisualization'])
+        self.assertTrue(results['apple_music_analyser']['duration'] > 0)
+        # plotly is only imported when a visualization is built
+        for result in results.values():
+            self.assertIn('pandas', result['loaded'])
+            self.assertNotIn('plotly', result['loaded'])
+        summary = ImportBenchmark.format_summary(results)
+        self.assertIn('apple_music_analyser.DataVisualization', summary)
+
+    def test_lazy_visualization_classes(self):
+        import apple_music_analyser
+        from apple_music_analyser.DataVisualization import HeatMapVisualization
+        self.assertIs(apple_music_analyser.HeatMapVisualization, HeatMapVisualization)
+        self.assertIn('HeatMapVisualization', dir(apple_music_analyser))
+        with self.assertRaises(AttributeError):
+            apple_music_analyser.UnknownVisualization
+
+    def test_import_all(self):
+        namespace = {}
+        exec('from apple_music_analyser import *', namespace)
+        from apple_music_analyser.DataVisualization import HeatMapVisualization
+        self.assertIs(namespace['HeatMapVisualization'], HeatMapVisualization)
+        self.assertIn('VisualizationDataframe', namespace)
+        self.assertNotIn('_visualization_classes', namespace)
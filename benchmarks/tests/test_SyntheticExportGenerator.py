@@ -0,0 +1,64 @@
+import os
+import pandas as pd
+import tempfile
+import unittest
+
+from apple_music_analyser.Utility import Utility
+from apple_music_analyser.VisualizationDataframe import VisualizationDataframe
+from benchmarks.SyntheticExportGenerator import SyntheticExportGenerator
+
+
+class TestSyntheticExportGenerator(unittest.TestCase):
+
+    def setUp(self):
+        self.generator = SyntheticExportGenerator(1000, 100, seed=1)
+        self.dataframes = self.generator.generate()
+
+    def test_generate(self):
+        self.assertEqual(sorted(self.dataframes.keys()), ['identifier_infos_df', 'library_activity_df', 'library_tracks_df', 'likes_dislikes_df', 'play_activity_df'])
+        self.assertTrue(Utility.validate_input_df_files(self.dataframes))
+        self.assertEqual(self.dataframes['play_activity_df'].shape[0], 1000)
+        self.assertEqual(self.dataframes['library_tracks_df'].shape[0], 100)
+        self.assertEqual(self.dataframes['library_tracks_df']['Title'].nunique(), 100)
+
+    def test_generate_deterministic(self):
+        result = SyntheticExportGenerator(1000, 100, seed=1).generate()
+        for df_name, df in result.items():
+            self.assertTrue(df.equals(self.dataframes[df_name]))
+        other_result = SyntheticExportGenerator(1000, 100, seed=2).generate()
+        self.assertFalse(other_result['play_activity_df'].equals(self.dataframes['play_activity_df']))
+
+    def test_artist_skew(self):
+        skewed_plays = SyntheticExportGenerator(5000, 100, artist_skew=2).generate()['play_activity_df']
+        uniform_plays = SyntheticExportGenerator(5000, 100, artist_skew=0).generate()['play_activity_df']
+        skewed_share = skewed_plays['Artist Name'].value_counts(normalize=True).iloc[0]
+        uniform_share = uniform_plays['Artist Name'].value_counts(normalize=True).iloc[0]
+        self.assertTrue(skewed_share > uniform_share)
+
+    def test_title_noise(self):
+        catalog_titles = set(self.generator.catalog['Title'])
+        noisy_plays = SyntheticExportGenerator(1000, 100, title_noise=0.5, seed=1).generate()['play_activity_df']
+        for plays, expected_share in [(self.dataframes['play_activity_df'], 0.05), (noisy_plays, 0.5)]:
+            titles = plays['Content Name'].dropna()
+            noisy_share = (~titles.isin(catalog_titles)).mean()
+            self.assertAlmostEqual(noisy_share, expected_share, delta=0.05)
+
+    def test_write_archive(self):
+        with tempfile.TemporaryDirectory() as archive_dir:
+            archive_path = os.path.join(archive_dir, 'archive.zip')
+            self.generator.write_archive(archive_path, self.dataframes)
+            result = Utility.get_df_from_archive(archive_path)
+        for df_name, df in self.dataframes.items():
+            self.assertEqual(result[df_name].shape, df.shape)
+        # the archive can be processed by the package
+        visualization_dataframe = VisualizationDataframe(result)
+        df_viz = visualization_dataframe.get_df_viz()
+        self.assertEqual(df_viz.shape[0], visualization_dataframe.play_activity_df.shape[0])
+        self.assertTrue((df_viz['Rating'] != 'Unknown').any())
+        self.assertTrue(df_viz['Library_Track'].any())
+
+    def test_format_timestamps(self):
+        result = SyntheticExportGenerator.format_timestamps([1523283070.613])
+        self.assertEqual(result[0], '2018-04-09T14:11:10.613Z')
+        result = SyntheticExportGenerator.format_timestamps([1523283070], with_milliseconds=False)
+        self.assertEqual(result[0], '2018-04-09T14:11:10Z')
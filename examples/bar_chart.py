@@ -16,15 +16,14 @@ df_viz = viz_df_instance.get_df_viz()
 ###########################################################################################################################
 
 # create the BarChart instance
-years_to_plot = sorted(df_viz['Play_Year'].dropna().unique())
 bar_chart = BarChartVisualization(df_viz)
 bar_chart.hover_unit = '%'
 
-# for each year, build the x and y series, computing the percentage of songs, and generate the traces
-for year in years_to_plot:
-    x_serie = df_viz[df_viz['Play_Year']==year]['Play_DOW'].unique()
-    y_serie = Utility.compute_ratio_songs(df_viz[df_viz['Play_Year']==year]['Play_DOW'])
-    bar_chart.render_bar_chart(x_serie, y_serie, str(year))
+# compute the percentage of songs per day of the week for all the years at once (a row per year and day)
+ratio_df = Utility.compute_grouped_ratio_songs(df_viz, 'Play_DOW', 'Play_Year')
+
+# generate a trace per year
+bar_chart.render_grouped_bar_chart(ratio_df, 'Play_DOW')
 
 # edit the layout of the xaxis and show the rendered plot
 xaxis=dict(categoryorder='array',
@@ -139,3 +138,23 @@ bar_chart.figure.show()
 
 
 
+# BUILD THE BAR CHARTS FROM THE TIME CUBE
+###########################################################################################################################
+
+# the time cube counts the plays (and sums their duration) per year, month, day of the month, day of the week and hour
+# of the day: it is built once, and each chart then only goes through this small dataframe, not through all the plays
+time_cube = viz_df_instance.get_time_cube()
+years_to_plot = sorted(time_cube['Play_Year'].unique())
+
+# ratio of songs per day of the week, one trace per year
+bar_chart = BarChartVisualization.from_time_cube(time_cube)
+bar_chart.hover_unit = '%'
+for year in years_to_plot:
+    bar_chart.render_period_bar_chart('DOW', str(year), year=year, ratio=True)
+bar_chart.figure.show()
+
+# count of songs per hour of the day, one subplot per year
+bar_chart = BarChartVisualization.from_time_cube(time_cube, with_subplots=len(years_to_plot))
+for year in years_to_plot:
+    bar_chart.render_period_bar_chart('HOD', str(year), year=year)
+bar_chart.figure.show()
@@ -155,3 +155,18 @@ for year in query_params['year']:
 
 # display the plot rendered
 heat_map.figure.show()
+
+
+
+# BUILD THE HEATMAPS FROM THE TIME CUBE
+###########################################################################################################################
+
+# the time cube is built once, and each heat map is computed from a slice of it, without going through all the plays
+time_cube = viz_df_instance.get_time_cube()
+years_to_plot = [2017, 2018, 2019]
+
+heat_map = HeatMapVisualization.from_time_cube(time_cube, len(years_to_plot))
+for year in years_to_plot:
+	heat_map.df = Utility.select_time_period(time_cube, year=year)
+	heat_map.render_heat_map('DOM', str(year))
+heat_map.figure.show()
@@ -76,3 +76,18 @@ pie_chart.render_pie_chart()
 pie_chart.figure.show()
 
 
+
+# PLOT A PIE CHART OF THE 10 MOST LISTENED TO ARTISTS, THE OTHERS BEING GROUPED IN A SLICE 'Other'
+###########################################################################################################################
+
+# the counts can be computed beforehand, and passed as a dictionary {label:count}
+artist_counts = df_viz['Artist'].value_counts().to_dict()
+
+# create the PieChart instance
+pie_chart = PieChartVisualization(artist_counts, number_of_slices=10)
+
+# generate the plot
+pie_chart.render_pie_chart()
+
+# display the plot rendered
+pie_chart.figure.show()
@@ -21,7 +21,7 @@ setup(
     packages=['apple_music_analyser', 'apple_music_analyser.tests'],
     install_requires=["numpy==1.18.4", "pandas==1.0.4", "plotly==4.8.1"],
     include_package_data=True,
-    python_requires='>=3.6',
+    python_requires='>=3.7',
     test_suite='tests',
     tests_require=['coverage'],
 )
\ No newline at end of file